@@ -0,0 +1,5 @@
+import time
+
+# Reference point of the startup timing breakdown: module imports (WeasyPrint,
+# the Azure SDKs, Application Insights) happen before the lifespan starts.
+STARTED_AT = time.perf_counter()
@@ -1,7 +1,15 @@
+import hashlib
+import inspect
 import logging
+import time
+from collections.abc import Awaitable, Callable
 
+from langchain_core.runnables import RunnableConfig
+from langgraph.errors import GraphBubbleUp
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+from opentelemetry.trace import StatusCode
 
 from app.agent.state import AgentState
 from app.agent.nodes.intent import intent_node
@@ -13,11 +21,10 @@ from app.agent.nodes.approve import approve_node
 from app.agent.nodes.output import output_node
 from app.agent.nodes.audit import audit_node
 from app.agent.nodes.clarify import clarify_node
+from app.services import latency, metrics, tracing
 
 logger = logging.getLogger(__name__)
 
-# Singleton compiled graph
-_graph = None
 _checkpointer = None
 
 
@@ -52,6 +59,52 @@ async def _get_checkpointer():
     return _checkpointer
 
 
+# Per-request fields cleared when a new message starts a new request.
+_NEW_REQUEST_STATE = {
+    "intent": None,
+    "processed_input": None,
+    "draft": None,
+    "draft_metadata": None,
+    "revision_feedback": None,
+    "revision_count": 0,
+    "status": "processing",
+    "pdf_url": None,
+    "pdf_blob_name": None,
+    "document_id": None,
+    "download_url": None,
+    "llm_model": None,
+    "llm_tokens_input": None,
+    "llm_tokens_output": None,
+    "approval_timestamp": None,
+    "messages": [],
+}
+
+
+async def start_node(state: AgentState) -> AgentState:
+    """Begin a turn from a new message.
+
+    If the user asked to revise the pending draft without saying how
+    (``awaiting_revision_feedback``), this message is that feedback.
+    Otherwise it starts a new request.  The flag lives in the checkpoint,
+    which ``ainvoke`` loads anyway, so checking it costs no extra read.
+    """
+    if state.get("awaiting_revision_feedback"):
+        return {
+            **state,
+            "awaiting_revision_feedback": False,
+            "revision_feedback": state["message"],
+            "status": "revision_requested",
+        }
+    return {**state, **_NEW_REQUEST_STATE, "awaiting_revision_feedback": False}
+
+
+def after_start(state: AgentState) -> str:
+    """Route a new message to revision feedback or to intent classification."""
+    if state.get("status") == "revision_requested":
+        return "revise"
+    return "classify_intent"
+
+
 def should_generate(state: AgentState) -> str:
     """Route after intent classification."""
     intent = state.get("intent", "unknown")
@@ -69,6 +122,20 @@ def after_review(state: AgentState) -> str:
         return "approve"
     if status == "revision_requested":
         return "revise"
+    if status == "review_needed":
+        return "wait"  # Waiting for revision feedback: pause at review again
+    return "reject"
+
+
+def after_approve(state: AgentState) -> str:
+    """Route after the final approval human-in-the-loop checkpoint."""
+    status = state.get("status", "")
+    if status == "approved":
+        return "output"
+    if status == "revision_requested":
+        return "revise"
+    if status == "review_needed":
+        return "wait"
     return "reject"
 
 
@@ -84,22 +151,77 @@ async def reject_node(state: AgentState) -> AgentState:
     return {**state, "status": "rejected"}
 
 
+def _instrumented(name: str, node):
+    """Wrap a node in a span, record its run time and attribute its LLM calls to it.
+
+    The turn's latency ledger (see :mod:`app.services.latency`) is copied into
+    ``state["timings"]`` after every node, so the audit node persists it.
+    """
+    takes_config = "config" in inspect.signature(node).parameters
+
+    async def run(state: AgentState, config: RunnableConfig) -> AgentState:
+        token = metrics.current_node.set(name)
+        started = time.perf_counter()
+        with (
+            tracing.conversation(state.get("conversation_id")),
+            tracing.tracer.start_as_current_span(
+                f"node {name}",
+                attributes={"agentize.node": name},
+                record_exception=False,
+                set_status_on_exception=False,
+            ) as span,
+        ):
+            try:
+                result = await (node(state, config) if takes_config else node(state))
+            except GraphBubbleUp:
+                raise  # interrupt(): the node pauses for the user, not an error
+            except Exception as exc:
+                metrics.ERRORS.labels("graph", metrics.error_status(exc)).inc()
+                span.record_exception(exc)
+                span.set_status(StatusCode.ERROR, str(exc))
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.NODE_LATENCY.labels(name).observe(elapsed)
+                latency.record(f"node.{name}", elapsed)
+                metrics.current_node.reset(token)
+            span.set_attribute("agentize.status", result.get("status") or "")
+        if result.get("status") == "error":
+            metrics.ERRORS.labels("graph", f"{name}_failed").inc()
+        ledger = latency.current_ledger.get()
+        if ledger is not None:
+            result = {**result, "timings": ledger.snapshot()}
+        return result
+
+    return run
+
+
 async def create_agent_graph():
     """Build and compile the LangGraph agent graph."""
     builder = StateGraph(AgentState)
 
-    builder.add_node("classify_intent", intent_node)
-    builder.add_node("process_input", process_input_node)
-    builder.add_node("generate", generate_node)
-    builder.add_node("review", review_node)
-    builder.add_node("revise", revise_node)
-    builder.add_node("approve", approve_node)
-    builder.add_node("output", output_node)
-    builder.add_node("audit", audit_node)
-    builder.add_node("reject", reject_node)
-    builder.add_node("clarify", clarify_node)
-
-    builder.set_entry_point("classify_intent")
+    nodes = {
+        "start": start_node,
+        "classify_intent": intent_node,
+        "process_input": process_input_node,
+        "generate": generate_node,
+        "review": review_node,
+        "revise": revise_node,
+        "approve": approve_node,
+        "output": output_node,
+        "audit": audit_node,
+        "reject": reject_node,
+        "clarify": clarify_node,
+    }
+    for name, node in nodes.items():
+        builder.add_node(name, _instrumented(name, node))
+
+    builder.set_entry_point("start")
+    builder.add_conditional_edges(
+        "start",
+        after_start,
+        {"classify_intent": "classify_intent", "revise": "revise"},
+    )
     builder.add_conditional_edges(
         "classify_intent",
         should_generate,
@@ -119,6 +241,7 @@ async def create_agent_graph():
             "approve": "approve",
             "revise": "revise",
             "reject": "reject",
+            "wait": "review",
         },
     )
     builder.add_edge("reject", "audit")
@@ -132,24 +255,23 @@ async def create_agent_graph():
         },
     )
 
-    builder.add_edge("approve", "output")
+    builder.add_conditional_edges(
+        "approve",
+        after_approve,
+        {
+            "output": "output",
+            "revise": "revise",
+            "reject": "reject",
+            "wait": "approve",
+        },
+    )
     builder.add_edge("output", "audit")
     builder.add_edge("audit", END)
     builder.add_edge("clarify", END)
 
     checkpointer = await _get_checkpointer()
-    return builder.compile(
-        checkpointer=checkpointer,
-        interrupt_before=["review", "approve"],
-    )
-
-
-async def get_graph():
-    """Return the singleton compiled graph."""
-    global _graph
-    if _graph is None:
-        _graph = await create_agent_graph()
-    return _graph
+    # review and approve pause themselves with interrupt().
+    return builder.compile(checkpointer=checkpointer)
 
 
 async def run_agent(
@@ -161,54 +283,53 @@ async def run_agent(
     tenant_id: str | None = None,
     resume_from: str | None = None,
     context: dict | None = None,
-    as_node: str | None = None,
+    services=None,
+    on_progress: Callable[[str, dict | None], Awaitable[None]] | None = None,
+    durability: str | None = None,
 ) -> dict:
     """Invoke or resume the LangGraph agent for a given conversation.
 
     Args:
         tenant_id: Tenant identifier. Falls back to ``settings.default_tenant_id``
             when not provided.
-        as_node: Override the ``as_node`` argument passed to
-            ``graph.aupdate_state``.  When resuming from the *approval*
-            interrupt but routing back to revision, pass ``"review"`` so
-            LangGraph evaluates the ``after_review`` conditional edge
-            instead of following the static approve → output edge.
+        resume_from: Resume the paused review / approval step with the
+            user's decision (see :func:`_build_resume_state`) in a single
+            ``Command(resume=...)`` invocation; the paused node applies it
+            and the graph routes on from there.
+        services: :class:`~app.services.container.ServiceContainer` handed
+            to the nodes via ``config["configurable"]``; nodes fall back to
+            the process-wide container when omitted.
+        on_progress: Awaited with each node's name and state update as the
+            node finishes; the graph is then run with ``astream`` instead of
+            ``ainvoke``.
+        durability: When checkpoints are written — ``"exit"`` (only when the
+            run pauses or ends), ``"async"`` or ``"sync"`` (after every
+            node).  Defaults to ``settings.checkpoint_durability``.
     """
     from app.config import settings as _settings
 
     resolved_tenant_id = tenant_id or _settings.default_tenant_id
+    durability = durability or _settings.checkpoint_durability
     config = {"configurable": {"thread_id": conversation_id}}
+    if services is not None:
+        config["configurable"]["services"] = services
 
     if resume_from:
-        state_update = _build_resume_state(resume_from, context or {})
-        # Update the existing checkpoint state, then resume from it.
-        # Passing None to ainvoke tells LangGraph to continue from the
-        # last interrupt rather than starting a new run.
-        await graph.aupdate_state(config, state_update, as_node=as_node)
-        result = await graph.ainvoke(None, config)
+        decision = _build_resume_state(resume_from, context or {})
+        graph_input = Command(resume=decision)
     else:
-        initial_state = AgentState(
-            user_id=user_id,
-            tenant_id=resolved_tenant_id,
-            conversation_id=conversation_id,
-            channel=channel,
-            message=message,
-            intent=None,
-            processed_input=None,
-            draft=None,
-            draft_metadata=None,
-            revision_feedback=None,
-            revision_count=0,
-            status="processing",
-            pdf_url=None,
-            pdf_blob_name=None,
-            llm_model=None,
-            llm_tokens_input=None,
-            llm_tokens_output=None,
-            approval_timestamp=None,
-            messages=[],
-        )
-        result = await graph.ainvoke(initial_state, config)
+        # Only the turn's identity and message: start_node decides whether
+        # the rest of the state is reset or kept for a pending revision.
+        graph_input = {
+            "user_id": user_id,
+            "tenant_id": resolved_tenant_id,
+            "conversation_id": conversation_id,
+            "channel": channel,
+            "message": message,
+        }
+    # Joins the bot turn's latency ledger, or opens one for other callers.
+    with latency.turn():
+        result = await _invoke(graph, graph_input, config, on_progress, durability)
 
     # Normalise: ainvoke returns AddableValuesDict (a dict subclass) or
     # occasionally a snapshot object with a .values property.
@@ -221,8 +342,81 @@ async def run_agent(
     return result
 
 
+async def _invoke(
+    graph, graph_input, config: dict, on_progress, durability: str
+) -> dict:
+    if on_progress is None:
+        return await graph.ainvoke(graph_input, config, durability=durability)
+    # "updates" names each node as it finishes; the last "values" chunk is
+    # the same final state ainvoke would return.
+    result: dict = {}
+    async for mode, chunk in graph.astream(
+        graph_input, config, stream_mode=["updates", "values"], durability=durability
+    ):
+        if mode == "values":
+            result = chunk
+            continue
+        for node in chunk:
+            if not node.startswith("__"):
+                await on_progress(node, chunk[node])
+    return result
+
+
+async def await_revision_feedback(graph, conversation_id: str) -> None:
+    """Treat the conversation's next message as feedback on the pending draft.
+
+    Resumes the paused step with the flag set; it routes back to itself, so
+    the thread stays paused and card actions still apply.
+    :func:`start_node` consumes the flag.
+    """
+    from app.config import settings as _settings
+
+    config = {"configurable": {"thread_id": conversation_id}}
+    await graph.ainvoke(
+        Command(resume=_build_resume_state("feedback", {})),
+        config,
+        durability=_settings.checkpoint_durability,
+    )
+
+
+def draft_hash(draft: str | None) -> str:
+    """Short fingerprint of a draft, carried by card actions instead of the draft."""
+    return hashlib.sha256((draft or "").encode("utf-8")).hexdigest()[:16]
+
+
+async def draft_reference(graph, conversation_id: str) -> dict:
+    """Compact reference to the conversation's current draft for card actions."""
+    snapshot = await graph.aget_state({"configurable": {"thread_id": conversation_id}})
+    return {
+        "conversation_id": conversation_id,
+        "checkpoint_id": snapshot.config["configurable"].get("checkpoint_id"),
+        "draft_hash": draft_hash(snapshot.values.get("draft")),
+    }
+
+
+async def load_draft_state(graph, conversation_id: str, ref: dict) -> dict | None:
+    """Return the checkpointed state a card action refers to, or None if stale.
+
+    A card is stale when the conversation's draft has changed since it was
+    sent (e.g. a newer revision), so acting on it would apply to a draft the
+    user never saw.  Cards without a reference are accepted as they are.
+    """
+    snapshot = await graph.aget_state({"configurable": {"thread_id": conversation_id}})
+    values = snapshot.values or {}
+    expected = ref.get("draft_hash")
+    if expected and draft_hash(values.get("draft")) != expected:
+        logger.info(
+            "Stale card action: conversation_id=%s card_checkpoint=%s current=%s",
+            conversation_id,
+            ref.get("checkpoint_id"),
+            snapshot.config["configurable"].get("checkpoint_id"),
+        )
+        return None
+    return values
+
+
 def _build_resume_state(resume_from: str, context: dict) -> dict:
-    """Build the state patch to resume after a human-in-the-loop interrupt.
+    """Build the decision a paused review / approval step applies to the state.
 
     Raises:
         ValueError: If ``resume_from`` is not a recognised resume point.
@@ -231,17 +425,22 @@ def _build_resume_state(resume_from: str, context: dict) -> dict:
         return {
             "status": "revision_requested",
             "revision_feedback": context.get("feedback", ""),
+            "awaiting_revision_feedback": False,
         }
     if resume_from == "output":
         return {
             "status": "approved",
             "approval_timestamp": context.get("timestamp"),
+            "awaiting_revision_feedback": False,
         }
     if resume_from == "rejection":
         return {
             "status": "rejected",
+            "awaiting_revision_feedback": False,
         }
+    if resume_from == "feedback":
+        return {"awaiting_revision_feedback": True}
     raise ValueError(
         f"Unknown resume_from value: {resume_from!r}. "
-        "Expected 'revision', 'output', or 'rejection'."
+        "Expected 'revision', 'output', 'rejection' or 'feedback'."
     )
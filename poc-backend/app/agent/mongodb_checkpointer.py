@@ -19,24 +19,15 @@ from langgraph.checkpoint.base import (
     CheckpointMetadata,
     CheckpointTuple,
 )
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import ASCENDING, DESCENDING
 
-from app.config import settings
-
-logger = logging.getLogger(__name__)
-
-_client: AsyncIOMotorClient | None = None
-_db: AsyncIOMotorDatabase | None = None
+from app.services import metrics
 
+# Shares the stores' client, so checkpoints and documents use one connection pool.
+from app.services.cosmos_db import _get_db
+from app.services.tracing import store_operation
 
-def _get_db() -> AsyncIOMotorDatabase:
-    """Get or create the MongoDB client singleton."""
-    global _client, _db
-    if _db is None:
-        _client = AsyncIOMotorClient(settings.cosmos_connection, retryWrites=False)
-        _db = _client[settings.cosmos_database]
-    return _db
+logger = logging.getLogger(__name__)
 
 
 class MongoDBSaver(BaseCheckpointSaver):
@@ -94,6 +85,7 @@ class MongoDBSaver(BaseCheckpointSaver):
     # BaseCheckpointSaver interface
     # ------------------------------------------------------------------
 
+    @store_operation("agent_state")
     async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
@@ -153,6 +145,7 @@ class MongoDBSaver(BaseCheckpointSaver):
             pending_writes=pending_writes,
         )
 
+    @store_operation("agent_state")
     async def aput(
         self,
         config: RunnableConfig,
@@ -181,6 +174,10 @@ class MongoDBSaver(BaseCheckpointSaver):
             "created_at": datetime.now(timezone.utc),
         }
 
+        metrics.CHECKPOINT_BYTES.observe(
+            sum(len(ser["data"]) for ser in (doc["checkpoint"], doc["metadata"]))
+            + sum(len(ser["data"]) for ser in blobs.values())
+        )
         await self.checkpoints.update_one(
             {
                 "thread_id": thread_id,
@@ -199,6 +196,7 @@ class MongoDBSaver(BaseCheckpointSaver):
             }
         }
 
+    @store_operation("agent_state")
     async def aput_writes(
         self,
         config: RunnableConfig,
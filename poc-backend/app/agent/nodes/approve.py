@@ -1,11 +1,17 @@
+from langgraph.types import interrupt
+
 from app.agent.state import AgentState
 
 
 async def approve_node(state: AgentState) -> AgentState:
-    """Human-in-the-loop checkpoint #2 — the graph is interrupted here.
+    """Human-in-the-loop checkpoint #2 — the graph pauses here.
 
-    The bot sends a Final Approval Adaptive Card.
-    The graph resumes with status="approved" + approval_timestamp when the
-    user clicks "Ellenőriztem és jóváhagyom".
+    The bot sends a Final Approval Adaptive Card; the graph resumes with
+    status="approved" + approval_timestamp when the user clicks
+    "Ellenőriztem és jóváhagyom".  A draft already approved at the review
+    step (the final approval card resumes that pause) passes straight on.
     """
-    return {**state, "status": "approved"}
+    if state.get("status") == "approved" and state.get("approval_timestamp"):
+        return state
+    decision = interrupt({"step": "approve"})
+    return {**state, "status": "review_needed", **decision}
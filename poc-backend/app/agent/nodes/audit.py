@@ -1,8 +1,10 @@
 import logging
 from datetime import datetime, timezone
 
+from langchain_core.runnables import RunnableConfig
+
 from app.agent.state import AgentState
-from app.services.cosmos_db import AuditStore
+from app.services.container import get_services
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +21,16 @@ def _resolve_event_type(status: str) -> str:
     return _STATUS_TO_EVENT_TYPE.get(status, "twi_generated")
 
 
-async def audit_node(state: AgentState) -> AgentState:
-    """Write an immutable audit log entry to Cosmos DB (EU AI Act compliance)."""
+async def audit_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> AgentState:
+    """Record an immutable audit log entry (EU AI Act compliance).
+
+    The entry is journaled locally before returning and reaches Cosmos DB via
+    the background audit writer, so the user's result does not wait on it.
+    """
     try:
-        audit_store = AuditStore()
-        await audit_store.log(
+        await get_services(config).audit_writer.log(
             {
                 "conversation_id": state["conversation_id"],
                 "user_id": state["user_id"],
@@ -38,6 +45,7 @@ async def audit_node(state: AgentState) -> AgentState:
                 "pdf_blob_name": state.get("pdf_blob_name"),
                 "status": state["status"],
                 "approval_timestamp": state.get("approval_timestamp"),
+                "timings": state.get("timings"),
                 "created_at": datetime.now(timezone.utc).isoformat(),
             }
         )
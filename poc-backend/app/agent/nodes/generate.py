@@ -37,6 +37,21 @@ _TWI_GENERATE_PROMPT = (
 
 _EU_AI_ACT_LABEL = "⚠️ AI által generált tartalom — emberi felülvizsgálat szükséges."
 
+_REFERENCE_CONTEXT = (
+    "\nMEGLÉVŐ, JÓVÁHAGYOTT UTASÍTÁS ({title}):\n{content}"
+    "\n\nEz egy korábban jóváhagyott utasítás ugyanerre a gépre / folyamatra. "
+    "Ezt módosítsd a kérés alapján: a továbbra is helyes részeket hagyd "
+    "változatlanul, és csak azt írd át, amit a kérés érint."
+)
+
+# A reference for another process on the machine (see ReferenceTwi.same_process).
+_STYLE_REFERENCE_CONTEXT = (
+    "\nMINTA, EGY MÁSIK FOLYAMAT JÓVÁHAGYOTT UTASÍTÁSA ({title}):\n{content}"
+    "\n\nEz nem a kért folyamat utasítása, ne módosítsd és ne vedd át a "
+    "lépéseit: csak a felépítést, a szóhasználatot és a részletességet kövesd, "
+    "a tartalmat a kérés alapján írd meg."
+)
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
@@ -46,12 +61,22 @@ async def generate_node(state: AgentState) -> AgentState:
     """Generate (or revise) a TWI document draft via LLM."""
     try:
         revision_context = ""
+        reference = (state.get("processed_input") or {}).get("reference_document")
         if state.get("revision_feedback"):
             revision_context = (
                 f"\nKORABBI VÁZLAT:\n{state.get('draft', '')}"
                 f"\n\nFELHASZNÁLÓI VISSZAJELZÉS:\n{state['revision_feedback']}"
                 f"\n\nMódosítsd a vázlatot a visszajelzés alapján."
             )
+        elif reference:
+            revise = (
+                reference.get("same_process", True) or state.get("intent") == "edit_twi"
+            )
+            template = _REFERENCE_CONTEXT if revise else _STYLE_REFERENCE_CONTEXT
+            revision_context = template.format(
+                title=reference["title"],
+                content=reference["content"].removeprefix(_EU_AI_ACT_LABEL).strip(),
+            )
 
         response, in_tokens, out_tokens = await call_llm(
             system_prompt=_TWI_SYSTEM_PROMPT,
@@ -76,6 +101,7 @@ async def generate_node(state: AgentState) -> AgentState:
                 "model": settings.ai_model,
                 "generated_at": _now_iso(),
                 "revision": state.get("revision_count", 0),
+                "based_on_document_id": reference["document_id"] if reference else None,
             },
             "llm_model": settings.ai_model,
             "llm_tokens_input": current_in + in_tokens,
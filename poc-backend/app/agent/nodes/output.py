@@ -2,16 +2,21 @@ import uuid
 import logging
 from datetime import datetime, timezone
 
+from langchain_core.runnables import RunnableConfig
+
 from app.agent.state import AgentState
 from app.agent.tools.pdf_generator import generate_twi_pdf, extract_title
 from app.config import settings
 from app.services.blob_storage import upload_pdf
-from app.services.cosmos_db import DocumentStore
+from app.services.container import get_services
+from app.services.download_links import build_download_url
 
 logger = logging.getLogger(__name__)
 
 
-async def output_node(state: AgentState) -> AgentState:
+async def output_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> AgentState:
     """Generate the TWI PDF and upload it to Blob Storage."""
     try:
         pdf_bytes = await generate_twi_pdf(
@@ -26,22 +31,31 @@ async def output_node(state: AgentState) -> AgentState:
         logger.info("PDF generated and uploaded: blob_name=%s", blob_name)
 
         title = extract_title(state["draft"])
+        document_id = uuid.uuid4().hex
+        processed = state.get("processed_input") or {}
+        download_url = None
 
         try:
-            doc_store = DocumentStore()
-            await doc_store.save(
+            await get_services(config).documents.save(
                 {
-                    "document_id": uuid.uuid4().hex,
+                    "document_id": document_id,
                     "conversation_id": state["conversation_id"],
                     "user_id": state["user_id"],
                     "tenant_id": state.get("tenant_id") or settings.default_tenant_id,
                     "title": title,
                     "content_type": "twi",
+                    # Search keys for DocumentStore.search
+                    "machine_id": processed.get("extracted_machine_id"),
+                    "process_type": (processed.get("process_types") or [None])[0],
+                    "department": processed.get("department"),
                     "draft_content": state["draft"],
                     "pdf_blob_name": blob_name,
                     "pdf_url": pdf_url,
                     "llm_model": state.get("draft_metadata", {}).get("model", "gpt-4o"),
                     "revision_count": state.get("revision_count", 0),
+                    "based_on_document_id": state.get("draft_metadata", {}).get(
+                        "based_on_document_id"
+                    ),
                     "status": "approved",
                     "approved_at": state.get("approval_timestamp")
                     or datetime.now(timezone.utc).isoformat(),
@@ -52,6 +66,9 @@ async def output_node(state: AgentState) -> AgentState:
                 "Document saved to Cosmos DB: conversation_id=%s",
                 state["conversation_id"],
             )
+            # The download endpoint resolves the document by id, so only
+            # hand out the stable link once the metadata row exists.
+            download_url = build_download_url(document_id)
         except Exception as exc:
             # PDF was uploaded successfully — log the DB failure but don't lose the PDF URL
             logger.error(
@@ -65,6 +82,8 @@ async def output_node(state: AgentState) -> AgentState:
             "title": title,
             "pdf_url": pdf_url,
             "pdf_blob_name": blob_name,
+            "document_id": document_id,
+            "download_url": download_url,
             "status": "completed",
         }
     except Exception as exc:
@@ -2,8 +2,12 @@ import json
 import logging
 import re
 
+from langchain_core.runnables import RunnableConfig
+
 from app.agent.state import AgentState
+from app.config import settings
 from app.services.ai_foundry import call_llm
+from app.services.container import get_services
 
 logger = logging.getLogger(__name__)
 
@@ -58,11 +62,15 @@ async def _llm_extract(message: str) -> tuple[dict, int, int]:
     return parsed, in_tokens, out_tokens
 
 
-async def process_input_node(state: AgentState) -> AgentState:
+async def process_input_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> AgentState:
     """Structure and validate the user's TWI generation request.
 
     Uses regex for fast extraction and LLM for richer structured extraction.
-    Falls back gracefully to regex-only if LLM is unavailable.
+    Falls back gracefully to regex-only if LLM is unavailable.  The closest
+    approved TWI, if any, is attached as ``reference_document`` for
+    ``generate_node`` to revise.
     """
     message = state.get("message", "")
 
@@ -91,8 +99,28 @@ async def process_input_node(state: AgentState) -> AgentState:
         "department": llm_fields.get("department"),
         "safety_concerns": llm_fields.get("safety_concerns", []),
         "summary": llm_fields.get("summary"),
+        "reference_document": None,
     }
 
+    try:
+        reference = await get_services(config).retriever.find_reference(
+            tenant_id=state.get("tenant_id") or settings.default_tenant_id,
+            message=message,
+            machine_id=processed["extracted_machine_id"],
+            process_type=(processed["process_types"] or [None])[0],
+            edit_requested=state.get("intent") == "edit_twi",
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Reference TWI lookup failed, generating from scratch: %s", exc)
+        reference = None
+    if reference is not None:
+        processed["reference_document"] = {
+            "document_id": reference.document_id,
+            "title": reference.title,
+            "content": reference.content,
+            "same_process": reference.same_process,
+        }
+
     current_in = state.get("llm_tokens_input") or 0
     current_out = state.get("llm_tokens_output") or 0
 
@@ -1,13 +1,15 @@
+from langgraph.types import interrupt
+
 from app.agent.state import AgentState
 
 
 async def review_node(state: AgentState) -> AgentState:
-    """Human-in-the-loop checkpoint #1 — the graph is interrupted here.
+    """Human-in-the-loop checkpoint #1 — the graph pauses here.
 
-    The bot sends a Review Adaptive Card to the user.
-    The graph resumes when the user submits the card action
-    (approve_draft / request_edit / reject).
+    The bot sends a Review Adaptive Card; the user's decision (approve_draft /
+    request_edit / reject) comes back as ``Command(resume=<state patch>)``
+    and is applied here, so resuming costs a single graph invocation.  See
+    ``app.agent.graph._build_resume_state`` for the patches.
     """
-    # Node body is intentionally minimal — the actual logic runs in the bot handler
-    # after the graph is resumed.  We just make the status explicit.
-    return {**state, "status": "review_needed"}
+    decision = interrupt({"step": "review"})
+    return {**state, "status": "review_needed", **decision}
@@ -1,19 +1,22 @@
 import logging
 from datetime import datetime, timezone
 
+from langchain_core.runnables import RunnableConfig
+
 from app.agent.state import AgentState
-from app.services.cosmos_db import AuditStore
+from app.services.container import get_services
 
 logger = logging.getLogger(__name__)
 
 
-async def revise_node(state: AgentState) -> AgentState:
+async def revise_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> AgentState:
     """Increment the revision counter and carry user feedback into the next generate cycle."""
     revision_count = state.get("revision_count", 0) + 1
 
     try:
-        audit_store = AuditStore()
-        await audit_store.log(
+        await get_services(config).audit_writer.log(
             {
                 "conversation_id": state["conversation_id"],
                 "user_id": state["user_id"],
@@ -19,17 +19,25 @@ class AgentState(TypedDict):
     # Revision loop
     revision_feedback: Optional[str]
     revision_count: int
+    # Set when the user asked to revise without feedback (Telegram "módosítás");
+    # the next message is then taken as the feedback.
+    awaiting_revision_feedback: bool
 
     # Output
     status: str  # "processing" | "review_needed" | "revision_requested" | "approved" | "completed" | "error"
     pdf_url: Optional[str]
     pdf_blob_name: Optional[str]
+    document_id: Optional[str]
+    download_url: Optional[str]  # stable /documents/{id}/download link, if configured
 
     # Audit / telemetry
     llm_model: Optional[str]
     llm_tokens_input: Optional[int]
     llm_tokens_output: Optional[int]
     approval_timestamp: Optional[str]
+    # Latency ledger of the current turn in ms: node.<name>, llm, render,
+    # upload, store, queue_wait, total (see app.services.latency)
+    timings: Optional[dict]
 
     # Message history (LangGraph internal)
     messages: list[Any]
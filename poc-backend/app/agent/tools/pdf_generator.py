@@ -1,16 +1,144 @@
-"""PDF generation pipeline: TWI text → Jinja2 HTML → WeasyPrint PDF bytes."""
+"""PDF generation pipeline: TWI text → Jinja2 HTML → WeasyPrint PDF bytes.
 
+Render resources (compiled template, parsed stylesheet, font configuration and
+the Markdown converter) are built once and reused across renders.  Call
+:func:`warm_up_renderer` at startup so the first user does not pay for them.
+"""
+
+import logging
 from datetime import datetime, timezone
+from pathlib import Path
 
 import markdown as md
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+from jinja2 import Environment, FileSystemLoader, Template
+from weasyprint import CSS, HTML
+from weasyprint.document import Document
+from weasyprint.text.fonts import FontConfiguration
+
+from app.config import settings
+from app.services import latency, metrics
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Resolved relative to this file so rendering works from any working directory.
+_TEMPLATES_DIR = Path(__file__).resolve().parent.parent.parent / "templates"
+_TEMPLATE_NAME = "twi_template.html"
+_STYLESHEET_NAME = "twi_template.css"
+
+# ``write_pdf()`` option sets selectable via ``PDF_OUTPUT_PROFILE``.
+# Font subsetting (``full_fonts=False``), ``hinting=False`` and stream
+# compression (``uncompressed_pdf=False``) equal WeasyPrint 70's defaults;
+# they are pinned so a default change cannot silently inflate the files.
+# The image options only take effect once the template embeds images, so
+# today the profiles differ in practice only by ``pdf_variant``.
+PDF_OUTPUT_PROFILES: dict[str, dict] = {
+    # Smallest files for chat delivery (Teams / Telegram on phones)
+    "compact": {
+        "full_fonts": False,
+        "hinting": False,
+        "uncompressed_pdf": False,
+        "optimize_images": True,
+        "jpeg_quality": 75,
+        "dpi": 150,
+    },
+    # Print-quality images, still subset and compressed
+    "standard": {
+        "full_fonts": False,
+        "hinting": False,
+        "uncompressed_pdf": False,
+        "optimize_images": True,
+        "jpeg_quality": 90,
+        "dpi": 300,
+    },
+    # PDF/A-3b for long-term archival of approved instructions
+    "archival": {
+        "full_fonts": False,
+        "hinting": False,
+        "uncompressed_pdf": False,
+        "optimize_images": True,
+        "jpeg_quality": 90,
+        "dpi": 300,
+        "pdf_variant": "pdf/a-3b",
+    },
+}
 
 _template_env = Environment(
-    loader=FileSystemLoader("app/templates"),
+    loader=FileSystemLoader(str(_TEMPLATES_DIR)),
     autoescape=False,  # HTML is trusted — generated by the system
 )
 
+_template: Template | None = None
+_font_config: FontConfiguration | None = None
+_stylesheet: CSS | None = None
+_markdown: md.Markdown | None = None
+
+
+def _get_template() -> Template:
+    global _template
+    if _template is None:
+        _template = _template_env.get_template(_TEMPLATE_NAME)
+    return _template
+
+
+def _get_font_config() -> FontConfiguration:
+    global _font_config
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def _get_stylesheet() -> CSS:
+    global _stylesheet
+    if _stylesheet is None:
+        _stylesheet = CSS(
+            filename=str(_TEMPLATES_DIR / _STYLESHEET_NAME),
+            font_config=_get_font_config(),
+        )
+    return _stylesheet
+
+
+def _get_markdown() -> md.Markdown:
+    global _markdown
+    if _markdown is None:
+        _markdown = md.Markdown(extensions=["tables", "fenced_code"])
+    return _markdown
+
+
+def _render_markdown(content: str) -> str:
+    """Markdown → HTML using the shared converter (reset between documents)."""
+    return _get_markdown().reset().convert(content)
+
+
+def resolve_output_profile(profile: str | None = None) -> dict:
+    """Return the ``write_pdf()`` options for ``profile`` (default: ``settings.pdf_output_profile``).
+
+    Raises:
+        ValueError: If the profile name is not one of ``PDF_OUTPUT_PROFILES``.
+    """
+    name = profile or settings.pdf_output_profile
+    try:
+        return PDF_OUTPUT_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown PDF output profile: {name!r}. "
+            f"Expected one of {sorted(PDF_OUTPUT_PROFILES)}."
+        ) from None
+
+
+def warm_up_renderer() -> None:
+    """Compile the template and parse the stylesheet and fonts ahead of the first render.
+
+    A one-line draft is also laid out, which loads the fonts and the text
+    shaping libraries that only the first real layout would otherwise pay for.
+    """
+    resolve_output_profile()
+    _get_template()
+    _get_stylesheet()
+    _get_markdown()
+    render_twi_document(render_twi_html("# Warm-up", {}, "warm-up"))
+    logger.info("PDF renderer warmed up: templates_dir=%s", _TEMPLATES_DIR)
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
@@ -25,32 +153,21 @@ def extract_title(content: str) -> str:
     return "TWI Munkautasítás"
 
 
-async def generate_twi_pdf(
+def render_twi_html(
     content: str,
     metadata: dict,
     user_id: str,
     approval_timestamp: str | None = None,
-) -> bytes:
-    """Convert a TWI draft string into a formatted A4 PDF.
-
-    Args:
-        content: The full TWI markdown text (including EU AI Act label).
-        metadata: Draft metadata dict (model, generated_at, revision).
-        user_id: The approving user's ID shown in the approval box.
-        approval_timestamp: ISO 8601 approval timestamp, or None.
-
-    Returns:
-        PDF as raw bytes.
-    """
+) -> str:
+    """Render a TWI draft into the full HTML document handed to WeasyPrint."""
     # Markdown → HTML (supports fenced code blocks and tables)
-    content_html = md.markdown(content, extensions=["tables", "fenced_code"])
+    content_html = _render_markdown(content)
 
     approved_at = approval_timestamp or datetime.now(timezone.utc).strftime(
         "%Y-%m-%d %H:%M UTC"
     )
 
-    template = _template_env.get_template("twi_template.html")
-    html_content = template.render(
+    return _get_template().render(
         title=extract_title(content),
         generated_at=metadata.get("generated_at", "N/A"),
         model=metadata.get("model", "N/A"),
@@ -61,5 +178,42 @@ async def generate_twi_pdf(
         approved_at=approved_at,
     )
 
-    pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+
+def render_twi_document(html_content: str) -> Document:
+    """Lay out rendered HTML with the shared stylesheet (exposes page count)."""
+    return HTML(string=html_content).render(
+        stylesheets=[_get_stylesheet()],
+        font_config=_get_font_config(),
+    )
+
+
+@traced("pdf render")
+async def generate_twi_pdf(
+    content: str,
+    metadata: dict,
+    user_id: str,
+    approval_timestamp: str | None = None,
+    profile: str | None = None,
+) -> bytes:
+    """Convert a TWI draft string into a formatted A4 PDF.
+
+    Args:
+        content: The full TWI markdown text (including EU AI Act label).
+        metadata: Draft metadata dict (model, generated_at, revision).
+        user_id: The approving user's ID shown in the approval box.
+        approval_timestamp: ISO 8601 approval timestamp, or None.
+        profile: Output profile name from ``PDF_OUTPUT_PROFILES``; defaults to
+            ``settings.pdf_output_profile``.
+
+    Returns:
+        PDF as raw bytes.
+    """
+    options = resolve_output_profile(profile)
+    with metrics.timed(metrics.PDF_RENDER_LATENCY), latency.timed("render"):
+        html_content = render_twi_html(content, metadata, user_id, approval_timestamp)
+        pdf_bytes: bytes = HTML(string=html_content).write_pdf(
+            stylesheets=[_get_stylesheet()],
+            font_config=_get_font_config(),
+            **options,
+        )
     return pdf_bytes
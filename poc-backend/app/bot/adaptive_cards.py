@@ -8,7 +8,17 @@ _VERSION = "1.4"
 MAX_DRAFT_DISPLAY_LENGTH = 2000
 
 
-def create_review_card(draft: str, metadata: dict) -> dict:
+def _action_data(action: str, ref: dict, **extra) -> dict:
+    """Action.Submit payload: the action plus a reference to the draft.
+
+    ``ref`` (conversation id, checkpoint id, draft hash — see
+    ``app.agent.graph.draft_reference``) lets the server load the draft from
+    the checkpoint, so the draft is never round-tripped through the card.
+    """
+    return {"action": action, **ref, **extra}
+
+
+def create_review_card(draft: str, metadata: dict, ref: dict) -> dict:
     """Human-in-the-loop #1 — draft review card with approve / edit / reject actions."""
     model = metadata.get("model", "N/A")
     generated_at = metadata.get("generated_at", "N/A")
@@ -61,32 +71,24 @@ def create_review_card(draft: str, metadata: dict) -> dict:
                 "type": "Action.Submit",
                 "title": t("card.review.approve_btn"),
                 "style": "positive",
-                "data": {
-                    "action": "approve_draft",
-                    "draft": draft,
-                    "metadata": metadata,
-                },
+                "data": _action_data("approve_draft", ref),
             },
             {
                 "type": "Action.Submit",
                 "title": t("card.review.edit_btn"),
-                "data": {
-                    "action": "request_edit",
-                    "draft": draft,
-                    "metadata": metadata,
-                },
+                "data": _action_data("request_edit", ref),
             },
             {
                 "type": "Action.Submit",
                 "title": t("card.review.reject_btn"),
                 "style": "destructive",
-                "data": {"action": "reject"},
+                "data": _action_data("reject", ref),
             },
         ],
     }
 
 
-def create_approval_card(draft: str, metadata: dict) -> dict:
+def create_approval_card(draft: str, ref: dict) -> dict:
     """Human-in-the-loop #2 — mandatory final approval card."""
     return {
         "$schema": _SCHEMA,
@@ -118,28 +120,19 @@ def create_approval_card(draft: str, metadata: dict) -> dict:
                 "type": "Action.Submit",
                 "title": t("card.approval.confirm_btn"),
                 "style": "positive",
-                "data": {
-                    "action": "final_approve",
-                    "draft": draft,
-                    "metadata": metadata,
-                },
+                "data": _action_data("final_approve", ref),
             },
             {
                 "type": "Action.Submit",
                 "title": t("card.approval.back_btn"),
-                "data": {
-                    "action": "request_edit",
-                    "source": "approval",
-                    "draft": draft,
-                    "metadata": metadata,
-                },
+                "data": _action_data("request_edit", ref, source="approval"),
             },
         ],
     }
 
 
 def create_result_card(pdf_url: str, document_title: str, metadata: dict) -> dict:
-    """Result card with PDF download link (24-hour SAS URL)."""
+    """Result card with PDF download link (download endpoint or SAS URL)."""
     return {
         "$schema": _SCHEMA,
         "type": "AdaptiveCard",
@@ -0,0 +1,144 @@
+"""Bot Framework request authentication: one validation per token, warm signing keys.
+
+Azure Bot Service sends the same bearer token on every activity until it
+expires (about an hour), and the SDK would fully validate it twice per
+message — once in ``/api/messages`` and again in
+``adapter.process_activity``.  :class:`BotAuthenticator` validates it once,
+caches the resulting claims until the token's ``exp`` and hands them to
+``adapter.process_activity_with_identity``.
+
+The SDK fetches OpenID metadata and signing keys lazily, with blocking
+``requests`` calls on the request path, once a day.  :meth:`start` fetches
+them before the first request and a background task refreshes them, so no
+message ever waits for the metadata endpoint.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import requests
+from botbuilder.schema import Activity
+from botframework.connector.auth import (
+    AuthenticationConstants,
+    ChannelValidation,
+    ClaimsIdentity,
+    JwtTokenExtractor,
+    JwtTokenValidation,
+    SimpleCredentialProvider,
+)
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_CACHE_SIZE = 1_000
+_METADATA_TIMEOUT_SECONDS = 10.0
+
+
+def _metadata_urls() -> tuple[str, ...]:
+    return (
+        ChannelValidation.open_id_metadata_endpoint
+        or AuthenticationConstants.TO_BOT_FROM_CHANNEL_OPENID_METADATA_URL,
+        AuthenticationConstants.TO_BOT_FROM_EMULATOR_OPENID_METADATA_URL,
+    )
+
+
+def _fetch_signing_keys(metadata_url: str) -> list[dict]:
+    response = requests.get(metadata_url, timeout=_METADATA_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    keys = requests.get(response.json()["jwks_uri"], timeout=_METADATA_TIMEOUT_SECONDS)
+    keys.raise_for_status()
+    return keys.json()["keys"]
+
+
+class BotAuthenticator:
+    def __init__(
+        self,
+        app_id: str | None = None,
+        app_password: str | None = None,
+        refresh_interval: float | None = None,
+    ) -> None:
+        self.credentials = SimpleCredentialProvider(
+            settings.bot_app_id if app_id is None else app_id,
+            settings.bot_app_password if app_password is None else app_password,
+        )
+        self.refresh_interval = (
+            refresh_interval or settings.bot_signing_key_refresh_hours * 3600
+        )
+        # token hash → (claims, exp as a UNIX timestamp)
+        self._cache: OrderedDict[str, tuple[ClaimsIdentity, float]] = OrderedDict()
+        self._stop = asyncio.Event()
+        self._refresher: asyncio.Task | None = None
+
+    @staticmethod
+    def _cache_key(activity: Activity, auth_header: str) -> str:
+        # Claims are checked against the activity's channel (endorsements)
+        # and service URL, so those are part of what was validated.
+        material = f"{auth_header}\n{activity.channel_id}\n{activity.service_url}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def authenticate(
+        self, activity: Activity, auth_header: str
+    ) -> ClaimsIdentity:
+        """Claims of a valid request; raises ``PermissionError`` otherwise."""
+        key = self._cache_key(activity, auth_header)
+        cached = self._cache.get(key)
+        if cached is not None:
+            claims, expires = cached
+            if expires > time.time():
+                self._cache.move_to_end(key)
+                return claims
+            del self._cache[key]
+
+        claims = await JwtTokenValidation.authenticate_request(
+            activity, auth_header, self.credentials, ""
+        )
+        if not claims.is_authenticated:
+            raise PermissionError("Request is not authenticated")
+        expires = (claims.claims or {}).get("exp")
+        if expires:
+            self._cache[key] = (claims, float(expires))
+            while len(self._cache) > _TOKEN_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return claims
+
+    async def refresh_signing_keys(self) -> None:
+        """Fetch OpenID metadata and signing keys into the SDK's key cache."""
+        for url in _metadata_urls():
+            try:
+                keys = await asyncio.to_thread(_fetch_signing_keys, url)
+            except Exception as exc:  # noqa: BLE001
+                # The SDK still fetches on demand; stale keys beat no keys.
+                logger.warning("Signing key refresh failed for %s: %s", url, exc)
+                continue
+            metadata = JwtTokenExtractor.get_open_id_metadata(url)
+            metadata.keys = keys
+            metadata.last_updated = datetime.now()
+            logger.info("Signing keys refreshed from %s (%d keys)", url, len(keys))
+
+    async def start(self) -> None:
+        """Prefetch the signing keys and keep them fresh in the background."""
+        if await self.credentials.is_authentication_disabled():
+            return  # No app id: local development, nothing to validate.
+        await self.refresh_signing_keys()
+        self._stop.clear()
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        # Stopped through ``_stop``, never cancelled (see AuditWriter._flush_loop).
+        while not self._stop.is_set():
+            try:
+                async with asyncio.timeout(self.refresh_interval):
+                    await self._stop.wait()
+            except TimeoutError:
+                await self.refresh_signing_keys()
+
+    async def aclose(self) -> None:
+        self._stop.set()
+        if self._refresher is not None:
+            await self._refresher
+            self._refresher = None
@@ -1,10 +1,17 @@
 import logging
+import time
 from datetime import datetime, timezone
 
 from botbuilder.core import ActivityHandler, TurnContext, CardFactory
 from botbuilder.schema import Activity, ActivityTypes
 
-from app.agent.graph import run_agent
+from app.agent.graph import (
+    await_revision_feedback,
+    draft_reference,
+    load_draft_state,
+    run_agent,
+)
+from app.bot.progress import ProgressMessage
 from app.bot.adaptive_cards import (
     create_review_card,
     create_approval_card,
@@ -12,7 +19,9 @@ from app.bot.adaptive_cards import (
     create_welcome_card,
 )
 from app.locale import t
-from app.services.cosmos_db import ConversationStore, PendingStateStore
+from app.services import latency, tracing
+from app.services.container import ServiceContainer, get_services
+from app.services.turn_guard import ConversationBusyError, activity_keys, card_key
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +62,17 @@ def _format_telegram_approval(draft: str, metadata: dict) -> str:
     return text
 
 
+_CARD_REF_KEYS = ("conversation_id", "checkpoint_id", "draft_hash")
+
+# Card actions that act on the draft the card was showing.
+_DRAFT_ACTIONS = {"approve_draft", "request_edit", "final_approve", "reject"}
+
+
+def _result_link(result: dict) -> str:
+    """Link shown on result cards — the stable download endpoint when available."""
+    return result.get("download_url") or result.get("pdf_url") or "#"
+
+
 def _format_telegram_result(pdf_url: str, document_title: str, metadata: dict) -> str:
     """Format result message for Telegram as plain text."""
     approved_by = metadata.get("approved_by", t("telegram.result.approved_by_default"))
@@ -64,18 +84,16 @@ def _format_telegram_result(pdf_url: str, document_title: str, metadata: dict) -
 
 
 class AgentizeBotHandler(ActivityHandler):
-    def __init__(self) -> None:
-        self.graph = None
-        self.conversation_store = ConversationStore()
-        self._pending_state = PendingStateStore()
+    def __init__(self, services: ServiceContainer | None = None) -> None:
+        self._services = services
 
-    async def _get_graph(self):
-        """Lazy initialization of the graph."""
-        if self.graph is None:
-            from app.agent.graph import get_graph
+    @property
+    def services(self) -> ServiceContainer:
+        """The injected container, else the one installed by the app lifespan."""
+        return self._services or get_services()
 
-            self.graph = await get_graph()
-        return self.graph
+    async def _get_graph(self):
+        return await self.services.get_graph()
 
     # ------------------------------------------------------------------
     # Activity routing
@@ -95,7 +113,47 @@ class AgentizeBotHandler(ActivityHandler):
             text,
         )
 
-        await self.conversation_store.get_or_create(
+        with (
+            latency.turn(),
+            tracing.conversation(conversation_id),
+            tracing.tracer.start_as_current_span(
+                "bot turn",
+                attributes={
+                    "agentize.channel": channel_id,
+                    "agentize.card_action": isinstance(value, dict),
+                },
+            ),
+        ):
+            keys = activity_keys(turn_context.activity)
+            if not await self.services.activities.claim(keys):
+                logger.info("Dropping duplicate activity %s", keys)
+                return
+
+            try:
+                waiting = time.perf_counter()
+                async with self.services.leases.hold(conversation_id):
+                    latency.record("queue_wait", time.perf_counter() - waiting)
+                    await self._dispatch(
+                        turn_context, text, value, conversation_id, user_id, channel_id
+                    )
+            except ConversationBusyError:
+                await self.services.activities.release(keys)
+                await turn_context.send_activity(t("bot.busy"))
+            except BaseException:
+                # Let Bot Service's redelivery of a failed turn run again.
+                await self.services.activities.release(keys)
+                raise
+
+    async def _dispatch(
+        self,
+        turn_context: TurnContext,
+        text: str,
+        value,
+        conversation_id: str,
+        user_id: str,
+        channel_id: str,
+    ) -> None:
+        await self.services.conversations.record_activity(
             conversation_id=conversation_id,
             user_id=user_id,
             channel=channel_id,
@@ -137,11 +195,14 @@ class AgentizeBotHandler(ActivityHandler):
     ) -> None:
         is_telegram = _is_telegram_channel(channel_id)
 
-        await turn_context.send_activity(t("bot.processing"))
+        progress = ProgressMessage(turn_context)
+        await progress.start(t("bot.processing"))
 
         try:
             result = await run_agent(
                 graph=await self._get_graph(),
+                services=self.services,
+                on_progress=progress.node_finished,
                 message=text,
                 user_id=user_id,
                 conversation_id=conversation_id,
@@ -159,11 +220,7 @@ class AgentizeBotHandler(ActivityHandler):
             return
 
         if status == "review_needed":
-            card = create_review_card(
-                draft=result.get("draft", ""),
-                metadata=result.get("draft_metadata", {}),
-            )
-            await self._send_card(turn_context, card)
+            await self._send_review_card(turn_context, result, conversation_id)
 
         elif status == "clarification_needed":
             clarify_msg = result.get("draft") or t("bot.clarify_fallback")
@@ -216,34 +273,13 @@ class AgentizeBotHandler(ActivityHandler):
         conversation_id: str,
         user_id: str,
     ) -> None:
-        """Handle text responses from Telegram users for approvals."""
-        text_lower = text.lower().strip()
+        """Handle text responses from Telegram users for approvals.
 
-        if await self._pending_state.pop_flag(conversation_id, "pending_revision"):
-            await turn_context.send_activity(t("telegram.revision_processing"))
-            try:
-                result = await run_agent(
-                    graph=await self._get_graph(),
-                    message=text,
-                    user_id=user_id,
-                    conversation_id=conversation_id,
-                    resume_from="revision",
-                    context={"feedback": text},
-                    as_node="review",
-                )
-            except Exception as exc:
-                logger.error("Telegram revision error: %s", exc, exc_info=True)
-                await turn_context.send_activity(
-                    t("telegram.revision_error", error=exc)
-                )
-                return
-
-            reply = _format_telegram_review(
-                result.get("draft", ""),
-                result.get("draft_metadata", {}),
-            )
-            await turn_context.send_activity(reply)
-            return
+        Anything that is not a command goes to the graph as a new message;
+        after a bare "módosítás" the graph itself treats it as revision
+        feedback (see ``start_node``), so no lookup happens here.
+        """
+        text_lower = text.lower().strip()
 
         if text_lower in [
             "igen",
@@ -255,18 +291,20 @@ class AgentizeBotHandler(ActivityHandler):
             "approve",
             "approved",
         ]:
-            await turn_context.send_activity(t("telegram.approval_processing"))
+            progress = ProgressMessage(turn_context)
+            await progress.start(t("telegram.approval_processing"))
             timestamp = datetime.now(timezone.utc).isoformat()
 
             try:
                 result = await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
+                    on_progress=progress.node_finished,
                     message="",
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="output",
                     context={"timestamp": timestamp},
-                    as_node="approve",
                 )
             except Exception as exc:
                 logger.error("Agent output error: %s", exc, exc_info=True)
@@ -279,7 +317,7 @@ class AgentizeBotHandler(ActivityHandler):
             metadata["approved_by"] = user_id
 
             text = _format_telegram_result(
-                result.get("pdf_url", "#"),
+                _result_link(result),
                 result.get("title", t("card.title_default")),
                 metadata,
             )
@@ -298,37 +336,37 @@ class AgentizeBotHandler(ActivityHandler):
             try:
                 await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
                     message="",
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="rejection",
-                    as_node="review",
                 )
             except Exception as exc:
                 logger.error("Rejection audit failed: %s", exc, exc_info=True)
 
         elif text_lower in ["modositas", "change", "modify", "revise"]:
-            await self._pending_state.set_flag(conversation_id, "pending_revision")
-            await turn_context.send_activity(t("telegram.revision_prompt"))
+            await self._await_revision_feedback(turn_context, conversation_id)
 
         elif text_lower.startswith(
             ("modositas:", "módosítás:", "change:", "modify:", "revise:")
         ):
             feedback = text.split(":", 1)[1].strip()
             if not feedback:
-                await self._pending_state.set_flag(conversation_id, "pending_revision")
-                await turn_context.send_activity(t("telegram.revision_prompt"))
+                await self._await_revision_feedback(turn_context, conversation_id)
                 return
-            await turn_context.send_activity(t("telegram.revision_processing"))
+            progress = ProgressMessage(turn_context)
+            await progress.start(t("telegram.revision_processing"))
             try:
                 result = await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
+                    on_progress=progress.node_finished,
                     message=feedback,
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="revision",
                     context={"feedback": feedback},
-                    as_node="review",
                 )
             except Exception as exc:
                 logger.error("Telegram revision error: %s", exc, exc_info=True)
@@ -347,6 +385,17 @@ class AgentizeBotHandler(ActivityHandler):
                 turn_context, text, conversation_id, user_id, "telegram"
             )
 
+    async def _await_revision_feedback(
+        self, turn_context: TurnContext, conversation_id: str
+    ) -> None:
+        try:
+            await await_revision_feedback(await self._get_graph(), conversation_id)
+        except Exception as exc:
+            logger.error("Telegram revision error: %s", exc, exc_info=True)
+            await turn_context.send_activity(t("telegram.revision_error", error=exc))
+            return
+        await turn_context.send_activity(t("telegram.revision_prompt"))
+
     # ------------------------------------------------------------------
     # Adaptive Card action -> LangGraph resume
     # ------------------------------------------------------------------
@@ -362,22 +411,48 @@ class AgentizeBotHandler(ActivityHandler):
         is_telegram = _is_telegram_channel(channel_id)
         action = value.get("action")
 
+        if action in _DRAFT_ACTIONS:
+            # The card carries only a reference; the draft comes from the
+            # checkpoint, and a card for an outdated draft is refused.
+            if value.get("conversation_id", conversation_id) != conversation_id:
+                logger.warning(
+                    "Card action for another conversation ignored: %s",
+                    value.get("conversation_id"),
+                )
+                await turn_context.send_activity(t("card.stale"))
+                return
+            try:
+                state = await load_draft_state(
+                    await self._get_graph(), conversation_id, value
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Draft state load failed: %s", exc, exc_info=True)
+                await self._allow_retry(turn_context)
+                await turn_context.send_activity(t("card.error", error=exc))
+                return
+            if state is None:
+                await turn_context.send_activity(t("card.stale"))
+                return
+
         if action == "approve_draft":
             if is_telegram:
-                await turn_context.send_activity(t("card.approve_processing"))
+                progress = ProgressMessage(turn_context)
+                await progress.start(t("card.approve_processing"))
                 timestamp = datetime.now(timezone.utc).isoformat()
                 try:
                     result = await run_agent(
                         graph=await self._get_graph(),
+                        services=self.services,
+                        on_progress=progress.node_finished,
                         message="",
                         user_id=user_id,
                         conversation_id=conversation_id,
                         resume_from="output",
                         context={"timestamp": timestamp},
-                        as_node="approve",
                     )
                 except Exception as exc:
                     logger.error("Agent output error: %s", exc, exc_info=True)
+                    await self._allow_retry(turn_context)
                     await turn_context.send_activity(t("card.error", error=exc))
                     return
 
@@ -385,36 +460,41 @@ class AgentizeBotHandler(ActivityHandler):
                 metadata["approved_by"] = user_id
 
                 text = _format_telegram_result(
-                    result.get("pdf_url", "#"),
+                    _result_link(result),
                     result.get("title", t("card.title_default")),
                     metadata,
                 )
                 await turn_context.send_activity(text)
             else:
-                card = create_approval_card(
-                    draft=value.get("draft", ""),
-                    metadata=value.get("metadata", {}),
-                )
+                if value.get("draft_hash"):
+                    ref = {key: value.get(key) for key in _CARD_REF_KEYS}
+                else:
+                    ref = await draft_reference(
+                        await self._get_graph(), conversation_id
+                    )
+                card = create_approval_card(draft=state.get("draft") or "", ref=ref)
                 await self._send_card(turn_context, card)
 
         elif action == "request_edit":
             feedback = value.get("feedback", "")
-            resume_as_node = "review"
 
-            await turn_context.send_activity(t("card.revision_processing"))
+            progress = ProgressMessage(turn_context)
+            await progress.start(t("card.revision_processing"))
 
             try:
                 result = await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
+                    on_progress=progress.node_finished,
                     message=feedback,
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="revision",
                     context={"feedback": feedback},
-                    as_node=resume_as_node,
                 )
             except Exception as exc:  # noqa: BLE001
                 logger.error("Agent revision error: %s", exc, exc_info=True)
+                await self._allow_retry(turn_context)
                 await turn_context.send_activity(t("card.revision_error", error=exc))
                 return
 
@@ -425,44 +505,53 @@ class AgentizeBotHandler(ActivityHandler):
                 )
                 await turn_context.send_activity(text)
             else:
-                card = create_review_card(
-                    draft=result.get("draft", ""),
-                    metadata=result.get("draft_metadata", {}),
-                )
-                await self._send_card(turn_context, card)
+                await self._send_review_card(turn_context, result, conversation_id)
 
         elif action == "final_approve":
-            await turn_context.send_activity(t("card.pdf_processing"))
+            progress = ProgressMessage(turn_context)
+            await progress.start(t("card.pdf_processing"))
             timestamp = datetime.now(timezone.utc).isoformat()
 
             try:
                 result = await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
+                    on_progress=progress.node_finished,
                     message="",
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="output",
                     context={"timestamp": timestamp},
-                    as_node="approve",
                 )
             except Exception as exc:  # noqa: BLE001
                 logger.error("Agent output error: %s", exc, exc_info=True)
+                await self._allow_retry(turn_context)
                 await turn_context.send_activity(t("card.pdf_failed", error=exc))
                 return
+            if result.get("status") == "error":
+                # output_node reports a failed render/upload instead of raising.
+                await self._allow_retry(turn_context)
+                await turn_context.send_activity(
+                    t(
+                        "card.pdf_failed",
+                        error=result.get("message", t("bot.error_generic")),
+                    )
+                )
+                return
 
             metadata = result.get("draft_metadata", {})
             metadata["approved_by"] = user_id
 
             if is_telegram:
                 text = _format_telegram_result(
-                    result.get("pdf_url", "#"),
+                    _result_link(result),
                     result.get("title", t("card.title_default")),
                     metadata,
                 )
                 await turn_context.send_activity(text)
             else:
                 card = create_result_card(
-                    pdf_url=result.get("pdf_url", "#"),
+                    pdf_url=_result_link(result),
                     document_title=result.get("title", t("card.title_default")),
                     metadata=metadata,
                 )
@@ -473,14 +562,15 @@ class AgentizeBotHandler(ActivityHandler):
             try:
                 await run_agent(
                     graph=await self._get_graph(),
+                    services=self.services,
                     message="",
                     user_id=user_id,
                     conversation_id=conversation_id,
                     resume_from="rejection",
-                    as_node="review",
                 )
             except Exception as exc:
                 logger.error("Rejection audit failed: %s", exc, exc_info=True)
+                await self._allow_retry(turn_context)
 
         else:
             logger.warning("Unknown card action: %s", action)
@@ -489,6 +579,23 @@ class AgentizeBotHandler(ActivityHandler):
     # Helpers
     # ------------------------------------------------------------------
 
+    async def _allow_retry(self, turn_context: TurnContext) -> None:
+        """Forget a failed card action's click, so the button can be pressed again."""
+        key = card_key(turn_context.activity)
+        if key:
+            await self.services.activities.release([key])
+
+    async def _send_review_card(
+        self, turn_context: TurnContext, result: dict, conversation_id: str
+    ) -> None:
+        ref = await draft_reference(await self._get_graph(), conversation_id)
+        card = create_review_card(
+            draft=result.get("draft", ""),
+            metadata=result.get("draft_metadata", {}),
+            ref=ref,
+        )
+        await self._send_card(turn_context, card)
+
     @staticmethod
     async def _send_card(turn_context: TurnContext, card: dict) -> None:
         await turn_context.send_activity(
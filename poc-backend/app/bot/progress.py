@@ -0,0 +1,96 @@
+"""In-place progress message for long agent turns.
+
+:class:`ProgressMessage` posts one status message when a turn starts and
+edits it as graph nodes finish (``run_agent(on_progress=...)``), with a
+typing indicator alongside each edit.  Edits are rate limited by
+``settings.progress_update_interval_seconds``; on channels that cannot edit
+messages (the first failed edit tells) only typing indicators are sent.
+Progress reporting never fails the turn.
+"""
+
+import logging
+import time
+
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity, ActivityTypes
+
+from app.config import settings
+from app.locale import t
+
+logger = logging.getLogger(__name__)
+
+# Node that just finished → what the user waits for next.
+_NEXT_STEP = {
+    "start": "progress.understanding",
+    "process_input": "progress.writing",
+    "revise": "progress.rewriting",
+    "approve": "progress.rendering",
+    "output": "progress.recording",
+}
+
+# After classification the next step depends on the intent it routed on
+# (see ``should_generate``); anything else gets a neutral label.
+_AFTER_INTENT = {
+    "generate_twi": "progress.extracting",
+    "edit_twi": "progress.extracting",
+    "question": "progress.answering",
+}
+
+
+def _next_step(node: str, update: dict | None) -> str | None:
+    if node == "classify_intent":
+        return _AFTER_INTENT.get((update or {}).get("intent"), "progress.working")
+    return _NEXT_STEP.get(node)
+
+
+class ProgressMessage:
+    def __init__(
+        self, turn_context: TurnContext, min_interval: float | None = None
+    ) -> None:
+        self._turn_context = turn_context
+        self._min_interval = (
+            settings.progress_update_interval_seconds
+            if min_interval is None
+            else min_interval
+        )
+        self._activity_id: str | None = None
+        self._text: str | None = None
+        self._editable = True
+        self._last_update = 0.0
+
+    async def start(self, text: str) -> None:
+        """Post the progress message (and a typing indicator)."""
+        await self._typing()
+        response = await self._turn_context.send_activity(text)
+        self._activity_id = getattr(response, "id", None)
+        self._text = text
+        self._last_update = time.monotonic()
+
+    async def node_finished(self, node: str, update: dict | None = None) -> None:
+        """``run_agent`` progress callback: show the step that comes next."""
+        key = _next_step(node, update)
+        if key is None:
+            return
+        now = time.monotonic()
+        if now - self._last_update < self._min_interval:
+            return
+        self._last_update = now
+        await self._typing()
+        text = t(key)
+        if text == self._text or not self._editable or self._activity_id is None:
+            return
+        try:
+            await self._turn_context.update_activity(
+                Activity(id=self._activity_id, type=ActivityTypes.message, text=text)
+            )
+            self._text = text
+        except Exception as exc:  # noqa: BLE001
+            # e.g. a channel without message updates — keep the typing indicator.
+            logger.info("Progress message edits disabled for this turn: %s", exc)
+            self._editable = False
+
+    async def _typing(self) -> None:
+        try:
+            await self._turn_context.send_activity(Activity(type=ActivityTypes.typing))
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Typing indicator failed: %s", exc)
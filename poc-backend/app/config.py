@@ -17,10 +17,54 @@ class Settings(BaseSettings):
     # Cosmos DB (MongoDB API)
     cosmos_connection: str = ""
     cosmos_database: str = "agentize-poc-db"
+    # Coalesce conversation last_activity / message_count updates in memory
+    # and flush them in one bulk write every N seconds (off the message path).
+    conversation_write_behind: bool = True
+    conversation_flush_interval_seconds: float = 5.0
+
+    # Audit writer — entries are journaled locally (fsync) and flushed to
+    # audit_log in batches.  Point AUDIT_JOURNAL_DIR at persistent storage;
+    # empty means a directory under the system temp dir.
+    audit_journal_dir: str = ""
+    audit_batch_size: int = 100
+    audit_flush_interval_seconds: float = 2.0
+
+    # LangGraph checkpoint durability — "exit" | "async" | "sync".  "exit"
+    # writes one checkpoint when a run pauses or ends (a turn lost to a crash
+    # is redone from the previous pause); "async" / "sync" write one after
+    # every node, so a crashed run can be resumed mid-way.
+    checkpoint_durability: str = "exit"
+
+    # Bot turns: redelivered activities / repeated card clicks are dropped
+    # for this long, and one turn per conversation runs at a time (a lease
+    # renewed while the turn runs; a waiting turn gives up after the wait).
+    activity_dedupe_ttl_seconds: int = 3600
+    conversation_lease_seconds: float = 60.0
+    conversation_lease_wait_seconds: float = 30.0
 
     # Blob Storage
     blob_connection: str = ""
     blob_container: str = "pdf-output"
+    # Managed identity alternative to blob_connection, e.g. https://<account>.blob.core.windows.net
+    blob_account_url: str = ""
+    blob_upload_concurrency: int = 4
+
+    # Documents older than this have draft_content moved to a compressed blob
+    # (Cool tier) by ``python -m app.services.document_tiering``; reads
+    # rehydrate it transparently.
+    document_tiering_age_days: int = 90
+
+    # Seed generate_twi / edit_twi from the closest approved TWI (same
+    # machine / process type, ranked by BM25) instead of generating from scratch.
+    twi_retrieval_enabled: bool = True
+    twi_retrieval_candidates: int = 20
+
+    # Bot progress message: edited in place as graph nodes finish, at most
+    # once per this many seconds (Teams throttles rapid message updates).
+    progress_update_interval_seconds: float = 1.0
+
+    # PDF output — "compact" | "standard" | "archival" (PDF/A-3b)
+    pdf_output_profile: str = "compact"
 
     # Key Vault (optional — secrets are typically injected via Container App env refs)
     key_vault_url: str = ""
@@ -29,6 +73,10 @@ class Settings(BaseSettings):
     bot_app_id: str = ""
     bot_app_password: str = ""
     channel_auth_tenant: str = ""
+    # Bot Framework OpenID metadata / signing keys are fetched at startup and
+    # refreshed in the background this often (the SDK would refetch them
+    # inline, blocking a request, once a day).
+    bot_signing_key_refresh_hours: float = 6.0
 
     # Telegram (optional)
     telegram_bot_token: str = ""
@@ -39,6 +87,26 @@ class Settings(BaseSettings):
     # Application Insights
     applicationinsights_connection_string: str = ""
 
+    # Public HTTPS base URL of this backend (e.g. https://ca-agentize-poc-backend.<env>.azurecontainerapps.io).
+    # When set together with DOWNLOAD_LINK_SECRET, result cards link to a signed,
+    # expiring /documents/{id}/download URL instead of a 24h SAS URL.
+    public_base_url: str = ""
+    download_link_secret: str = ""
+    download_link_ttl_days: int = 30
+
+    # Document search API (/api/documents) — comma-separated "tenant_id:key"
+    # pairs; the bearer key decides which tenant's documents are visible.
+    # Empty = unauthenticated and scoped to DEFAULT_TENANT_ID (PoC only).
+    document_api_keys: str = ""
+
+    # Prometheus /metrics — scrapers send "Authorization: Bearer <token>".
+    # Empty = unauthenticated (the metrics carry no conversation data).
+    metrics_token: str = ""
+
+    # OpenTelemetry: also export spans to this OTLP/HTTP collector, e.g.
+    # http://localhost:4318 (needs ``pip install .[otlp]``).
+    otel_exporter_otlp_endpoint: str = ""
+
     # Multi-tenant
     default_tenant_id: str = "poc-tenant"
 
@@ -81,6 +149,16 @@ class Settings(BaseSettings):
             else:
                 _config_logger.warning("⚠️  %s", msg)
 
+        if not self.document_api_keys:
+            msg = (
+                "DOCUMENT_API_KEYS not configured — /api/documents is "
+                "unauthenticated and serves the default tenant's documents."
+            )
+            if is_production:
+                errors.append(msg)
+            else:
+                _config_logger.warning("⚠️  %s", msg)
+
         if not self.ai_foundry_endpoint or not self.ai_foundry_key:
             msg = "AI_FOUNDRY_ENDPOINT / AI_FOUNDRY_KEY not configured — LLM calls will fail."
             if is_production:
@@ -88,13 +166,29 @@ class Settings(BaseSettings):
             else:
                 _config_logger.warning("⚠️  %s", msg)
 
-        if not self.blob_connection:
-            msg = "BLOB_CONNECTION not configured — PDF upload will fail."
+        if not self.blob_connection and not self.blob_account_url:
+            msg = "BLOB_CONNECTION / BLOB_ACCOUNT_URL not configured — PDF upload will fail."
+            if is_production:
+                errors.append(msg)
+            else:
+                _config_logger.warning("⚠️  %s", msg)
+
+        if not self.audit_journal_dir:
+            msg = (
+                "AUDIT_JOURNAL_DIR not configured — the audit journal lives in the "
+                "temp directory and unflushed EU AI Act entries are lost on restart."
+            )
             if is_production:
                 errors.append(msg)
             else:
                 _config_logger.warning("⚠️  %s", msg)
 
+        if self.public_base_url and not self.download_link_secret:
+            _config_logger.warning(
+                "⚠️  PUBLIC_BASE_URL is set but DOWNLOAD_LINK_SECRET is not — "
+                "result cards fall back to 24h SAS URLs."
+            )
+
         if errors:
             for err in errors:
                 _config_logger.critical("FATAL: %s", err)
@@ -7,7 +7,17 @@ STRINGS: dict[str, str] = {
     "bot.processing": "⏳ Processing your request...",
     "bot.error": "❌ Error: {message}",
     "bot.error_generic": "An error occurred. Please try again.",
+    "bot.busy": "⏳ Still working on your previous message — please try again in a moment.",
     "bot.status": "Status: {status}",
+    # Bot handler — progress message, updated in place as graph nodes finish
+    "progress.understanding": "🔎 Understanding your request...",
+    "progress.extracting": "🧩 Extracting machine and process details...",
+    "progress.answering": "💬 Preparing the answer...",
+    "progress.working": "⏳ Working on it...",
+    "progress.writing": "✍️ Writing the draft...",
+    "progress.rewriting": "✍️ Writing the revised draft...",
+    "progress.rendering": "📄 Rendering the PDF...",
+    "progress.recording": "🗂️ Recording the audit entry...",
     # Bot handler — clarification
     "bot.clarify_fallback": (
         "Please clarify your request. For example: "
@@ -51,6 +61,7 @@ STRINGS: dict[str, str] = {
     "card.error": "❌ Error: {error}",
     "card.rejected": "🗑️ Draft discarded. Send a new request to start over.",
     "card.title_default": "TWI Work Instruction",
+    "card.stale": "⚠️ This card is out of date — please use the latest draft card.",
     # Adaptive Cards
     "card.review.header": "📋 TWI Draft — Review Required",
     "card.review.ai_warning": "⚠️ AI-generated content | Model: {model} | Generated: {generated_at}",
@@ -7,7 +7,17 @@ STRINGS: dict[str, str] = {
     "bot.processing": "⏳ Feldolgozom a kérésedet...",
     "bot.error": "❌ Hiba: {message}",
     "bot.error_generic": "Hiba történt. Kérlek próbáld újra.",
+    "bot.busy": "⏳ Még az előző üzeneteden dolgozom — kérlek, próbáld újra egy kicsit később.",
     "bot.status": "Állapot: {status}",
+    # Bot handler — folyamatjelző üzenet, node-onként frissítve
+    "progress.understanding": "🔎 Értelmezem a kérésedet...",
+    "progress.extracting": "🧩 Kinyerem a gép és a folyamat adatait...",
+    "progress.answering": "💬 Készítem a választ...",
+    "progress.working": "⏳ Dolgozom rajta...",
+    "progress.writing": "✍️ Írom a vázlatot...",
+    "progress.rewriting": "✍️ Írom a módosított vázlatot...",
+    "progress.rendering": "📄 Készítem a PDF-et...",
+    "progress.recording": "🗂️ Rögzítem az audit bejegyzést...",
     # Bot handler — clarification
     "bot.clarify_fallback": (
         "Kérlek pontosítsd a kérésedet. Például: "
@@ -51,6 +61,7 @@ STRINGS: dict[str, str] = {
     "card.error": "❌ Hiba: {error}",
     "card.rejected": "🗑️ Elvettem a vázlatot. Új kéréssel indíthatsz újat.",
     "card.title_default": "TWI Munkautasítás",
+    "card.stale": "⚠️ Ez a kártya már elavult — kérlek, a legfrissebb vázlat kártyáját használd.",
     # Adaptive Cards
     "card.review.header": "📋 TWI Vázlat — Felülvizsgálat szükséges",
     "card.review.ai_warning": "⚠️ AI által generált tartalom | Modell: {model} | Generálva: {generated_at}",
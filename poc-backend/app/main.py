@@ -1,12 +1,28 @@
+import asyncio
+import hmac
 import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from pymongo.errors import ExecutionTimeout
 from botbuilder.core import BotFrameworkAdapter, BotFrameworkAdapterSettings
 from botbuilder.schema import Activity
-from botframework.connector.auth import JwtTokenValidation, SimpleCredentialProvider
 
+from app import STARTED_AT
 from app.config import settings
+from app.bot.auth import BotAuthenticator
 from app.bot.bot_handler import AgentizeBotHandler
+from app.services import metrics
+from app.services.audit_export import EXPORT_FORMATS, AuditExport, parquet_available
+from app.services.blob_storage import get_download_url
+from app.services.container import ServiceContainer, get_services, set_services
+from app.services.download_links import verify_download_signature
+from app.services.latency import MAX_SAMPLES, latency_percentiles
+from app.services.tracing import configure_tracing
 
 import app.locale.hu  # noqa: F401  — register Hungarian strings
 import app.locale.en  # noqa: F401  — register English strings
@@ -30,13 +46,40 @@ if settings.applicationinsights_connection_string:
     except Exception as e:
         logger.error("Failed to initialize Application Insights: %s", e)
 
+# After configure_azure_monitor, so an OTLP exporter shares its provider.
+configure_tracing()
+
+_imports_ms = round((time.perf_counter() - STARTED_AT) * 1000, 1)
+
 _enable_docs = settings.environment in ("poc", "development")
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Build the service container and warm it up; close it on shutdown.
+
+    The warm-up runs in the background so ``/health`` (liveness) answers at
+    once, while ``/ready`` keeps the replica out of rotation until it is warm.
+    """
+    services = ServiceContainer.create()
+    services.startup_timings["imports"] = _imports_ms
+    set_services(services)
+    warm_up = asyncio.create_task(services.start(signing_keys=bot_auth.start))
+    yield
+    services.stop()
+    await warm_up
+    await bot_auth.aclose()
+    await services.aclose()
+    set_services(None)
+    metrics.mark_process_dead()
+
+
 app = FastAPI(
     title="agentize.eu PoC Backend",
     version="0.1.0",
     docs_url="/docs" if _enable_docs else None,
     redoc_url="/redoc" if _enable_docs else None,
+    lifespan=lifespan,
 )
 
 # Bot Framework adapter — SingleTenant requires channel_auth_tenant
@@ -46,8 +89,11 @@ _adapter_settings = BotFrameworkAdapterSettings(
     channel_auth_tenant=settings.channel_auth_tenant or None,
 )
 adapter = BotFrameworkAdapter(_adapter_settings)
+# Validates each request's token once (cached until it expires); the claims
+# are handed to the adapter so it does not validate them again.
+bot_auth = BotAuthenticator()
 
-# Bot handler (singleton — holds the LangGraph graph)
+# Bot handler (singleton — resolves stores and graph from the service container)
 bot = AgentizeBotHandler()
 
 
@@ -61,6 +107,25 @@ async def _on_error(context, error: Exception) -> None:
 adapter.on_turn_error = _on_error
 
 
+@app.middleware("http")
+async def _count_errors(request: Request, call_next):
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.ERRORS.labels("http", "500").inc()
+        raise
+    if response.status_code >= 400:
+        metrics.ERRORS.labels("http", str(response.status_code)).inc()
+    return response
+
+
+# document_id is a uuid4 hex string (see output_node)
+_DOCUMENT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_MAX_USAGE_DAYS = 366
+# Latency percentiles are computed per request from raw audit entries.
+_MAX_LATENCY_DAYS = 31
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -73,23 +138,15 @@ async def messages(request: Request) -> Response:
     activity = Activity().deserialize(body)
     auth_header = request.headers.get("Authorization", "")
 
-    # Explicit Entra ID token validation
-    if settings.bot_app_id:
-        try:
-            credentials = SimpleCredentialProvider(
-                settings.bot_app_id, settings.bot_app_password
-            )
-            claims = await JwtTokenValidation.authenticate_request(
-                activity, auth_header, credentials, ""
-            )
-            if not claims.is_authenticated:
-                logger.warning("Unauthenticated request to /api/messages")
-                return Response(status_code=401)
-        except Exception as e:
-            logger.error("Token validation failed: %s", e)
-            return Response(status_code=401)
-
-    response = await adapter.process_activity(activity, auth_header, bot.on_turn)
+    try:
+        identity = await bot_auth.authenticate(activity, auth_header)
+    except Exception as e:
+        logger.warning("Token validation failed: %s", e)
+        return Response(status_code=401)
+
+    response = await adapter.process_activity_with_identity(
+        activity, identity, bot.on_turn
+    )
 
     if response:
         return Response(
@@ -100,11 +157,243 @@ async def messages(request: Request) -> Response:
     return Response(status_code=200)
 
 
+@app.get("/documents/{document_id}/download")
+async def download_document(document_id: str, exp: int, sig: str) -> RedirectResponse:
+    """Redirect a signed download link to a short-lived SAS URL for a generated PDF.
+
+    The link is a capability URL: it carries no user authentication, so anyone
+    holding it can download the PDF until ``exp`` (``DOWNLOAD_LINK_TTL_DAYS``
+    after approval).  The HMAC signature prevents forging or extending links;
+    the blob SAS itself is only minted per click and lives 15 minutes.
+    """
+    if not _DOCUMENT_ID_RE.match(document_id):
+        raise HTTPException(status_code=404)
+    if not verify_download_signature(document_id, exp, sig):
+        raise HTTPException(status_code=403)
+
+    doc = await get_services().documents.get(
+        document_id, projection={"_id": 0, "pdf_blob_name": 1}
+    )
+    if not doc or not doc.get("pdf_blob_name"):
+        raise HTTPException(status_code=404)
+
+    url = await get_download_url(doc["pdf_blob_name"])
+    return RedirectResponse(url, status_code=307)
+
+
+def _api_tenant(request: Request) -> str:
+    """Resolve the caller's tenant from its ``Authorization: Bearer`` key."""
+    if not settings.document_api_keys:
+        return settings.default_tenant_id
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and key:
+        for pair in settings.document_api_keys.split(","):
+            tenant_id, _, tenant_key = pair.strip().partition(":")
+            if tenant_key and hmac.compare_digest(key, tenant_key):
+                return tenant_id
+    raise HTTPException(status_code=401)
+
+
+@app.get("/api/documents")
+async def search_documents(
+    request: Request,
+    machine_id: str | None = None,
+    process_type: str | None = None,
+    department: str | None = None,
+    title: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+) -> dict:
+    """Search the caller's approved TWIs, newest first, with keyset pagination.
+
+    Pass ``next_cursor`` from a response as ``cursor`` to fetch the next page.
+    Items carry metadata only; fetch ``/api/documents/{id}`` for the content.
+    """
+    tenant_id = _api_tenant(request)
+    try:
+        items, next_cursor = await get_services().documents.search(
+            tenant_id,
+            machine_id=machine_id,
+            process_type=process_type,
+            department=department,
+            title=title,
+            created_from=created_from,
+            created_to=created_to,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.get("/api/documents/{document_id}")
+async def get_document(request: Request, document_id: str) -> dict:
+    """Return one of the caller's documents, including ``draft_content``."""
+    tenant_id = _api_tenant(request)
+    if not _DOCUMENT_ID_RE.match(document_id):
+        raise HTTPException(status_code=404)
+    doc = await get_services().documents.get(
+        document_id,
+        projection={"_id": 0, "title_terms": 0, "draft_blob": 0},
+        tenant_id=tenant_id,
+    )
+    if not doc:
+        raise HTTPException(status_code=404)
+    return doc
+
+
+@app.get("/api/usage")
+async def get_usage(
+    request: Request,
+    day_from: date | None = Query(None, alias="from"),
+    day_to: date | None = Query(None, alias="to"),
+    model: str | None = None,
+    event_type: str | None = None,
+) -> dict:
+    """Daily LLM usage of the caller's tenant per model and event type.
+
+    Served from the ``usage_rollups`` counters; defaults to the last 30 days.
+    """
+    tenant_id = _api_tenant(request)
+    day_to = day_to or datetime.now(timezone.utc).date()
+    day_from = day_from or day_to - timedelta(days=29)
+    if day_from > day_to or (day_to - day_from).days >= _MAX_USAGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range must be ascending and at most {_MAX_USAGE_DAYS} days",
+        )
+    items = await get_services().usage.query(
+        tenant_id, day_from, day_to, model=model, event_type=event_type
+    )
+    totals = {
+        field: sum(item.get(field, 0) for item in items)
+        for field in ("events", "tokens_input", "tokens_output")
+    }
+    return {
+        "from": day_from.isoformat(),
+        "to": day_to.isoformat(),
+        "items": items,
+        "totals": totals,
+    }
+
+
+@app.get("/api/latency")
+async def get_latency(
+    request: Request,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    event_type: str | None = None,
+    limit: int = Query(MAX_SAMPLES, ge=1, le=MAX_SAMPLES),
+) -> dict:
+    """Turn latency percentiles of the caller's tenant for ``[from, to)``.
+
+    Aggregates the latency ledger stored with each audit entry into
+    p50/p95/p99 in ms per key (``node.<name>``, ``llm``, ``render``,
+    ``upload``, ``store``, ``queue_wait``, ``total``); defaults to the
+    last 7 days and to at most 31 days.  Only the newest ``limit`` entries
+    are aggregated.  ``event_type=twi_approved`` gives the approval turns.
+    """
+    tenant_id = _api_tenant(request)
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+    if start >= end or end - start > timedelta(days=_MAX_LATENCY_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must be ascending and at most {_MAX_LATENCY_DAYS} days",
+        )
+    try:
+        items = await latency_percentiles(
+            tenant_id, start, end, event_type, limit=limit
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ExecutionTimeout as exc:
+        raise HTTPException(
+            status_code=504, detail="Latency query timed out; narrow the range"
+        ) from exc
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "limit": limit,
+        "items": items,
+    }
+
+
+@app.get("/api/audit/export")
+async def export_audit_log(
+    request: Request,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|parquet)$"),
+    after: str | None = None,
+) -> StreamingResponse:
+    """Stream the caller's audit log for ``[from, to)``, oldest first.
+
+    To resume an interrupted download, pass the last ``audit_id`` received
+    as ``after``.
+    """
+    tenant_id = _api_tenant(request)
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=501, detail="Parquet export needs the pyarrow package"
+        )
+    try:
+        export = AuditExport(tenant_id, start, end, after=after)
+        await export.prepare()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    filename = f"audit-{tenant_id}-{start:%Y%m%d}-{end:%Y%m%d}.{fmt}"
+    return StreamingResponse(
+        export.stream(fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "healthy", "environment": settings.environment}
 
 
+@app.get("/metrics")
+async def prometheus_metrics(request: Request) -> Response:
+    """Prometheus scrape endpoint (see :mod:`app.services.metrics`)."""
+    if settings.metrics_token:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            token, settings.metrics_token
+        ):
+            raise HTTPException(status_code=401)
+    payload, content_type = metrics.render()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.get("/ready")
+async def ready(response: Response) -> dict:
+    """Readiness probe: 503 until the service container has warmed up.
+
+    Failed optional steps (LLM, Blob, renderer, …) are listed but do not
+    block readiness; the graph and Mongo must be up.
+    """
+    services = get_services()
+    if not services.ready:
+        response.status_code = 503
+        return {
+            "status": "warming_up",
+            "failed_steps": sorted(services.startup_failures),
+        }
+    return {
+        "status": "ready",
+        "startup_ms": services.startup_timings,
+        "failed_steps": sorted(services.startup_failures),
+    }
+
+
 @app.get("/")
 async def root() -> dict:
     return {"service": "agentize.eu PoC Backend", "version": "0.1.0"}
@@ -39,6 +39,9 @@ class AuditEntry(BaseModel):
     pdf_blob_name: Optional[str] = None
     status: str
     approval_timestamp: Optional[str] = None
+    # Per-turn latency ledger in ms (node.<name>, llm, render, upload, store,
+    # queue_wait, total)
+    timings: Optional[dict[str, float]] = None
     created_at: Optional[datetime] = None
 
     @model_validator(mode="before")
@@ -15,7 +15,8 @@ def _default_tenant_id() -> str:
 class Conversation(BaseModel):
     """Represents an active bot conversation tracked in Cosmos DB.
 
-    TTL is enforced via a 90-day index on ``last_activity``.
+    TTL is enforced via a 90-day index on ``last_activity`` (``_ts`` on
+    Cosmos DB RU) — see ``app.services.indexes.INDEX_REGISTRY``.
     """
 
     conversation_id: str
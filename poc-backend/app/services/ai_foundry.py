@@ -1,8 +1,13 @@
 import logging
+import time
+
 from azure.ai.inference.aio import ChatCompletionsClient as AsyncChatCompletionsClient
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from opentelemetry.trace import SpanKind
 
 from app.config import settings
+from app.services import latency, metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +24,26 @@ def _get_client() -> AsyncChatCompletionsClient:
     return _client
 
 
+async def warm_up() -> None:
+    """Open the client's TLS connection before the first generation.
+
+    ``GET /info`` costs no tokens.  Endpoints that do not serve it answer
+    with an error status, which still leaves a warm connection in the pool.
+    """
+    try:
+        await _get_client().get_model_info()
+    except HttpResponseError as exc:
+        logger.debug("Model info unavailable (connection is warm): %s", exc)
+
+
+async def close_client() -> None:
+    """Close the shared client and its connection pool (call on shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+    _client = None
+
+
 async def call_llm(
     prompt: str,
     system_prompt: str | None = None,
@@ -33,15 +58,46 @@ async def call_llm(
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": prompt})
 
-    response = await client.complete(
-        messages=messages,
-        model=settings.ai_model,
-        temperature=temperature if temperature is not None else settings.ai_temperature,
-        max_tokens=max_tokens if max_tokens is not None else settings.ai_max_tokens,
-    )
+    temperature = temperature if temperature is not None else settings.ai_temperature
+    max_tokens = max_tokens if max_tokens is not None else settings.ai_max_tokens
+    node = metrics.current_node.get()
+    with tracing.tracer.start_as_current_span(
+        f"chat {settings.ai_model}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "gen_ai.operation.name": "chat",
+            "gen_ai.request.model": settings.ai_model,
+            "gen_ai.request.temperature": temperature,
+            "gen_ai.request.max_tokens": max_tokens,
+            "agentize.node": node,
+        },
+    ) as span:
+        started = time.perf_counter()
+        try:
+            response = await client.complete(
+                messages=messages,
+                model=settings.ai_model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        except Exception as exc:
+            metrics.ERRORS.labels("llm", metrics.error_status(exc)).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.LLM_LATENCY.labels(node, settings.ai_model).observe(elapsed)
+            latency.record("llm", elapsed)
+        usage = response.usage
+        span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_tokens)
+        span.set_attribute("gen_ai.usage.output_tokens", usage.completion_tokens)
 
     content: str = response.choices[0].message.content
-    usage = response.usage
+    metrics.LLM_TOKENS.labels(node, settings.ai_model, "input").observe(
+        usage.prompt_tokens
+    )
+    metrics.LLM_TOKENS.labels(node, settings.ai_model, "output").observe(
+        usage.completion_tokens
+    )
     logger.info(
         "LLM call: model=%s, input_tokens=%d, output_tokens=%d",
         settings.ai_model,
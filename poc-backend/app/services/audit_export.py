@@ -0,0 +1,283 @@
+"""Streaming export of a tenant's ``audit_log`` (EU AI Act audits).
+
+Entries are read in keyset pages ordered by ``(created_at, _id)``, and each
+page is encoded and handed on before the next one is read, so memory stays
+constant however many entries a tenant has.  Formats:
+
+* ``ndjson`` — one JSON object per line;
+* ``csv``    — header row plus one row per entry;
+* ``parquet`` — one row group per page (needs the optional ``pyarrow``
+  package: ``pip install .[export]``).
+
+Every entry carries its ``audit_id``.  The last ``audit_id`` received is the
+continuation token: pass it as ``after`` to resume an interrupted export
+right after that entry.
+
+CLI::
+
+    cd poc-backend
+    python -m app.services.audit_export TENANT 2026-01-01 2026-04-01 \\
+        --format parquet --out audit.parquet [--after AUDIT_ID]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import sys
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+
+from app.services.cosmos_db import AuditStore
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_FIELDS = (
+    "audit_id",
+    "created_at",
+    "tenant_id",
+    "conversation_id",
+    "user_id",
+    "channel",
+    "event_type",
+    "intent",
+    "status",
+    "llm_model",
+    "llm_tokens_input",
+    "llm_tokens_output",
+    "revision_count",
+    "pdf_blob_name",
+    "approval_timestamp",
+)
+_INT_FIELDS = {"llm_tokens_input", "llm_tokens_output", "revision_count"}
+_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def _audit_id(entry: dict) -> str:
+    # Entries written before the journaled writer have an ObjectId and no audit_id.
+    return entry.get("audit_id") or str(entry["_id"])
+
+
+def _utc(value: datetime) -> datetime:
+    # Mongo returns naive UTC datetimes.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class AuditExport:
+    """One export: a tenant, a ``[start, end)`` time range and a start position."""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        start: datetime,
+        end: datetime,
+        after: str | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        store: AuditStore | None = None,
+    ) -> None:
+        if start >= end:
+            raise ValueError("Export range start must be before its end")
+        self.tenant_id = tenant_id
+        self.start = start
+        self.end = end
+        self.after = after
+        self.page_size = page_size
+        self.collection = (store or AuditStore()).collection
+        # (created_at, _id) of the last entry handed out.
+        self._position: tuple[datetime, Any] | None = None
+
+    async def prepare(self) -> None:
+        """Resolve the continuation token; raises ``ValueError`` if it is unknown.
+
+        Call before streaming starts, so a bad token is reported as an error
+        instead of a truncated download.
+        """
+        if self.collection is None:
+            raise RuntimeError("Cosmos DB not configured — audit log unavailable")
+        if not self.after:
+            return
+        ids: list = [self.after]
+        if ObjectId.is_valid(self.after):
+            ids.append(ObjectId(self.after))
+        entry = await self.collection.find_one(
+            {"_id": {"$in": ids}, "tenant_id": self.tenant_id}, {"created_at": 1}
+        )
+        if entry is None:
+            raise ValueError("Unknown continuation token")
+        self._position = (entry["created_at"], entry["_id"])
+
+    @property
+    def last_audit_id(self) -> str | None:
+        """``audit_id`` of the last entry handed out — the continuation token."""
+        return str(self._position[1]) if self._position else None
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        """Yield the entries page by page, oldest first."""
+        while True:
+            query: dict = {
+                "tenant_id": self.tenant_id,
+                "created_at": {"$gte": self.start, "$lt": self.end},
+            }
+            if self._position is not None:
+                created_at, audit_id = self._position
+                query["$or"] = [
+                    {"created_at": {"$gt": created_at}},
+                    {"created_at": created_at, "_id": {"$gt": audit_id}},
+                ]
+            cursor = (
+                self.collection.find(query, _PROJECTION)
+                .sort([("created_at", 1), ("_id", 1)])
+                .limit(self.page_size)
+            )
+            page = await cursor.to_list(length=self.page_size)
+            if not page:
+                return
+            last = page[-1]
+            self._position = (last["created_at"], last["_id"])
+            yield page
+            if len(page) < self.page_size:
+                return
+
+    async def stream(self, fmt: str) -> AsyncIterator[bytes]:
+        """Yield the export encoded as ``fmt`` (one of :data:`EXPORT_FORMATS`)."""
+        encoders = {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}
+        async for chunk in encoders[fmt](self.pages()):
+            yield chunk
+
+
+def _row(entry: dict) -> dict:
+    row = {field: entry.get(field) for field in EXPORT_FIELDS}
+    row["audit_id"] = _audit_id(entry)
+    row["created_at"] = _utc(row["created_at"]).isoformat()
+    return row
+
+
+async def _ndjson(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield "".join(
+            json.dumps(_row(e), ensure_ascii=False, default=str) + "\n" for e in page
+        ).encode("utf-8")
+
+
+async def _csv(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(_row(e) for e in page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Empty export: still emit the header row.
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the stream in chunks."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _parquet(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            (field, pa.timestamp("us", tz="UTC"))
+            if field == "created_at"
+            else (field, pa.int64() if field in _INT_FIELDS else pa.string())
+            for field in EXPORT_FIELDS
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    async for page in pages:
+        columns = {field: [e.get(field) for e in page] for field in EXPORT_FIELDS}
+        columns["audit_id"] = [_audit_id(e) for e in page]
+        columns["created_at"] = [_utc(v) for v in columns["created_at"]]
+        for field in EXPORT_FIELDS:
+            if field not in _INT_FIELDS and field != "created_at":
+                columns[field] = [None if v is None else str(v) for v in columns[field]]
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+async def _export_to_file(args: argparse.Namespace) -> None:
+    export = AuditExport(args.tenant_id, args.start, args.end, after=args.after)
+    await export.prepare()
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    try:
+        async for chunk in export.stream(args.format):
+            out.write(chunk)
+    except BaseException:
+        if export.last_audit_id:
+            logger.error(
+                "Export interrupted — resume with --after %s (a Parquet file "
+                "is only readable once complete; resume into a new file)",
+                export.last_audit_id,
+            )
+        raise
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    logger.info("Export complete; last audit_id=%s", export.last_audit_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("tenant_id")
+    parser.add_argument("start", type=datetime.fromisoformat)
+    parser.add_argument("end", type=datetime.fromisoformat)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--out", default="-", help="output file (default: stdout)")
+    parser.add_argument("--after", help="continuation token (last audit_id received)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(_export_to_file(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""Buffered, durable writer for the EU AI Act ``audit_log`` collection.
+
+``log()`` appends the entry to a local append-only journal (fsync'd) and
+returns; a background task flushes journaled entries to Cosmos DB with
+``insert_many``.  Flushed entries are acknowledged in the journal, so a crash
+or a Cosmos outage never loses an audit record:
+
+* on startup, journal segments left behind by dead processes are replayed;
+* on shutdown, the buffer is drained (anything still unflushed stays in the
+  journal for the next start).
+
+Each entry carries an ``audit_id`` that is also its Mongo ``_id``, so an entry
+replayed after a crash between insert and acknowledgement is not duplicated.
+
+Each inserted batch is also added to the per-tenant usage rollups
+(:mod:`app.services.usage_rollups`).  Replayed entries that had already landed
+are left out, so a replay does not count them twice.
+
+Every process writes its own journal segment and holds an exclusive lock on
+it, so multiple uvicorn workers can share one ``AUDIT_JOURNAL_DIR``.  The
+directory must be on storage that survives container restarts —
+``validate_production_settings`` refuses to start production without it.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO
+
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services import metrics
+from app.services.cosmos_db import AuditStore
+from app.services.tracing import store_operation
+from app.services.usage_rollups import UsageRollupStore
+
+try:  # POSIX only — on Windows segments are not locked (single-worker dev)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_GLOB = "audit-*.jsonl"
+_DUPLICATE_KEY = 11000
+_OPEN_SEGMENT_ATTEMPTS = 3
+
+
+def _journal_dir() -> Path:
+    if settings.audit_journal_dir:
+        return Path(settings.audit_journal_dir)
+    return Path(tempfile.gettempdir()) / "agentize-audit-journal"
+
+
+def _try_lock(fh: IO) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _read_unacked(path: Path) -> list[dict]:
+    """Return the entries in a journal segment that were never acknowledged."""
+    entries: dict[str, dict] = {}
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a crash mid-write — the entry was
+                # never acknowledged to the caller either.
+                continue
+            if record.get("op") == "append":
+                entry = record["entry"]
+                entries[entry["audit_id"]] = entry
+            elif record.get("op") == "ack":
+                for audit_id in record["ids"]:
+                    entries.pop(audit_id, None)
+    return list(entries.values())
+
+
+def _to_document(entry: dict) -> dict:
+    doc = dict(entry)
+    doc["_id"] = doc["audit_id"]
+    doc["created_at"] = datetime.fromisoformat(doc["created_at"])
+    return doc
+
+
+class AuditWriter:
+    """Journal-first audit writer with background batched inserts."""
+
+    def __init__(
+        self,
+        journal_dir: Path | None = None,
+        store: AuditStore | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        rollups: UsageRollupStore | None = None,
+    ) -> None:
+        self.journal_dir = journal_dir or _journal_dir()
+        self.batch_size = batch_size or settings.audit_batch_size
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else settings.audit_flush_interval_seconds
+        )
+        self._store = store
+        self._rollups = rollups
+        self._pending: list[dict] = []
+        self._segment: IO | None = None
+        self._segment_path: Path | None = None
+        self._unacked = 0
+        self._file_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._flush_task: asyncio.Task | None = None
+        self._flush_failing = False
+
+    # -- journal (runs in a worker thread) ---------------------------------
+
+    def _open_segment(self) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        for _ in range(_OPEN_SEGMENT_ATTEMPTS):
+            name = f"audit-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+            path = self.journal_dir / name
+            fh = path.open("a", encoding="utf-8")
+            if _try_lock(fh):
+                self._segment, self._segment_path = fh, path
+                return
+            # Someone else holds this name — an unlocked live segment could be
+            # adopted and deleted by another worker's replay, so never use it.
+            fh.close()
+        raise RuntimeError(
+            f"Could not lock an audit journal segment in {self.journal_dir}"
+        )
+
+    def _append(self, records: list[dict], appended: int = 0, acked: int = 0) -> None:
+        with self._file_lock:
+            if self._segment is None:
+                self._open_segment()
+            for record in records:
+                self._segment.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._unacked += appended - acked
+            if self._unacked == 0:
+                # Everything written so far is in Cosmos — start the segment over.
+                self._segment.truncate(0)
+                self._segment.seek(0)
+
+    def _take_over_orphans(self) -> list[dict]:
+        """Collect unacknowledged entries from segments no live process holds."""
+        if not self.journal_dir.exists():
+            return []
+        recovered: list[dict] = []
+        for path in sorted(self.journal_dir.glob(_SEGMENT_GLOB)):
+            if path == self._segment_path:
+                continue
+            with path.open("r+", encoding="utf-8") as fh:
+                if not _try_lock(fh):
+                    continue  # owned by another running worker
+                entries = _read_unacked(path)
+                if entries:
+                    # Re-journal into our own segment before dropping the orphan.
+                    self._append(
+                        [{"op": "append", "entry": e} for e in entries],
+                        appended=len(entries),
+                    )
+                    recovered.extend(entries)
+            path.unlink()
+        return recovered
+
+    def _close_segment(self) -> None:
+        with self._file_lock:
+            if self._segment is not None:
+                self._segment.close()
+                if self._unacked == 0 and self._segment_path is not None:
+                    self._segment_path.unlink(missing_ok=True)
+            self._segment = None
+            self._segment_path = None
+
+    # -- public API ---------------------------------------------------------
+
+    def _get_store(self) -> AuditStore:
+        if self._store is None:
+            self._store = AuditStore()
+        return self._store
+
+    def _get_rollups(self) -> UsageRollupStore:
+        if self._rollups is None:
+            self._rollups = UsageRollupStore()
+        return self._rollups
+
+    async def _add_to_rollups(self, entries: list[dict]) -> None:
+        try:
+            await self._get_rollups().add(entries)
+        except Exception as exc:
+            # The audit entries themselves are safe; only the counters lag.
+            logger.error(
+                "Usage rollup update failed for %d entries — reconcile with "
+                "`python -m app.services.usage_rollups`: %s",
+                len(entries),
+                exc,
+            )
+
+    async def start(self) -> int:
+        """Replay unflushed entries from previous runs and start the flusher.
+
+        Returns the number of replayed entries.
+        """
+        if self._get_store().collection is None:
+            return 0
+        recovered = await asyncio.to_thread(self._take_over_orphans)
+        if recovered:
+            logger.warning(
+                "Replaying %d unflushed audit entries from journal", len(recovered)
+            )
+            self._pending.extend(recovered)
+            self._report_pending()
+        self._ensure_flusher()
+        return len(recovered)
+
+    async def log(self, entry: dict) -> None:
+        """Durably record an audit entry; it reaches Cosmos DB in the background."""
+        if self._get_store().collection is None:
+            # No database configured at all (local dev) — nothing would ever
+            # drain the journal, so report the gap instead of growing it.
+            logger.error(
+                "AUDIT TRAIL SKIPPED (EU AI Act compliance gap): "
+                "event_type=%s conversation_id=%s — Cosmos DB not available.",
+                entry.get("event_type", "unknown"),
+                entry.get("conversation_id", "unknown"),
+            )
+            return
+
+        entry = {
+            **entry,
+            "audit_id": uuid.uuid4().hex,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        await asyncio.to_thread(
+            self._append, [{"op": "append", "entry": entry}], appended=1
+        )
+        self._pending.append(entry)
+        self._report_pending()
+        self._ensure_flusher()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._stopping = False
+            # Fresh context, like ConversationStore's flusher: log() is called
+            # from a turn's audit node.
+            self._flush_task = asyncio.create_task(
+                self._flush_loop(), context=contextvars.Context()
+            )
+
+    async def _flush_loop(self) -> None:
+        # Stopped by aclose() through _stopping + _wakeup, never cancelled, so
+        # shutdown cannot hang on (or interrupt) a wait or insert in progress.
+        while not self._stopping:
+            try:
+                # asyncio.timeout, not wait_for: on 3.11 wait_for can swallow a
+                # cancellation that races with the event being set.
+                async with asyncio.timeout(self.flush_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            await self.flush()
+
+    def _set_failing(self, failing: bool, exc: Exception | None = None) -> None:
+        """Log flush failures once per outage instead of on every retry."""
+        if failing and not self._flush_failing:
+            logger.error(
+                "Audit flush to Cosmos DB failing — entries kept in journal %s "
+                "and retried every %.1fs: %s",
+                self.journal_dir,
+                self.flush_interval,
+                exc,
+            )
+        elif not failing and self._flush_failing:
+            logger.info("Audit flush to Cosmos DB recovered")
+        self._flush_failing = failing
+
+    @store_operation("audit_log")
+    async def flush(self) -> int:
+        """Insert buffered entries in batches; returns how many reached Cosmos DB."""
+        async with self._flush_lock:
+            collection = self._get_store().collection
+            if collection is None:
+                return 0
+
+            flushed = 0
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                landed = batch
+                try:
+                    await collection.insert_many(
+                        [_to_document(e) for e in batch], ordered=False
+                    )
+                except BulkWriteError as exc:
+                    errors = exc.details.get("writeErrors", [])
+                    if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+                        self._set_failing(True, exc)
+                        break
+                    # Only duplicates: entries already landed before a crash
+                    # (and were counted in the rollups then).
+                    duplicates = {err.get("index") for err in errors}
+                    landed = [e for i, e in enumerate(batch) if i not in duplicates]
+                except Exception as exc:
+                    self._set_failing(True, exc)
+                    break
+                self._set_failing(False)
+                await self._add_to_rollups(landed)
+
+                ids = [e["audit_id"] for e in batch]
+                await asyncio.to_thread(
+                    self._append, [{"op": "ack", "ids": ids}], acked=len(ids)
+                )
+                del self._pending[: len(batch)]
+                self._report_pending()
+                flushed += len(batch)
+
+            if flushed:
+                logger.info("Audit log entries flushed: count=%d", flushed)
+            return flushed
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _report_pending(self) -> None:
+        metrics.QUEUE_DEPTH.labels("audit_writer").set(len(self._pending))
+
+    async def aclose(self) -> None:
+        """Stop the flusher and drain the buffer (unflushed entries stay journaled)."""
+        if self._flush_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        if self._pending:
+            logger.error(
+                "%d audit entries not flushed at shutdown — kept in journal for replay",
+                len(self._pending),
+            )
+        await asyncio.to_thread(self._close_segment)
@@ -1,63 +1,240 @@
-import logging
+"""Azure Blob Storage service for generated PDFs and archived document bodies.
+
+Uses the native async SDK (``azure.storage.blob.aio``) with a single shared
+client, so uploads reuse one pooled aiohttp transport instead of hopping
+through the thread pool.  Large payloads are uploaded as parallel blocks.
+
+SAS URLs are signed with the account key when the connection string carries
+one; under managed identity they are signed with a user delegation key that
+is cached and refreshed well before it expires.
+"""
+
 import asyncio
-from datetime import datetime, timezone, timedelta
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import IO
 
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.identity.aio import DefaultAzureCredential
 from azure.storage.blob import (
-    BlobServiceClient,
+    BlobSasPermissions,
     ContentSettings,
+    StandardBlobTier,
+    UserDelegationKey,
     generate_blob_sas,
-    BlobSasPermissions,
 )
+from azure.storage.blob.aio import BlobServiceClient
 
 from app.config import settings
+from app.services import latency, metrics
+from app.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+SAS_TTL = timedelta(hours=24)
+
+# Short-lived SAS minted on demand by the /documents/{id}/download endpoint.
+# A minted URL is reused until less than _DOWNLOAD_SAS_MIN_REMAINING is left,
+# so repeated clicks cost no signing work; the cache is LRU-bounded.
+DOWNLOAD_SAS_TTL = timedelta(minutes=15)
+_DOWNLOAD_SAS_MIN_REMAINING = timedelta(minutes=5)
+_DOWNLOAD_URL_CACHE_SIZE = 1024
+
+# Payloads above MAX_SINGLE_PUT_SIZE are split into MAX_BLOCK_SIZE blocks and
+# uploaded ``settings.blob_upload_concurrency`` at a time.
+MAX_SINGLE_PUT_SIZE = 4 * 1024 * 1024
+MAX_BLOCK_SIZE = 4 * 1024 * 1024
+
+# User delegation keys are valid for at most 7 days.  A key is refreshed once
+# it could no longer cover the requested SAS lifetime (plus clock skew) from
+# now; SAS lifetimes are therefore capped at MAX_SAS_TTL.
+_DELEGATION_KEY_TTL = timedelta(days=7)
+_DELEGATION_KEY_SKEW = timedelta(minutes=5)
+MAX_SAS_TTL = _DELEGATION_KEY_TTL - 2 * _DELEGATION_KEY_SKEW
+
 _client: BlobServiceClient | None = None
+_credential: DefaultAzureCredential | None = None
+_delegation_key: UserDelegationKey | None = None
+_delegation_key_expiry: datetime | None = None
+_delegation_key_lock = asyncio.Lock()
+_download_url_cache: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
 
 
 def _get_client() -> BlobServiceClient:
-    global _client
+    global _client, _credential
     if _client is None:
-        _client = BlobServiceClient.from_connection_string(settings.blob_connection)
+        client_options = {
+            "transport": AioHttpTransport(),
+            "max_single_put_size": MAX_SINGLE_PUT_SIZE,
+            "max_block_size": MAX_BLOCK_SIZE,
+        }
+        if settings.blob_connection:
+            _client = BlobServiceClient.from_connection_string(
+                settings.blob_connection, **client_options
+            )
+        else:
+            # Managed identity — SAS URLs are signed with a user delegation key
+            _credential = DefaultAzureCredential()
+            _client = BlobServiceClient(
+                settings.blob_account_url,
+                credential=_credential,
+                **client_options,
+            )
     return _client
 
 
-async def upload_pdf(pdf_bytes: bytes, blob_name: str) -> str:
-    """Upload PDF bytes to Blob Storage and return a 24-hour SAS URL."""
+async def close_client() -> None:
+    """Close the shared client and its connection pool (call on shutdown)."""
+    global _client, _credential, _delegation_key, _delegation_key_expiry
+    if _client is not None:
+        await _client.close()
+    if _credential is not None:
+        await _credential.close()
+    _client = None
+    _credential = None
+    _delegation_key = None
+    _delegation_key_expiry = None
+    _download_url_cache.clear()
+
+
+async def _get_user_delegation_key(
+    client: BlobServiceClient, ttl: timedelta = SAS_TTL
+) -> UserDelegationKey:
+    """Return a cached user delegation key that stays valid for at least ``ttl``."""
+    global _delegation_key, _delegation_key_expiry
+    async with _delegation_key_lock:
+        now = datetime.now(timezone.utc)
+        if (
+            _delegation_key is None
+            or _delegation_key_expiry is None
+            or _delegation_key_expiry - now < ttl + _DELEGATION_KEY_SKEW
+        ):
+            start = now - _DELEGATION_KEY_SKEW
+            expiry = now + _DELEGATION_KEY_TTL
+            _delegation_key = await client.get_user_delegation_key(start, expiry)
+            _delegation_key_expiry = expiry
+            logger.info(
+                "User delegation key refreshed: expires_at=%s", expiry.isoformat()
+            )
+        return _delegation_key
+
+
+async def warm_up() -> None:
+    """Open the pooled connection before the first upload.
+
+    Under managed identity this also acquires the access token and the user
+    delegation key that signs download links.
+    """
     client = _get_client()
-    container_client = client.get_container_client(settings.blob_container)
-    blob_client = container_client.get_blob_client(blob_name)
+    await client.get_container_client(settings.blob_container).exists()
+    if _credential is not None:
+        await _get_user_delegation_key(client)
 
-    await asyncio.to_thread(
-        blob_client.upload_blob,
-        data=pdf_bytes,
-        overwrite=True,
-        content_settings=ContentSettings(content_type="application/pdf"),
-    )
-    logger.info("PDF uploaded: blob_name=%s", blob_name)
 
-    account_name: str = client.account_name or ""
+async def generate_sas_url(blob_name: str, ttl: timedelta = SAS_TTL) -> str:
+    """Return a read-only SAS URL for ``blob_name`` valid for ``ttl``.
 
-    # Get account key for SAS token generation
-    # Handle different credential types (account key, SAS token, managed identity)
-    try:
-        account_key = client.credential.account_key
-    except AttributeError:
-        logger.warning(
-            "Blob client does not use account key credential. "
-            "SAS token generation may fail. Consider using account key or managed identity."
+    Raises:
+        ValueError: If ``ttl`` exceeds ``MAX_SAS_TTL`` (a SAS must not outlive
+            the user delegation key that signs it).
+    """
+    if ttl > MAX_SAS_TTL:
+        raise ValueError(f"SAS ttl {ttl} exceeds the maximum of {MAX_SAS_TTL}")
+    client = _get_client()
+    blob_client = client.get_blob_client(settings.blob_container, blob_name)
+    expiry = datetime.now(timezone.utc) + ttl
+
+    account_key = getattr(client.credential, "account_key", None)
+    if account_key:
+        sas_token = generate_blob_sas(
+            account_name=client.account_name,
+            container_name=settings.blob_container,
+            blob_name=blob_name,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry,
+        )
+    else:
+        sas_token = generate_blob_sas(
+            account_name=client.account_name,
+            container_name=settings.blob_container,
+            blob_name=blob_name,
+            user_delegation_key=await _get_user_delegation_key(client, ttl),
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry,
         )
-        # Fall back to using the blob URL without SAS for managed identity
-        return blob_client.url
-
-    sas_token = generate_blob_sas(
-        account_name=account_name,
-        container_name=settings.blob_container,
-        blob_name=blob_name,
-        account_key=account_key,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.now(timezone.utc) + timedelta(hours=24),
+    return f"{blob_client.url}?{sas_token}"
+
+
+async def get_download_url(blob_name: str) -> str:
+    """Return a short-lived read SAS URL for ``blob_name``, reusing a cached one while fresh."""
+    now = datetime.now(timezone.utc)
+    cached = _download_url_cache.get(blob_name)
+    if cached is not None and cached[1] - now > _DOWNLOAD_SAS_MIN_REMAINING:
+        _download_url_cache.move_to_end(blob_name)
+        return cached[0]
+
+    url = await generate_sas_url(blob_name, ttl=DOWNLOAD_SAS_TTL)
+    _download_url_cache[blob_name] = (url, now + DOWNLOAD_SAS_TTL)
+    _download_url_cache.move_to_end(blob_name)
+    while len(_download_url_cache) > _DOWNLOAD_URL_CACHE_SIZE:
+        _download_url_cache.popitem(last=False)
+    return url
+
+
+@traced("blob upload_pdf")
+async def upload_pdf(
+    data: bytes | IO[bytes], blob_name: str, length: int | None = None
+) -> str:
+    """Upload a PDF to Blob Storage and return a 24-hour SAS URL.
+
+    Args:
+        data: PDF bytes or a readable binary stream.  Streams larger than
+            ``MAX_SINGLE_PUT_SIZE`` are uploaded in parallel blocks.
+        blob_name: Destination path inside ``settings.blob_container``.
+        length: Stream length in bytes, if known (lets the SDK pick the
+            upload strategy without buffering).
+    """
+    client = _get_client()
+    blob_client = client.get_blob_client(settings.blob_container, blob_name)
+
+    try:
+        with metrics.timed(metrics.PDF_UPLOAD_LATENCY), latency.timed("upload"):
+            await blob_client.upload_blob(
+                data,
+                length=length,
+                overwrite=True,
+                content_settings=ContentSettings(content_type="application/pdf"),
+                max_concurrency=settings.blob_upload_concurrency,
+            )
+    except Exception as exc:
+        metrics.ERRORS.labels("blob", metrics.error_status(exc)).inc()
+        raise
+    logger.info("PDF uploaded: blob_name=%s", blob_name)
+
+    return await generate_sas_url(blob_name)
+
+
+async def upload_archive(blob_name: str, data: bytes) -> None:
+    """Store a compressed document body in the Cool access tier.
+
+    Used by :mod:`app.services.document_tiering`; overwriting makes a re-run
+    of an interrupted tiering pass harmless.
+    """
+    blob_client = _get_client().get_blob_client(settings.blob_container, blob_name)
+    await blob_client.upload_blob(
+        data,
+        overwrite=True,
+        # application/gzip rather than Content-Encoding: gzip, so downloads
+        # return the stored bytes instead of being decoded by the transport.
+        content_settings=ContentSettings(content_type="application/gzip"),
+        standard_blob_tier=StandardBlobTier.COOL,
     )
 
-    return f"{blob_client.url}?{sas_token}"
+
+async def download_archive(blob_name: str) -> bytes:
+    """Read back a blob written by :func:`upload_archive` (still compressed)."""
+    blob_client = _get_client().get_blob_client(settings.blob_container, blob_name)
+    stream = await blob_client.download_blob()
+    return await stream.readall()
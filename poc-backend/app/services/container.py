@@ -0,0 +1,220 @@
+"""Process-wide service container.
+
+The FastAPI lifespan builds one :class:`ServiceContainer`, warms it up in the
+background and closes it on shutdown; ``/ready`` reports the replica ready
+once :meth:`ServiceContainer.start` has run every warm-up step and the
+required ones (graph, Mongo) have succeeded.  It owns the stores, the audit
+writer and the usage rollups it feeds, the compiled graph and the lifecycle of
+the shared SDK clients (LLM, Blob Storage, Mongo pool).
+
+:func:`app.agent.graph.run_agent` passes the container to graph nodes as
+``config["configurable"]["services"]``; nodes resolve it with
+:func:`get_services`, so a test or benchmark can run the graph against any
+store implementation by passing its own container.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+from app.config import settings
+from app.services import ai_foundry, blob_storage, cosmos_db
+from app.services.audit_writer import AuditWriter
+from app.services.cosmos_db import ConversationStore, DocumentStore
+from app.services.indexes import ensure_indexes
+from app.services.turn_guard import ActivityDeduper, ConversationLeases
+from app.services.twi_retrieval import TwiRetriever
+from app.services.usage_rollups import UsageRollupStore
+
+logger = logging.getLogger(__name__)
+
+# A hung dependency must not keep a replica out of rotation for ever; the
+# step is skipped and its dependency set up again on first use.
+_WARM_UP_STEP_TIMEOUT = 60.0
+
+# Steps a replica cannot serve a turn without: until they succeed it stays
+# unready and they are retried (backing off up to the maximum).  Any other
+# step only degrades the first request that needs it.
+_REQUIRED_STEPS = ("graph", "mongo")
+_REQUIRED_RETRY_MIN = 1.0
+_REQUIRED_RETRY_MAX = 30.0
+
+
+@dataclass
+class ServiceContainer:
+    conversations: ConversationStore
+    documents: DocumentStore
+    usage: UsageRollupStore
+    audit_writer: AuditWriter
+    retriever: TwiRetriever
+    activities: ActivityDeduper
+    leases: ConversationLeases
+    graph: Any = None
+    ready: bool = False
+    # Warm-up step → wall time in ms, and step → error for failed steps.
+    startup_timings: dict[str, float] = field(default_factory=dict)
+    startup_failures: dict[str, str] = field(default_factory=dict)
+    _graph_lock: asyncio.Lock = field(
+        default_factory=asyncio.Lock, init=False, repr=False
+    )
+    _stopping: asyncio.Event = field(
+        default_factory=asyncio.Event, init=False, repr=False
+    )
+
+    @classmethod
+    def create(cls, **overrides: Any) -> "ServiceContainer":
+        """Build the default services; keyword arguments replace individual ones."""
+        factories = {
+            "conversations": ConversationStore,
+            "documents": DocumentStore,
+            "usage": UsageRollupStore,
+            "activities": ActivityDeduper,
+            "leases": ConversationLeases,
+        }
+        for name, factory in factories.items():
+            if name not in overrides:
+                overrides[name] = factory()
+        if "audit_writer" not in overrides:
+            overrides["audit_writer"] = AuditWriter(rollups=overrides["usage"])
+        if "retriever" not in overrides:
+            overrides["retriever"] = TwiRetriever(overrides["documents"])
+        return cls(**overrides)
+
+    async def start(self, **warm_ups: Callable[[], Awaitable[Any]]) -> None:
+        """Warm up every dependency so the first request pays no setup cost.
+
+        The steps run concurrently and each one is timed; ``warm_ups`` adds
+        named steps owned by the caller.  A failed step is logged and recorded
+        in :attr:`startup_failures` (its dependency is set up again on first
+        use).  Failed required steps (graph, Mongo) are retried until they
+        succeed or :meth:`stop` is called; :attr:`ready` is set once every
+        step has run and none of the required ones has failed.
+        """
+        steps: dict[str, Callable[[], Awaitable[Any]]] = {
+            "renderer": self._warm_renderer,
+            "indexes": ensure_indexes,
+            "graph": self.get_graph,
+            "audit_writer": self.audit_writer.start,
+        }
+        if settings.cosmos_connection:
+            steps["mongo"] = cosmos_db.ping
+        if settings.ai_foundry_endpoint:
+            steps["llm"] = ai_foundry.warm_up
+        if settings.blob_connection or settings.blob_account_url:
+            steps["blob"] = blob_storage.warm_up
+        steps.update(warm_ups)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self._warm(name, step) for name, step in steps.items()))
+        self.startup_timings["total"] = _elapsed_ms(started)
+        if not await self._retry_required(steps):
+            return
+        self.ready = True
+        logger.info(
+            "Service container ready in %.0f ms (%s)",
+            self.startup_timings["total"],
+            ", ".join(
+                f"{name}={ms:.0f}ms"
+                for name, ms in self.startup_timings.items()
+                if name != "total"
+            ),
+        )
+
+    async def _retry_required(
+        self, steps: dict[str, Callable[[], Awaitable[Any]]]
+    ) -> bool:
+        """Retry failed required steps; False if stopped before they succeed."""
+        delay = _REQUIRED_RETRY_MIN
+        while failed := [n for n in _REQUIRED_STEPS if n in self.startup_failures]:
+            logger.warning(
+                "Not ready: required warm-up steps %s failed, retrying in %.0f s",
+                ", ".join(failed),
+                delay,
+            )
+            try:
+                async with asyncio.timeout(delay):
+                    await self._stopping.wait()
+            except TimeoutError:
+                pass
+            if self._stopping.is_set():
+                return False
+            for name in failed:
+                del self.startup_failures[name]
+            await asyncio.gather(*(self._warm(name, steps[name]) for name in failed))
+            delay = min(delay * 2, _REQUIRED_RETRY_MAX)
+        return True
+
+    def stop(self) -> None:
+        """End the retries of :meth:`start` (on shutdown)."""
+        self._stopping.set()
+
+    async def _warm(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(_WARM_UP_STEP_TIMEOUT):
+                await step()
+        except Exception as exc:  # noqa: BLE001
+            self.startup_failures[name] = str(exc) or type(exc).__name__
+            logger.error("Warm-up step %s failed: %s", name, exc)
+        finally:
+            self.startup_timings[name] = _elapsed_ms(started)
+
+    @staticmethod
+    async def _warm_renderer() -> None:
+        from app.agent.tools.pdf_generator import warm_up_renderer
+
+        # On the loop thread, like every render: requests are already being
+        # served and the shared Markdown converter is not thread-safe.  Yield
+        # first so the other steps' I/O is under way during the layout.
+        await asyncio.sleep(0)
+        warm_up_renderer()
+
+    async def get_graph(self):
+        """Return the compiled graph, compiling it on first use."""
+        if self.graph is None:
+            async with self._graph_lock:
+                if self.graph is None:
+                    from app.agent.graph import create_agent_graph
+
+                    self.graph = await create_agent_graph()
+        return self.graph
+
+    async def aclose(self) -> None:
+        """Drain buffered writes, then close the shared clients."""
+        await self.audit_writer.aclose()
+        await self.conversations.aclose()
+        await blob_storage.close_client()
+        await ai_foundry.close_client()
+        cosmos_db.close_client()
+        logger.info("Service container closed")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+_services: ServiceContainer | None = None
+
+
+def set_services(services: ServiceContainer | None) -> None:
+    """Install the process-wide container (done by the FastAPI lifespan)."""
+    global _services
+    _services = services
+
+
+def get_services(config: RunnableConfig | None = None) -> ServiceContainer:
+    """Return the container injected into this graph run, else the process one."""
+    if config is not None:
+        services = config.get("configurable", {}).get("services")
+        if services is not None:
+            return services
+    global _services
+    if _services is None:
+        # Outside the app lifespan (scripts, notebooks) — build on first use.
+        _services = ServiceContainer.create()
+    return _services
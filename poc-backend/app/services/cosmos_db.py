@@ -1,9 +1,23 @@
+import asyncio
+import base64
+import contextvars
+import gzip
+import hashlib
+import json
 import logging
+import re
+import unicodedata
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from app.config import settings
+from app.services import blob_storage
+from app.services.metrics import MongoCommandMetrics
+from app.services.tracing import store_operation
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +33,49 @@ def _get_db() -> AsyncIOMotorDatabase:
                 "Cosmos DB connection string not configured. "
                 "Set COSMOS_CONNECTION environment variable."
             )
-        _client = AsyncIOMotorClient(settings.cosmos_connection, retryWrites=False)
+        _client = AsyncIOMotorClient(
+            settings.cosmos_connection,
+            retryWrites=False,
+            event_listeners=[MongoCommandMetrics()],
+        )
         _db = _client[settings.cosmos_database]
     return _db
 
 
+async def ping() -> None:
+    """Round-trip to the server, opening the first pooled connection."""
+    await _get_db().command("ping")
+
+
+def close_client() -> None:
+    """Close the shared Mongo client and its connection pool (call on shutdown)."""
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client = None
+    _db = None
+
+
+@dataclass
+class _PendingActivity:
+    """Coalesced conversation bookkeeping waiting to be flushed."""
+
+    user_id: str
+    tenant_id: str
+    channel: str
+    first_seen: datetime
+    last_activity: datetime
+    message_count: int = 0
+
+
 class ConversationStore:
-    def __init__(self) -> None:
+    def __init__(self, write_behind: bool | None = None) -> None:
+        self.write_behind = (
+            settings.conversation_write_behind if write_behind is None else write_behind
+        )
+        self._pending: dict[str, _PendingActivity] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
         try:
             self.collection = _get_db()["conversations"]
         except RuntimeError:
@@ -35,6 +85,30 @@ class ConversationStore:
             )
             self.collection = None
 
+    @staticmethod
+    def _upsert_spec(
+        user_id: str,
+        tenant_id: str,
+        channel: str,
+        started_at: datetime,
+        last_activity: datetime,
+        message_count: int,
+    ) -> dict:
+        # message_count is only $inc'd: an upsert starts it from 0, and a field
+        # may not appear in both $inc and $setOnInsert.
+        return {
+            "$setOnInsert": {
+                "user_id": user_id,
+                "tenant_id": tenant_id,
+                "channel": channel,
+                "started_at": started_at,
+                "status": "active",
+            },
+            "$max": {"last_activity": last_activity},
+            "$inc": {"message_count": message_count},
+        }
+
+    @store_operation("conversations")
     async def get_or_create(
         self,
         conversation_id: str,
@@ -42,6 +116,7 @@ class ConversationStore:
         channel: str,
         tenant_id: str | None = None,
     ) -> dict:
+        """Upsert the conversation and count this message in one atomic round trip."""
         if self.collection is None:
             logger.warning(
                 "ConversationStore.get_or_create() called without DB — "
@@ -50,33 +125,171 @@ class ConversationStore:
             )
             return {}
 
-        resolved_tenant = tenant_id or settings.default_tenant_id
-        doc = await self.collection.find_one({"conversation_id": conversation_id})
-        if doc:
-            await self.collection.update_one(
+        now = datetime.now(timezone.utc)
+        update = self._upsert_spec(
+            user_id,
+            tenant_id or settings.default_tenant_id,
+            channel,
+            started_at=now,
+            last_activity=now,
+            message_count=1,
+        )
+        try:
+            return await self._upsert(conversation_id, update)
+        except DuplicateKeyError:
+            # Lost a concurrent first-message insert to the unique index —
+            # the document exists now, so the retry is a plain update.
+            return await self._upsert(conversation_id, update)
+
+    async def _upsert(self, conversation_id: str, update: dict) -> dict:
+        return await self.collection.find_one_and_update(
+            {"conversation_id": conversation_id},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0},
+        )
+
+    @store_operation("conversations")
+    async def record_activity(
+        self,
+        conversation_id: str,
+        user_id: str,
+        channel: str,
+        tenant_id: str | None = None,
+    ) -> None:
+        """Count an inbound message.
+
+        In write-behind mode this only updates an in-memory counter; the
+        background flusher persists it later.  Otherwise it falls through to
+        :meth:`get_or_create`.
+        """
+        if self.collection is None:
+            return
+        if not self.write_behind:
+            await self.get_or_create(conversation_id, user_id, channel, tenant_id)
+            return
+
+        now = datetime.now(timezone.utc)
+        pending = self._pending.get(conversation_id)
+        if pending is None:
+            pending = self._pending[conversation_id] = _PendingActivity(
+                user_id=user_id,
+                tenant_id=tenant_id or settings.default_tenant_id,
+                channel=channel,
+                first_seen=now,
+                last_activity=now,
+            )
+        pending.last_activity = now
+        pending.message_count += 1
+        self._ensure_flusher()
+
+    def _ensure_flusher(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._stopping.clear()
+            # Started by whichever turn writes first: run it in a fresh context,
+            # not that turn's (its span, conversation id and latency ledger).
+            self._flush_task = asyncio.create_task(
+                self._flush_loop(), context=contextvars.Context()
+            )
+
+    async def _flush_loop(self) -> None:
+        # Stopped via the _stopping event, never cancelled, so a bulk_write in
+        # flight always completes (or re-queues its batch) before shutdown.
+        while not self._stopping.is_set():
+            try:
+                # asyncio.timeout, not wait_for: on 3.11 wait_for can swallow a
+                # cancellation that races with the event being set.
+                async with asyncio.timeout(
+                    settings.conversation_flush_interval_seconds
+                ):
+                    await self._stopping.wait()
+            except TimeoutError:
+                pass
+            await self.flush()
+
+    def _requeue(self, batch: dict[str, _PendingActivity]) -> None:
+        """Merge unwritten updates back into the buffer (newer increments win on top)."""
+        for conversation_id, p in batch.items():
+            newer = self._pending.get(conversation_id)
+            if newer is not None:
+                p.message_count += newer.message_count
+                p.last_activity = max(p.last_activity, newer.last_activity)
+            self._pending[conversation_id] = p
+
+    @store_operation("conversations")
+    async def flush(self) -> int:
+        """Write all coalesced updates in a single unordered bulk write.
+
+        Returns the number of conversations flushed.  Updates that were not
+        written (the whole batch on a transport error, only the failed
+        operations on a partial ``BulkWriteError``) are merged back into the
+        buffer and retried on the next flush.
+        """
+        if self.collection is None or not self._pending:
+            return 0
+
+        batch, self._pending = self._pending, {}
+        conversation_ids = list(batch)
+        operations = [
+            UpdateOne(
                 {"conversation_id": conversation_id},
-                {
-                    "$set": {"last_activity": datetime.now(timezone.utc)},
-                    "$inc": {"message_count": 1},
-                },
+                self._upsert_spec(
+                    p.user_id,
+                    p.tenant_id,
+                    p.channel,
+                    started_at=p.first_seen,
+                    last_activity=p.last_activity,
+                    message_count=p.message_count,
+                ),
+                upsert=True,
             )
-            return doc
+            for conversation_id, p in batch.items()
+        ]
+        unwritten = batch
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+            unwritten = {}
+        except BulkWriteError as exc:
+            # Unordered bulk writes apply every operation that did not error —
+            # re-queue only the failed ones so counts are not incremented twice.
+            failed = {err["index"] for err in exc.details.get("writeErrors", [])}
+            unwritten = {
+                conversation_ids[i]: batch[conversation_ids[i]] for i in failed
+            }
+            logger.warning(
+                "ConversationStore flush partially failed, retrying %d of %d: %s",
+                len(unwritten),
+                len(batch),
+                exc,
+            )
+        except Exception as exc:
+            logger.warning(
+                "ConversationStore flush failed, retrying later (%d conversations): %s",
+                len(batch),
+                exc,
+            )
+        finally:
+            # Also runs on cancellation, so an interrupted write is never dropped.
+            self._requeue(unwritten)
+        return len(batch) - len(unwritten)
 
-        new_doc: dict = {
-            "conversation_id": conversation_id,
-            "user_id": user_id,
-            "tenant_id": resolved_tenant,
-            "channel": channel,
-            "started_at": datetime.now(timezone.utc),
-            "last_activity": datetime.now(timezone.utc),
-            "message_count": 1,
-            "status": "active",
-        }
-        await self.collection.insert_one(new_doc)
-        return new_doc
+    async def aclose(self) -> None:
+        """Stop the background flusher and write out anything still buffered."""
+        if self._flush_task is not None:
+            self._stopping.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
 
 
 class AuditStore:
+    """Handle on the ``audit_log`` collection.
+
+    Entries are written through :class:`app.services.audit_writer.AuditWriter`,
+    which journals them locally and batches the inserts.
+    """
+
     def __init__(self) -> None:
         try:
             self.collection = _get_db()["audit_log"]
@@ -87,23 +300,54 @@ class AuditStore:
             )
             self.collection = None
 
-    async def log(self, entry: dict) -> None:
-        if self.collection is None:
-            logger.error(
-                "AUDIT TRAIL SKIPPED (EU AI Act compliance gap): "
-                "event_type=%s conversation_id=%s — Cosmos DB not available.",
-                entry.get("event_type", "unknown"),
-                entry.get("conversation_id", "unknown"),
-            )
-            return
-        entry["created_at"] = datetime.now(timezone.utc)
-        await self.collection.insert_one(entry)
-        logger.info(
-            "Audit log entry saved: conversation_id=%s", entry.get("conversation_id")
-        )
+
+def normalize_key(value: str | None) -> str | None:
+    """Case- and accent-insensitive form of a filter value (machine id, department…)."""
+    if not value:
+        return None
+    folded = unicodedata.normalize("NFKD", value.strip().casefold())
+    return "".join(c for c in folded if not unicodedata.combining(c)) or None
+
+
+def title_terms(title: str) -> list[str]:
+    """Searchable words of a title, e.g. ``"CÍM: CNC-01 beállítás"`` → ``["cim", "cnc-01", "beallitas"]``."""
+    return sorted(set(re.findall(r"[\w-]+", normalize_key(title) or "")))
+
+
+def _encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"].isoformat(), doc["document_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Raises ``ValueError`` for a cursor that was not produced by :meth:`DocumentStore.search`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(document_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _wants_draft(projection: dict) -> bool:
+    if "draft_content" in projection:
+        return bool(projection["draft_content"])
+    # An exclusion projection returns every field it does not name.
+    return all(not value for key, value in projection.items() if key != "_id")
 
 
 class DocumentStore:
+    """Handle on ``generated_documents``.
+
+    Old documents may be *cold*: :mod:`app.services.document_tiering` has
+    moved their ``draft_content`` into a compressed blob and left a
+    ``draft_blob`` pointer.  Reads that ask for ``draft_content`` rehydrate it
+    from the blob, so callers never see the difference.
+    """
+
+    # List views never need the full draft text.
+    LIST_PROJECTION = {"_id": 0, "draft_content": 0, "title_terms": 0, "draft_blob": 0}
+
     def __init__(self) -> None:
         try:
             self.collection = _get_db()["generated_documents"]
@@ -114,6 +358,7 @@ class DocumentStore:
             )
             self.collection = None
 
+    @store_operation("documents")
     async def save(self, doc: dict) -> dict:
         if self.collection is None:
             logger.warning(
@@ -123,58 +368,156 @@ class DocumentStore:
             )
             return doc
         doc["created_at"] = datetime.now(timezone.utc)
+        for field in ("machine_id", "process_type", "department"):
+            if field in doc:
+                doc[field] = normalize_key(doc[field])
+        doc["title_terms"] = title_terms(doc.get("title", ""))
         await self.collection.insert_one(doc)
         return doc
 
+    @store_operation("documents")
+    async def get(
+        self,
+        document_id: str,
+        projection: dict | None = None,
+        tenant_id: str | None = None,
+    ) -> dict | None:
+        """Fetch a generated document by ``document_id`` (None if missing or no DB).
 
-class PendingStateStore:
-    """Lightweight key-value store for transient per-conversation flags.
+        With ``tenant_id`` the lookup only matches that tenant's documents.
+        """
+        if self.collection is None:
+            logger.warning(
+                "DocumentStore.get() called without DB — document_id=%s", document_id
+            )
+            return None
+        query = {"document_id": document_id}
+        if tenant_id is not None:
+            query["tenant_id"] = tenant_id
+        projection, wants_draft, strip = self._tiered_projection(projection)
+        doc = await self.collection.find_one(query, projection)
+        if doc is not None and wants_draft:
+            await self._rehydrate(doc, strip)
+        return doc
 
-    Used to track Telegram pending-revision state across replicas.
-    Falls back to an in-memory dict when Cosmos DB is not available.
-    """
+    @store_operation("documents")
+    async def get_many(
+        self, document_ids: list[str], projection: dict | None = None
+    ) -> list[dict]:
+        """Fetch several documents by ``document_id`` in one round trip."""
+        if self.collection is None or not document_ids:
+            return []
+        projection, wants_draft, strip = self._tiered_projection(projection)
+        docs = await self.collection.find(
+            {"document_id": {"$in": document_ids}}, projection
+        ).to_list(len(document_ids))
+        if wants_draft:
+            await asyncio.gather(*(self._rehydrate(doc, strip) for doc in docs))
+        return docs
 
-    def __init__(self) -> None:
-        self._memory: dict[str, bool] = {}
-        try:
-            self.collection = _get_db()["pending_state"]
-        except RuntimeError:
-            logger.warning(
-                "Cosmos DB not configured — PendingStateStore using in-memory fallback. "
-                "State will NOT survive restarts or scale across replicas."
+    @staticmethod
+    def _tiered_projection(projection: dict | None) -> tuple[dict, bool, bool]:
+        """Return ``(projection, wants_draft, strip_pointer)`` for a read.
+
+        A read that wants ``draft_content`` also needs ``draft_blob`` to
+        rehydrate a cold document; if the caller's projection leaves the
+        pointer out, it is fetched anyway and dropped again afterwards.
+        """
+        projection = projection or {"_id": 0}
+        wants_draft = _wants_draft(projection)
+        if wants_draft and projection.get("draft_blob") == 0:
+            without_pointer = {k: v for k, v in projection.items() if k != "draft_blob"}
+            return without_pointer, True, True
+        if (
+            wants_draft
+            and projection.get("draft_content")
+            and "draft_blob" not in projection
+        ):
+            return {**projection, "draft_blob": 1}, True, True
+        return projection, wants_draft, False
+
+    async def _rehydrate(self, doc: dict, strip_pointer: bool) -> None:
+        pointer = doc.get("draft_blob")
+        if strip_pointer:
+            doc.pop("draft_blob", None)
+        if not pointer or "draft_content" in doc:
+            return
+        data = gzip.decompress(await blob_storage.download_archive(pointer["name"]))
+        if hashlib.sha256(data).hexdigest() != pointer["sha256"]:
+            raise RuntimeError(
+                f"Archived draft {pointer['name']} does not match its checksum"
             )
-            self.collection = None
+        doc["draft_content"] = data.decode("utf-8")
+
+    @store_operation("documents")
+    async def search(
+        self,
+        tenant_id: str,
+        *,
+        machine_id: str | None = None,
+        process_type: str | None = None,
+        department: str | None = None,
+        title: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+        projection: dict | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """List a tenant's documents, newest first, one keyset page at a time.
 
-    async def set_flag(self, conversation_id: str, flag: str) -> None:
+        Returns ``(items, next_cursor)``; pass ``next_cursor`` back to get the
+        following page (``None`` on the last page).  Every word of ``title``
+        must prefix-match a word of the document title.  Items omit
+        ``draft_content`` unless ``projection`` says otherwise.
+
+        Raises:
+            ValueError: If ``cursor`` is malformed.
+        """
         if self.collection is None:
-            self._memory[f"{conversation_id}:{flag}"] = True
-            return
-        try:
-            await self.collection.update_one(
-                {"conversation_id": conversation_id, "flag": flag},
+            return [], None
+
+        clauses: list[dict] = [{"tenant_id": tenant_id}]
+        for field, value in (
+            ("machine_id", machine_id),
+            ("process_type", process_type),
+            ("department", department),
+        ):
+            if normalize_key(value):
+                clauses.append({field: normalize_key(value)})
+        for term in title_terms(title or ""):
+            # Anchored, so each term is an index range scan on title_terms.
+            clauses.append({"title_terms": {"$regex": f"^{re.escape(term)}"}})
+
+        created: dict = {}
+        if created_from is not None:
+            created["$gte"] = created_from
+        if created_to is not None:
+            created["$lt"] = created_to
+        if created:
+            clauses.append({"created_at": created})
+
+        if cursor:
+            after_created, after_id = _decode_cursor(cursor)
+            clauses.append(
                 {
-                    "$set": {
-                        "conversation_id": conversation_id,
-                        "flag": flag,
-                        "value": True,
-                        "updated_at": datetime.now(timezone.utc),
-                    }
-                },
-                upsert=True,
+                    "$or": [
+                        {"created_at": {"$lt": after_created}},
+                        {"created_at": after_created, "document_id": {"$lt": after_id}},
+                    ]
+                }
             )
-        except Exception as exc:
-            logger.warning("PendingStateStore.set_flag DB error, using memory: %s", exc)
-            self._memory[f"{conversation_id}:{flag}"] = True
 
-    async def pop_flag(self, conversation_id: str, flag: str) -> bool:
-        """Check and atomically remove a flag. Returns True if it was set."""
-        if self.collection is None:
-            return self._memory.pop(f"{conversation_id}:{flag}", False)
-        try:
-            doc = await self.collection.find_one_and_delete(
-                {"conversation_id": conversation_id, "flag": flag}
+        # One extra row tells whether another page exists without a count query.
+        docs = (
+            await self.collection.find(
+                {"$and": clauses}, projection or self.LIST_PROJECTION
             )
-            return doc is not None
-        except Exception as exc:
-            logger.warning("PendingStateStore.pop_flag DB error, using memory: %s", exc)
-            return self._memory.pop(f"{conversation_id}:{flag}", False)
+            .sort([("created_at", DESCENDING), ("document_id", DESCENDING)])
+            .limit(limit + 1)
+            .to_list(limit + 1)
+        )
+        if len(docs) <= limit:
+            return docs, None
+        docs = docs[:limit]
+        return docs, _encode_cursor(docs[-1])
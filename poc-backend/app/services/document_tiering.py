@@ -0,0 +1,125 @@
+"""Move the body of old generated documents out of Cosmos DB.
+
+Approved TWIs are written once and rarely read again, but their
+``draft_content`` markdown keeps ``generated_documents`` (and every RU spent
+on it) growing.  This job gzips the body of documents older than
+``settings.document_tiering_age_days`` into a Cool-tier blob and replaces the
+field with a small ``draft_blob`` pointer::
+
+    {"name": "drafts/<tenant>/<document_id>.md.gz", "encoding": "gzip",
+     "size": ..., "compressed_size": ..., "sha256": ..., "tiered_at": ...}
+
+:class:`app.services.cosmos_db.DocumentStore` rehydrates the body from the
+blob whenever a read asks for ``draft_content``.  The job is resumable by
+construction: it selects documents that still carry ``draft_content``, and
+the blob is written before the field is removed, so an interrupted run simply
+picks up the remaining documents next time.
+
+Run it (e.g. as a nightly Container Apps job) with::
+
+    cd poc-backend
+    python -m app.services.document_tiering [--older-than-days 90]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services import blob_storage
+from app.services.cosmos_db import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 100
+
+
+def archive_blob_name(doc: dict) -> str:
+    return f"drafts/{doc.get('tenant_id') or 'unknown'}/{doc['document_id']}.md.gz"
+
+
+async def archive_document(documents: DocumentStore, doc: dict) -> dict:
+    """Move one document's ``draft_content`` to a blob; returns the pointer."""
+    data = doc["draft_content"].encode("utf-8")
+    compressed = gzip.compress(data, compresslevel=9)
+    pointer = {
+        "name": archive_blob_name(doc),
+        "encoding": "gzip",
+        "size": len(data),
+        "compressed_size": len(compressed),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "tiered_at": datetime.now(timezone.utc),
+    }
+    await blob_storage.upload_archive(pointer["name"], compressed)
+    await documents.collection.update_one(
+        {"document_id": doc["document_id"], "draft_content": {"$exists": True}},
+        {"$set": {"draft_blob": pointer}, "$unset": {"draft_content": ""}},
+    )
+    return pointer
+
+
+async def tier_cold_documents(
+    documents: DocumentStore | None = None,
+    older_than: timedelta | None = None,
+    batch_size: int = _BATCH_SIZE,
+) -> int:
+    """Archive the body of every document older than ``older_than``; returns the count."""
+    documents = documents or DocumentStore()
+    if documents.collection is None:
+        logger.warning("Cosmos DB not configured — nothing to tier.")
+        return 0
+    if older_than is None:
+        older_than = timedelta(days=settings.document_tiering_age_days)
+    cutoff = datetime.now(timezone.utc) - older_than
+
+    moved = saved = 0
+    while True:
+        batch = (
+            await documents.collection.find(
+                {"created_at": {"$lt": cutoff}, "draft_content": {"$exists": True}},
+                {"_id": 0, "document_id": 1, "tenant_id": 1, "draft_content": 1},
+            )
+            .sort("created_at", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        for doc in batch:
+            pointer = await archive_document(documents, doc)
+            moved += 1
+            saved += pointer["size"]
+        if len(batch) < batch_size:
+            break
+
+    logger.info(
+        "Document tiering done: documents=%d draft_bytes_moved=%d cutoff=%s",
+        moved,
+        saved,
+        cutoff.isoformat(),
+    )
+    return moved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--older-than-days", type=int, default=settings.document_tiering_age_days
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> int:
+        try:
+            return await tier_cold_documents(
+                older_than=timedelta(days=args.older_than_days)
+            )
+        finally:
+            await blob_storage.close_client()
+
+    print(f"Tiered {asyncio.run(run())} document(s)")
+
+
+if __name__ == "__main__":
+    main()
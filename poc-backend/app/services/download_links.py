@@ -0,0 +1,48 @@
+"""Signed, expiring links to the ``/documents/{document_id}/download`` endpoint.
+
+A download link is a capability URL: whoever holds it can fetch the PDF until
+``exp`` passes, without signing in (Teams and Telegram open it in a browser
+that carries no bot credentials).  The HMAC stops anyone from guessing or
+extending links; ``DOWNLOAD_LINK_TTL_DAYS`` bounds how long a forwarded or
+leaked link stays useful.
+"""
+
+import base64
+import hashlib
+import hmac
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+
+
+def _signature(document_id: str, exp: int) -> str:
+    digest = hmac.new(
+        settings.download_link_secret.encode(),
+        f"{document_id}:{exp}".encode(),
+        hashlib.sha256,
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def build_download_url(document_id: str) -> str | None:
+    """Return a signed download link, or None if links are not configured."""
+    if not settings.public_base_url or not settings.download_link_secret:
+        return None
+    expires_at = datetime.now(timezone.utc) + timedelta(
+        days=settings.download_link_ttl_days
+    )
+    exp = int(expires_at.timestamp())
+    base_url = settings.public_base_url.rstrip("/")
+    return (
+        f"{base_url}/documents/{document_id}/download"
+        f"?exp={exp}&sig={_signature(document_id, exp)}"
+    )
+
+
+def verify_download_signature(document_id: str, exp: int, sig: str) -> bool:
+    """True if ``sig`` was issued for ``document_id``/``exp`` and has not expired."""
+    if not settings.download_link_secret:
+        return False
+    if exp < datetime.now(timezone.utc).timestamp():
+        return False
+    return hmac.compare_digest(sig, _signature(document_id, exp))
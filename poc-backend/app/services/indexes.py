@@ -0,0 +1,187 @@
+"""Declarative index and TTL registry for the application's Cosmos DB collections.
+
+:data:`INDEX_REGISTRY` lists every index the stores in ``cosmos_db.py`` rely
+on; :func:`apply_indexes` creates them idempotently at startup (an existing
+identical index is a no-op).  The LangGraph checkpoint collections are managed
+by ``MongoDBSaver._ensure_indexes`` and are not listed here.
+
+TTL indexes name the field whose age expires a document.  Cosmos DB for
+MongoDB (RU) only honours TTL on its system ``_ts`` field (last-modified
+time), so there the TTL is placed on ``_ts`` instead — equivalent for these
+collections because every touch of a document rewrites it.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.services.cosmos_db import _get_db
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_TTL_SECONDS = 90 * 24 * 3600
+# Expired leases are taken over in place; the TTL only removes idle ones.
+LEASE_TTL_SECONDS = 24 * 3600
+
+# Index-options / index-key-specs conflicts: same keys, different options.
+_INDEX_CONFLICT_CODES = {85, 86}
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    keys: tuple[tuple[str, int], ...]
+    unique: bool = False
+    ttl_seconds: int | None = None
+
+
+INDEX_REGISTRY: dict[str, tuple[IndexSpec, ...]] = {
+    "conversations": (
+        IndexSpec((("conversation_id", ASCENDING),), unique=True),
+        IndexSpec((("tenant_id", ASCENDING), ("user_id", ASCENDING))),
+        IndexSpec(
+            (("last_activity", ASCENDING),), ttl_seconds=CONVERSATION_TTL_SECONDS
+        ),
+    ),
+    "audit_log": (
+        IndexSpec((("tenant_id", ASCENDING), ("created_at", DESCENDING))),
+        IndexSpec((("conversation_id", ASCENDING), ("created_at", ASCENDING))),
+        IndexSpec((("event_type", ASCENDING),)),
+        # AuditExport: tenant equality, keyset order.
+        IndexSpec(
+            (("tenant_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING))
+        ),
+    ),
+    "generated_documents": (
+        IndexSpec((("document_id", ASCENDING),), unique=True),
+        IndexSpec((("conversation_id", ASCENDING),)),
+        # DocumentStore.search: tenant equality, optional filter, keyset sort.
+        IndexSpec(
+            (
+                ("tenant_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("document_id", DESCENDING),
+            )
+        ),
+        *(
+            IndexSpec(
+                (
+                    ("tenant_id", ASCENDING),
+                    (field, ASCENDING),
+                    ("created_at", DESCENDING),
+                    ("document_id", DESCENDING),
+                )
+            )
+            for field in ("machine_id", "process_type", "department")
+        ),
+        IndexSpec((("tenant_id", ASCENDING), ("title_terms", ASCENDING))),
+        # document_tiering: oldest documents first.
+        IndexSpec((("created_at", ASCENDING),)),
+    ),
+    # turn_guard: de-duplication keys and per-conversation leases
+    "processed_activities": (
+        IndexSpec(
+            (("created_at", ASCENDING),),
+            ttl_seconds=settings.activity_dedupe_ttl_seconds,
+        ),
+    ),
+    "conversation_leases": (
+        IndexSpec((("updated_at", ASCENDING),), ttl_seconds=LEASE_TTL_SECONDS),
+    ),
+    "usage_rollups": (
+        # UsageRollupStore.query: tenant equality, day range, report order.
+        IndexSpec(
+            (
+                ("tenant_id", ASCENDING),
+                ("day", ASCENDING),
+                ("model", ASCENDING),
+                ("event_type", ASCENDING),
+            )
+        ),
+        IndexSpec((("day", ASCENDING),)),
+    ),
+}
+
+
+def ttl_on_system_timestamp() -> bool:
+    """True for Cosmos DB for MongoDB (RU), where TTL only works on ``_ts``."""
+    return ".mongo.cosmos.azure.com" in settings.cosmos_connection
+
+
+def _resolve_keys(spec: IndexSpec, system_ttl: bool) -> list[tuple[str, int]]:
+    if spec.ttl_seconds is not None and system_ttl:
+        return [("_ts", ASCENDING)]
+    return list(spec.keys)
+
+
+async def apply_indexes(
+    db: AsyncIOMotorDatabase,
+    registry: dict[str, tuple[IndexSpec, ...]] | None = None,
+    system_ttl: bool | None = None,
+) -> list[str]:
+    """Create every registered index; returns the names that now exist.
+
+    A conflicting pre-existing index is logged and left alone (a TTL whose
+    period changed is updated in place with ``collMod``), so startup never
+    fails because of index drift.
+    """
+    registry = INDEX_REGISTRY if registry is None else registry
+    system_ttl = ttl_on_system_timestamp() if system_ttl is None else system_ttl
+
+    created: list[str] = []
+    for collection_name, specs in registry.items():
+        collection = db[collection_name]
+        for spec in specs:
+            keys = _resolve_keys(spec, system_ttl)
+            options: dict = {}
+            if spec.unique:
+                options["unique"] = True
+            if spec.ttl_seconds is not None:
+                options["expireAfterSeconds"] = spec.ttl_seconds
+            try:
+                created.append(await collection.create_index(keys, **options))
+            except OperationFailure as exc:
+                if exc.code in _INDEX_CONFLICT_CODES and spec.ttl_seconds is not None:
+                    await _update_ttl(db, collection_name, keys, spec.ttl_seconds)
+                    continue
+                logger.error(
+                    "Index %s on %s could not be applied: %s",
+                    keys,
+                    collection_name,
+                    exc,
+                )
+    logger.info(
+        "Indexes applied: %d across %d collections", len(created), len(registry)
+    )
+    return created
+
+
+async def _update_ttl(
+    db: AsyncIOMotorDatabase, collection_name: str, keys: list, ttl_seconds: int
+) -> None:
+    try:
+        await db.command(
+            "collMod",
+            collection_name,
+            index={"keyPattern": dict(keys), "expireAfterSeconds": ttl_seconds},
+        )
+        logger.info(
+            "TTL on %s %s updated to %ds", collection_name, dict(keys), ttl_seconds
+        )
+    except OperationFailure as exc:
+        logger.error(
+            "TTL on %s %s could not be updated: %s", collection_name, dict(keys), exc
+        )
+
+
+async def ensure_indexes() -> list[str]:
+    """Apply :data:`INDEX_REGISTRY` to the configured database (startup hook)."""
+    try:
+        db = _get_db()
+    except RuntimeError:
+        logger.warning("Cosmos DB not configured — skipping index creation.")
+        return []
+    return await apply_indexes(db)
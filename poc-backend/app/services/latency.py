@@ -0,0 +1,149 @@
+"""Per-turn latency ledger, persisted with the audit trail, and its percentiles.
+
+A :class:`TurnLedger` is opened for each bot turn (and for each
+:func:`app.agent.graph.run_agent` call outside the bot) and adds up where
+the turn's time went, in milliseconds:
+
+* ``node.<name>`` — each graph node;
+* ``llm`` — waiting for the model, ``render`` — PDF rendering,
+  ``upload`` — Blob upload, ``store`` — Mongo store operations;
+* ``queue_wait`` — waiting for the conversation's previous turn;
+* ``total`` — the turn so far.
+
+The keys overlap (LLM time is also part of its node's time).  After every
+node the graph copies the ledger into ``state["timings"]``, and the audit
+node stores it as the entry's ``timings``, so SLO history lives in the
+compliance record.  :func:`latency_percentiles` aggregates it per tenant.
+"""
+
+import math
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.services.cosmos_db import AuditStore
+
+PERCENTILES = (50, 95, 99)
+
+# Bounds on the work /api/latency does on the request path: only the newest
+# entries of the range are aggregated, and the query gives up after a while.
+MAX_SAMPLES = 10_000
+_QUERY_TIME_LIMIT_MS = 10_000
+
+
+class TurnLedger:
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._ms: dict[str, float] = defaultdict(float)
+
+    def add(self, key: str, seconds: float) -> None:
+        self._ms[key] += seconds * 1000
+
+    def snapshot(self) -> dict[str, float]:
+        """The timings so far, rounded to 0.1 ms, with ``total``."""
+        timings = {key: round(ms, 1) for key, ms in self._ms.items()}
+        timings["total"] = round((time.perf_counter() - self._started) * 1000, 1)
+        return timings
+
+
+# Ledger of the turn running in this task (None outside turns).
+current_ledger: ContextVar[TurnLedger | None] = ContextVar(
+    "current_ledger", default=None
+)
+
+
+@contextmanager
+def turn() -> Iterator[TurnLedger]:
+    """Open a ledger for the block, or join the one already open."""
+    ledger = current_ledger.get()
+    if ledger is not None:
+        yield ledger
+        return
+    ledger = TurnLedger()
+    token = current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        current_ledger.reset(token)
+
+
+def record(key: str, seconds: float) -> None:
+    """Add ``seconds`` to ``key`` in the current turn's ledger, if any."""
+    ledger = current_ledger.get()
+    if ledger is not None:
+        ledger.add(key, seconds)
+
+
+@contextmanager
+def timed(key: str) -> Iterator[None]:
+    """Add the block's wall time to ``key``, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(key, time.perf_counter() - started)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``."""
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+async def latency_percentiles(
+    tenant_id: str,
+    start: datetime,
+    end: datetime,
+    event_type: str | None = None,
+    store: "AuditStore | None" = None,
+    limit: int = MAX_SAMPLES,
+) -> list[dict]:
+    """p50/p95/p99 of every ledger key over a tenant's audit entries in ``[start, end)``.
+
+    Only the newest ``limit`` entries of the range are read.
+
+    Raises:
+        RuntimeError: If Cosmos DB is not configured.
+        pymongo.errors.ExecutionTimeout: If the query runs for more than 10 s.
+    """
+    # Imported here: the stores record into the ledger (via tracing).
+    from app.services.cosmos_db import AuditStore
+
+    collection = (store or AuditStore()).collection
+    if collection is None:
+        raise RuntimeError("Cosmos DB not configured — audit log unavailable")
+    query: dict = {
+        "tenant_id": tenant_id,
+        "created_at": {"$gte": start, "$lt": end},
+        "timings": {"$type": "object"},
+    }
+    if event_type:
+        query["event_type"] = event_type
+
+    samples: dict[str, list[float]] = defaultdict(list)
+    cursor = collection.find(
+        query,
+        {"_id": 0, "timings": 1},
+        sort=[("created_at", -1)],
+        limit=limit,
+        max_time_ms=_QUERY_TIME_LIMIT_MS,
+    )
+    async for entry in cursor:
+        for key, ms in entry["timings"].items():
+            samples[key].append(ms)
+
+    items = []
+    for key, values in sorted(samples.items()):
+        values.sort()
+        items.append(
+            {
+                "key": key,
+                "count": len(values),
+                **{f"p{q}": percentile(values, q) for q in PERCENTILES},
+            }
+        )
+    return items
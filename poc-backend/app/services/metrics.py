@@ -0,0 +1,151 @@
+"""Prometheus metrics for the agent's hot paths, served at ``/metrics``.
+
+Histograms cover graph nodes, LLM calls (latency and tokens by node and
+model), PDF rendering and upload, Mongo commands by collection and
+checkpoint sizes; gauges report queue depths and a counter errors by
+component and status.
+
+LLM calls are attributed to the graph node they run in through
+:data:`current_node`, which the node wrapper in :mod:`app.agent.graph` sets.
+
+Uvicorn runs several worker processes.  With ``PROMETHEUS_MULTIPROC_DIR``
+set (the Docker image does), every worker writes its samples there and
+``/metrics`` aggregates all of them, whichever worker serves the scrape.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+# Graph node currently running in this task (``-`` outside the graph).
+current_node: ContextVar[str] = ContextVar("current_node", default="-")
+
+# Seconds; nodes and LLM calls take from milliseconds to minutes.
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+NODE_LATENCY = Histogram(
+    "agentize_node_duration_seconds",
+    "Graph node execution time",
+    ["node"],
+    buckets=_SLOW_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "agentize_llm_call_duration_seconds",
+    "LLM completion call time",
+    ["node", "model"],
+    buckets=_SLOW_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "agentize_llm_tokens",
+    "Tokens per LLM call",
+    ["node", "model", "direction"],
+    buckets=(16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+PDF_RENDER_LATENCY = Histogram(
+    "agentize_pdf_render_duration_seconds",
+    "TWI PDF rendering time",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+PDF_UPLOAD_LATENCY = Histogram(
+    "agentize_pdf_upload_duration_seconds",
+    "PDF upload time to Blob Storage",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+MONGO_LATENCY = Histogram(
+    "agentize_mongo_command_duration_seconds",
+    "Mongo command round-trip time",
+    ["collection", "command"],
+)
+CHECKPOINT_BYTES = Histogram(
+    "agentize_checkpoint_bytes",
+    "Serialised size of a written LangGraph checkpoint",
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+QUEUE_DEPTH = Gauge(
+    "agentize_queue_depth",
+    "Items waiting: audit entries to flush, turns waiting for their conversation",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+ERRORS = Counter(
+    "agentize_errors_total",
+    "Errors by component and status (HTTP status code or error type)",
+    ["component", "status"],
+)
+
+
+@contextmanager
+def timed(histogram: Histogram):
+    """Observe the block's wall time in ``histogram``, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+
+def error_status(exc: BaseException) -> str:
+    """Label for an error: its HTTP status code if it has one, else its type."""
+    status = getattr(exc, "status_code", None)
+    return str(status) if status else type(exc).__name__
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command by collection (pymongo command monitoring)."""
+
+    def __init__(self) -> None:
+        # request_id → (collection, command); the driver calls back from its
+        # own threads.
+        self._started: dict[int, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._started[event.request_id] = (collection, event.command_name)
+
+    def _finished(self, event) -> None:
+        with self._lock:
+            labels = self._started.pop(event.request_id, None)
+        if labels is not None:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event)
+        code = event.failure.get("code")
+        ERRORS.labels("mongo", str(code) if code else "failed").inc()
+
+
+def render() -> tuple[bytes, str]:
+    """The exposition payload and its content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory (on shutdown)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,146 @@
+"""OpenTelemetry spans for bot turns, graph nodes, LLM calls, PDFs and stores.
+
+A turn is traced as one ``bot turn`` span with children for each graph node,
+and below them the LLM call (model, temperature and token counts), PDF
+rendering, the Blob upload and every store operation.  Every span carries
+``agentize.conversation_id``, so all the spans of a conversation can be
+found even when they belong to different traces.
+
+Spans go wherever the process's tracer provider sends them: Application
+Insights when ``APPLICATIONINSIGHTS_CONNECTION_STRING`` is set, and an OTLP
+collector when ``OTEL_EXPORTER_OTLP_ENDPOINT`` is set (needs the optional
+exporter package: ``pip install .[otlp]``).  With neither, the spans are
+no-ops.
+"""
+
+import functools
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.trace import SpanKind
+
+from app.config import settings
+from app.services import latency
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_ID = "agentize.conversation_id"
+
+tracer = trace.get_tracer("agentize")
+
+# Conversation of the turn running in this task (None outside turns).
+current_conversation: ContextVar[str | None] = ContextVar(
+    "current_conversation", default=None
+)
+
+# Set while a store operation runs, so one it calls (``get`` → ``_rehydrate``,
+# a retry through another method) is not counted in the ledger twice.
+_in_store_operation: ContextVar[bool] = ContextVar("_in_store_operation", default=False)
+
+
+@contextmanager
+def conversation(conversation_id: str | None) -> Iterator[None]:
+    """Tag the spans started in the block with ``conversation_id``."""
+    if not conversation_id:
+        yield
+        return
+    token = current_conversation.set(conversation_id)
+    try:
+        yield
+    finally:
+        current_conversation.reset(token)
+
+
+class ConversationSpanProcessor(SpanProcessor):
+    """Adds the current conversation id to every span as it starts."""
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        conversation_id = current_conversation.get()
+        if conversation_id:
+            span.set_attribute(CONVERSATION_ID, conversation_id)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        pass
+
+
+def traced(name: str, attributes: dict | None = None):
+    """Run the decorated coroutine function in a span called ``name``."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, attributes=attributes):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def store_operation(collection: str):
+    """Trace a store method as ``<collection>.<method>`` (a Mongo client span).
+
+    The time of the outermost store operation also goes to the ``store``
+    key of the turn's latency ledger.
+    """
+
+    def decorate(fn):
+        name = f"{collection}.{fn.__name__}"
+        attributes = {"db.system": "mongodb", "db.collection.name": collection}
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(
+                name, kind=SpanKind.CLIENT, attributes=attributes
+            ):
+                if _in_store_operation.get():
+                    return await fn(*args, **kwargs)
+                token = _in_store_operation.set(True)
+                try:
+                    with latency.timed("store"):
+                        return await fn(*args, **kwargs)
+                finally:
+                    _in_store_operation.reset(token)
+
+        return wrapper
+
+    return decorate
+
+
+def configure_tracing() -> None:
+    """Add the OTLP exporter (if configured) and conversation tagging.
+
+    Call after ``configure_azure_monitor``, so both exporters share the
+    tracer provider it installs.
+    """
+    provider = trace.get_tracer_provider()
+    if settings.otel_exporter_otlp_endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logger.error(
+                "OTEL_EXPORTER_OTLP_ENDPOINT is set but the OTLP exporter is "
+                "not installed (pip install .[otlp]) — spans are not exported"
+            )
+        else:
+            if not isinstance(provider, TracerProvider):
+                provider = TracerProvider(
+                    resource=Resource.create({"service.name": "agentize-poc-backend"})
+                )
+                trace.set_tracer_provider(provider)
+            endpoint = settings.otel_exporter_otlp_endpoint.rstrip("/")
+            provider.add_span_processor(
+                BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces"))
+            )
+            logger.info("Exporting spans to OTLP collector at %s", endpoint)
+    if isinstance(provider, TracerProvider):
+        provider.add_span_processor(ConversationSpanProcessor())
@@ -0,0 +1,262 @@
+"""Exactly-once-ish bot turns: activity de-duplication and per-conversation leases.
+
+Bot Service redelivers an activity when the bot is slow to acknowledge it,
+and users double-click card buttons.  Without a guard every copy would run
+the graph again — another LLM generation, another PDF, and concurrent
+``aupdate_state`` calls on one checkpoint thread.
+
+* :class:`ActivityDeduper` remembers what has already been handled, in
+  process (a bounded TTL map) and in ``processed_activities`` (shared by all
+  replicas, expired by a TTL index).  Keys are the activity id, and for card
+  actions also *conversation + action + draft hash*, which catches a second
+  click on the same button (it arrives as a new activity).  The bot
+  releases the card key when the action fails, so the button can be
+  retried.
+* :class:`ConversationLeases` lets one turn per conversation run at a time:
+  an ``asyncio.Lock`` serialises turns inside a replica, and a lease document
+  in ``conversation_leases`` (renewed while the turn runs, expiring if the
+  replica dies) serialises them across replicas.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.services import metrics
+from app.services.cosmos_db import _get_db
+from app.services.tracing import store_operation
+
+logger = logging.getLogger(__name__)
+
+_LOCAL_DEDUPE_SIZE = 10_000
+_LEASE_POLL_MIN = 0.1
+_LEASE_POLL_MAX = 1.0
+
+
+class ConversationBusyError(RuntimeError):
+    """Another turn held the conversation for longer than the wait limit."""
+
+
+# Card actions that carry the user's text: pressing one again on the same
+# draft may be a different request, so they are keyed by activity only.
+_FREE_TEXT_ACTIONS = frozenset({"request_edit"})
+
+
+def card_key(activity) -> str | None:
+    """Key of a card button press on one draft, None for other activities."""
+    value = activity.value if isinstance(activity.value, dict) else None
+    if not value or not value.get("action") or not value.get("draft_hash"):
+        return None
+    if value["action"] in _FREE_TEXT_ACTIONS:
+        return None
+    return f"card:{activity.conversation.id}:{value['action']}:{value['draft_hash']}"
+
+
+def activity_keys(activity) -> list[str]:
+    """De-duplication keys of an incoming activity."""
+    conversation_id = activity.conversation.id
+    keys = [f"activity:{activity.channel_id}:{conversation_id}:{activity.id}"]
+    key = card_key(activity)
+    if key:
+        keys.append(key)
+    return keys
+
+
+class ActivityDeduper:
+    def __init__(self, ttl_seconds: int | None = None) -> None:
+        self.ttl_seconds = ttl_seconds or settings.activity_dedupe_ttl_seconds
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        try:
+            self.collection = _get_db()["processed_activities"]
+        except RuntimeError:
+            logger.warning(
+                "Cosmos DB not configured — activity de-duplication is per process."
+            )
+            self.collection = None
+
+    def _seen_locally(self, key: str, now: float) -> bool:
+        expires = self._seen.get(key)
+        return expires is not None and expires > now
+
+    def _remember(self, key: str, now: float) -> None:
+        self._seen[key] = now + self.ttl_seconds
+        self._seen.move_to_end(key)
+        while len(self._seen) > _LOCAL_DEDUPE_SIZE:
+            self._seen.popitem(last=False)
+
+    @store_operation("processed_activities")
+    async def claim(self, keys: list[str]) -> bool:
+        """Record ``keys`` as handled; False if any of them already was."""
+        now = time.monotonic()
+        if any(self._seen_locally(key, now) for key in keys):
+            return False
+        for key in keys:
+            self._remember(key, now)
+        if self.collection is None:
+            return True
+        claimed: list[str] = []
+        try:
+            for key in keys:
+                await self.collection.insert_one(
+                    {"_id": key, "created_at": datetime.now(timezone.utc)}
+                )
+                claimed.append(key)
+        except DuplicateKeyError:
+            # Handled by another replica; drop our half-claim.
+            if claimed:
+                await self.collection.delete_many({"_id": {"$in": claimed}})
+            return False
+        except Exception as exc:  # noqa: BLE001
+            # Never drop a real message because the dedupe store is down.
+            logger.error("Activity de-duplication store unavailable: %s", exc)
+        return True
+
+    @store_operation("processed_activities")
+    async def release(self, keys: list[str]) -> None:
+        """Forget ``keys`` so a redelivery of a failed turn is processed again."""
+        for key in keys:
+            self._seen.pop(key, None)
+        if self.collection is not None:
+            try:
+                await self.collection.delete_many({"_id": {"$in": keys}})
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Could not release activity keys %s: %s", keys, exc)
+
+
+class ConversationLeases:
+    def __init__(
+        self,
+        lease_seconds: float | None = None,
+        wait_seconds: float | None = None,
+    ) -> None:
+        self.lease_seconds = lease_seconds or settings.conversation_lease_seconds
+        self.wait_seconds = (
+            settings.conversation_lease_wait_seconds
+            if wait_seconds is None
+            else wait_seconds
+        )
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: dict[str, int] = {}
+        try:
+            self.collection = _get_db()["conversation_leases"]
+        except RuntimeError:
+            self.collection = None
+
+    @store_operation("conversation_leases")
+    async def _try_acquire(self, conversation_id: str, token: str) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {
+                    "_id": conversation_id,
+                    "$or": [{"expires_at": {"$lt": now}}, {"owner": token}],
+                },
+                {
+                    "$set": {
+                        "owner": token,
+                        "expires_at": now + timedelta(seconds=self.lease_seconds),
+                        "updated_at": now,
+                    }
+                },
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease exists and is live: the upsert's insert collided.
+            return False
+
+    async def _acquire_remote(
+        self, conversation_id: str, token: str, deadline: float
+    ) -> None:
+        delay = _LEASE_POLL_MIN
+        while not await self._try_acquire(conversation_id, token):
+            if time.monotonic() + delay > deadline:
+                raise ConversationBusyError(conversation_id)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _LEASE_POLL_MAX)
+
+    async def _renew(
+        self, conversation_id: str, token: str, stop: asyncio.Event
+    ) -> None:
+        # Stopped through ``stop``, never cancelled (see AuditWriter._flush_loop).
+        while not stop.is_set():
+            try:
+                async with asyncio.timeout(self.lease_seconds / 3):
+                    await stop.wait()
+            except TimeoutError:
+                pass
+            if stop.is_set():
+                return
+            try:
+                await self._try_acquire(conversation_id, token)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Lease renewal failed for %s: %s", conversation_id, exc)
+
+    @asynccontextmanager
+    async def hold(self, conversation_id: str):
+        """Run the body as the only turn of ``conversation_id``.
+
+        Raises:
+            ConversationBusyError: If the conversation stays busy for longer
+                than ``wait_seconds``.
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        self._users[conversation_id] = self._users.get(conversation_id, 0) + 1
+        waiting = metrics.QUEUE_DEPTH.labels("conversation_turns")
+        try:
+            waiting.inc()
+            try:
+                async with asyncio.timeout(self.wait_seconds):
+                    await lock.acquire()
+            except TimeoutError:
+                raise ConversationBusyError(conversation_id) from None
+            finally:
+                waiting.dec()
+            try:
+                async with self._remote_lease(conversation_id, deadline):
+                    yield
+            finally:
+                lock.release()
+        finally:
+            self._users[conversation_id] -= 1
+            if not self._users[conversation_id]:
+                del self._users[conversation_id]
+                del self._locks[conversation_id]
+
+    @asynccontextmanager
+    async def _remote_lease(self, conversation_id: str, deadline: float):
+        if self.collection is None:
+            yield
+            return
+        token = uuid.uuid4().hex
+        try:
+            await self._acquire_remote(conversation_id, token, deadline)
+        except ConversationBusyError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            # The in-process lock still serialises this replica.
+            logger.error("Conversation lease store unavailable: %s", exc)
+            yield
+            return
+
+        stop = asyncio.Event()
+        renewer = asyncio.create_task(self._renew(conversation_id, token, stop))
+        try:
+            yield
+        finally:
+            stop.set()
+            await renewer
+            try:
+                await self.collection.delete_one(
+                    {"_id": conversation_id, "owner": token}
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Lease release failed for %s: %s", conversation_id, exc)
@@ -0,0 +1,176 @@
+"""Find the approved TWI closest to a new request, so it can be revised instead of regenerated.
+
+Candidates come from ``generated_documents`` through the tenant / machine id /
+process type indexes used by :meth:`DocumentStore.search`; they are then
+ranked in process with BM25 over title and content.  Approved documents never
+change, so their term counts are cached by ``document_id`` and a warm lookup
+only reads the small list projection from Cosmos DB.
+"""
+
+import logging
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+from app.services.cosmos_db import DocumentStore, normalize_key
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (the usual defaults) and the title boost: title words count
+# as often as this many occurrences in the body.
+_K1 = 1.2
+_B = 0.75
+_TITLE_WEIGHT = 3
+_TERM_CACHE_SIZE = 1024
+
+_CANDIDATE_PROJECTION = {"_id": 0, "document_id": 1, "title": 1, "created_at": 1}
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lower-cased, accent-folded words of at least two characters."""
+    return [t for t in re.findall(r"[\w-]+", normalize_key(text) or "") if len(t) > 1]
+
+
+def bm25_scores(query: list[str], docs: list[Counter]) -> list[float]:
+    """Okapi BM25 score of every document for the query terms."""
+    if not docs:
+        return []
+    lengths = [sum(d.values()) for d in docs]
+    avg_len = sum(lengths) / len(docs) or 1.0
+    scores = [0.0] * len(docs)
+    for term in set(query):
+        df = sum(1 for d in docs if term in d)
+        if df == 0:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.get(term, 0)
+            if tf:
+                norm = tf + _K1 * (1 - _B + _B * lengths[i] / avg_len)
+                scores[i] += idf * tf * (_K1 + 1) / norm
+    return scores
+
+
+@dataclass(frozen=True)
+class ReferenceTwi:
+    document_id: str
+    title: str
+    content: str
+    score: float
+    # False when it is only another process's instruction on the same machine
+    # (or any recent one): then it is a style example, not the one to revise.
+    same_process: bool = True
+
+
+class TwiRetriever:
+    def __init__(self, documents: DocumentStore | None = None) -> None:
+        self.documents = documents or DocumentStore()
+        self._terms: OrderedDict[str, tuple[Counter, str]] = OrderedDict()
+
+    def _remember(self, document_id: str, title: str, content: str) -> None:
+        terms = Counter(tokenize(content))
+        for term in tokenize(title):
+            terms[term] += _TITLE_WEIGHT
+        self._terms[document_id] = (terms, content)
+        self._terms.move_to_end(document_id)
+        while len(self._terms) > _TERM_CACHE_SIZE:
+            self._terms.popitem(last=False)
+
+    async def _candidates(
+        self,
+        tenant_id: str,
+        machine_id: str | None,
+        process_type: str | None,
+        edit_requested: bool,
+    ) -> tuple[list[dict], bool]:
+        """Candidate documents, and whether they match machine *and* process."""
+        limit = settings.twi_retrieval_candidates
+        if machine_id:
+            docs, _ = await self.documents.search(
+                tenant_id,
+                machine_id=machine_id,
+                process_type=process_type,
+                limit=limit,
+                projection=_CANDIDATE_PROJECTION,
+            )
+            if docs or not process_type:
+                return docs, bool(process_type)
+            # Same machine, different process — still a better base than nothing.
+            docs, _ = await self.documents.search(
+                tenant_id,
+                machine_id=machine_id,
+                limit=limit,
+                projection=_CANDIDATE_PROJECTION,
+            )
+            return docs, False
+        if edit_requested:
+            # "Update the instruction" without a machine id: rank recent ones.
+            docs, _ = await self.documents.search(
+                tenant_id, limit=limit, projection=_CANDIDATE_PROJECTION
+            )
+            return docs, False
+        return [], False
+
+    async def find_reference(
+        self,
+        tenant_id: str,
+        message: str,
+        machine_id: str | None = None,
+        process_type: str | None = None,
+        edit_requested: bool = False,
+    ) -> ReferenceTwi | None:
+        """Return the best-matching approved TWI for the request, if any.
+
+        With no text overlap at all, only an instruction for the same machine
+        and process — or, for an explicit edit, any of the machine's — is
+        returned.
+        """
+        if not settings.twi_retrieval_enabled or self.documents.collection is None:
+            return None
+
+        candidates, same_process = await self._candidates(
+            tenant_id, machine_id, process_type, edit_requested
+        )
+        if not candidates:
+            return None
+
+        missing = [
+            d["document_id"] for d in candidates if d["document_id"] not in self._terms
+        ]
+        for doc in await self.documents.get_many(
+            missing,
+            projection={"_id": 0, "document_id": 1, "title": 1, "draft_content": 1},
+        ):
+            self._remember(
+                doc["document_id"], doc.get("title", ""), doc.get("draft_content", "")
+            )
+
+        ranked = [d for d in candidates if d["document_id"] in self._terms]
+        scores = bm25_scores(
+            tokenize(message), [self._terms[d["document_id"]][0] for d in ranked]
+        )
+        if not scores:
+            return None
+        # Candidates arrive newest first and max() keeps the first maximum,
+        # so ties go to the most recent approval.
+        best = max(range(len(ranked)), key=scores.__getitem__)
+        if scores[best] <= 0 and not (same_process or (machine_id and edit_requested)):
+            # A new instruction for another process is not a revision of this one.
+            return None
+
+        doc = ranked[best]
+        logger.info(
+            "Reference TWI found: document_id=%s score=%.2f candidates=%d",
+            doc["document_id"],
+            scores[best],
+            len(ranked),
+        )
+        return ReferenceTwi(
+            document_id=doc["document_id"],
+            title=doc.get("title", ""),
+            content=self._terms[doc["document_id"]][1],
+            score=scores[best],
+            same_process=same_process,
+        )
@@ -0,0 +1,236 @@
+"""Per-tenant LLM usage rollups (tenant × model × day × event type).
+
+Token counts are recorded on every ``audit_log`` entry; reporting on them
+directly means scanning the whole collection.  ``usage_rollups`` keeps one
+small counter document per tenant, model, UTC day and event type instead:
+
+* :class:`app.services.audit_writer.AuditWriter` adds every batch it inserts
+  with ``$inc`` upserts, so the rollups stay current without extra scans;
+* :meth:`UsageRollupStore.rebuild` recomputes closed days from ``audit_log``
+  (after a backfill, or to reconcile counts lost to a crash between an audit
+  insert and its rollup update).  It records its progress and resumes from the
+  first unfinished day when run again over the same range.
+
+Run the rebuild job with::
+
+    cd poc-backend
+    python -m app.services.usage_rollups 2026-01-01 2026-03-31
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from app.services.cosmos_db import AuditStore, _get_db
+from app.services.tracing import store_operation
+
+logger = logging.getLogger(__name__)
+
+# Entries without an LLM call (approvals, rejections) are counted under this model.
+NO_MODEL = "none"
+_JOB_ID = "rebuild"
+
+
+def rollup_key(entry: dict) -> tuple[str, str, str, str]:
+    """``(tenant_id, model, day, event_type)`` of an audit entry."""
+    created_at = entry["created_at"]
+    if isinstance(created_at, datetime):
+        day = created_at.astimezone(timezone.utc).date().isoformat()
+    else:
+        day = created_at[:10]
+    return (
+        entry.get("tenant_id") or "",
+        entry.get("llm_model") or NO_MODEL,
+        day,
+        entry.get("event_type") or "unknown",
+    )
+
+
+def accumulate(entries: list[dict]) -> dict[tuple[str, str, str, str], dict]:
+    """Sum events and tokens of a batch of audit entries per rollup key."""
+    totals: dict[tuple[str, str, str, str], dict] = {}
+    for entry in entries:
+        counters = totals.setdefault(
+            rollup_key(entry), {"events": 0, "tokens_input": 0, "tokens_output": 0}
+        )
+        counters["events"] += 1
+        counters["tokens_input"] += entry.get("llm_tokens_input") or 0
+        counters["tokens_output"] += entry.get("llm_tokens_output") or 0
+    return totals
+
+
+def _rollup_id(key: tuple[str, str, str, str]) -> str:
+    return "|".join(key)
+
+
+def _rollup_fields(key: tuple[str, str, str, str]) -> dict:
+    tenant_id, model, day, event_type = key
+    return {
+        "tenant_id": tenant_id,
+        "model": model,
+        "day": day,
+        "event_type": event_type,
+    }
+
+
+class UsageRollupStore:
+    def __init__(self) -> None:
+        try:
+            db = _get_db()
+            self.collection = db["usage_rollups"]
+            self.jobs = db["usage_rollup_jobs"]
+        except RuntimeError:
+            logger.warning("Cosmos DB not configured — usage rollups disabled.")
+            self.collection = None
+            self.jobs = None
+
+    @store_operation("usage_rollups")
+    async def add(self, entries: list[dict]) -> None:
+        """Add a batch of newly inserted audit entries to the rollups."""
+        if self.collection is None or not entries:
+            return
+        now = datetime.now(timezone.utc)
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": _rollup_id(key)},
+                    {
+                        "$inc": counters,
+                        "$set": {"updated_at": now},
+                        "$setOnInsert": _rollup_fields(key),
+                    },
+                    upsert=True,
+                )
+                for key, counters in accumulate(entries).items()
+            ],
+            ordered=False,
+        )
+
+    @store_operation("usage_rollups")
+    async def query(
+        self,
+        tenant_id: str,
+        day_from: date,
+        day_to: date,
+        model: str | None = None,
+        event_type: str | None = None,
+    ) -> list[dict]:
+        """Rollups of one tenant for ``day_from``..``day_to`` (inclusive), oldest first."""
+        if self.collection is None:
+            return []
+        query: dict = {
+            "tenant_id": tenant_id,
+            "day": {"$gte": day_from.isoformat(), "$lte": day_to.isoformat()},
+        }
+        if model:
+            query["model"] = model
+        if event_type:
+            query["event_type"] = event_type
+        cursor = self.collection.find(query, {"_id": 0, "updated_at": 0}).sort(
+            [("day", 1), ("model", 1), ("event_type", 1)]
+        )
+        return await cursor.to_list(length=None)
+
+    async def _rebuild_day(self, audit_log, day: date) -> int:
+        start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        pipeline = [
+            {"$match": {"created_at": {"$gte": start, "$lt": start + timedelta(1)}}},
+            {
+                "$group": {
+                    "_id": {
+                        "tenant_id": "$tenant_id",
+                        "llm_model": "$llm_model",
+                        "event_type": "$event_type",
+                    },
+                    "events": {"$sum": 1},
+                    "tokens_input": {"$sum": {"$ifNull": ["$llm_tokens_input", 0]}},
+                    "tokens_output": {"$sum": {"$ifNull": ["$llm_tokens_output", 0]}},
+                }
+            },
+        ]
+        now = datetime.now(timezone.utc)
+        ops, ids = [], []
+        async for group in audit_log.aggregate(pipeline):
+            key = rollup_key({**group["_id"], "created_at": day.isoformat()})
+            ids.append(_rollup_id(key))
+            ops.append(
+                UpdateOne(
+                    {"_id": ids[-1]},
+                    {
+                        "$set": {
+                            **_rollup_fields(key),
+                            "events": group["events"],
+                            "tokens_input": group["tokens_input"],
+                            "tokens_output": group["tokens_output"],
+                            "updated_at": now,
+                        }
+                    },
+                    upsert=True,
+                )
+            )
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+        await self.collection.delete_many(
+            {"day": day.isoformat(), "_id": {"$nin": ids}}
+        )
+        return len(ops)
+
+    @store_operation("usage_rollups")
+    async def rebuild(self, day_from: date, day_to: date) -> int:
+        """Recompute the rollups of closed days from ``audit_log``; returns days done.
+
+        Today is never rebuilt (its entries are still arriving).  Progress is
+        saved after each day, so an interrupted run over the same range
+        continues where it stopped.
+        """
+        audit_log = AuditStore().collection
+        if self.collection is None or audit_log is None:
+            return 0
+        day_to = min(day_to, datetime.now(timezone.utc).date() - timedelta(1))
+
+        job = await self.jobs.find_one({"_id": _JOB_ID}) or {}
+        day = day_from
+        if (
+            job.get("day_from") == day_from.isoformat()
+            and job.get("day_to") == day_to.isoformat()
+            and job.get("next_day")
+        ):
+            day = date.fromisoformat(job["next_day"])
+            logger.info("Resuming usage rollup rebuild at %s", day)
+
+        done = 0
+        while day <= day_to:
+            groups = await self._rebuild_day(audit_log, day)
+            logger.info("Usage rollups rebuilt for %s: groups=%d", day, groups)
+            day += timedelta(1)
+            done += 1
+            await self.jobs.update_one(
+                {"_id": _JOB_ID},
+                {
+                    "$set": {
+                        "day_from": day_from.isoformat(),
+                        "day_to": day_to.isoformat(),
+                        "next_day": day.isoformat(),
+                        "updated_at": datetime.now(timezone.utc),
+                    }
+                },
+                upsert=True,
+            )
+        return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("day_from", type=date.fromisoformat)
+    parser.add_argument("day_to", type=date.fromisoformat)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    days = asyncio.run(UsageRollupStore().rebuild(args.day_from, args.day_to))
+    print(f"Rebuilt {days} day(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Local performance benchmarks (no Azure services required)."""
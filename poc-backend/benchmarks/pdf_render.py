@@ -0,0 +1,184 @@
+"""PDF rendering benchmark and memory profile.
+
+Renders synthetic TWI drafts of increasing size through the production
+``generate_twi_pdf`` pipeline and reports, per draft size:
+
+- ``ms_per_doc``   – median wall time of one ``generate_twi_pdf`` call
+- ``ms_per_page``  – ``ms_per_doc`` divided by the laid-out page count
+- ``peak_rss_mb``  – process peak resident set size after rendering that size
+- ``pdf_kb``       – size of the produced PDF
+
+Sizes run smallest-first, so ``peak_rss_mb`` is the high-water mark reached
+while rendering drafts up to that size — the number to size container memory
+against.  Runs locally without Azure (only WeasyPrint's system libraries).
+
+Usage::
+
+    cd poc-backend
+    python -m benchmarks.pdf_render
+    python -m benchmarks.pdf_render --steps 5 50 100 --repeat 5 --json
+    python -m benchmarks.pdf_render --profile archival
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from app.agent.tools.pdf_generator import (
+    PDF_OUTPUT_PROFILES,
+    generate_twi_pdf,
+    render_twi_document,
+    render_twi_html,
+    warm_up_renderer,
+)
+
+try:
+    import resource
+except ImportError:  # Windows — peak RSS is reported as None
+    resource = None
+
+DEFAULT_STEPS = (5, 10, 25, 50, 100)
+DEFAULT_REPEAT = 3
+
+_METADATA = {
+    "model": "gpt-4o",
+    "generated_at": "2026-03-12 08:00 UTC",
+    "revision": 0,
+}
+
+_SAFETY_PARAGRAPH = (
+    "A gépen végzett bármilyen beavatkozás előtt a főkapcsolót le kell "
+    "kapcsolni, lakattal biztosítani (LOTO), és a maradék energiát "
+    "(pneumatika, hidraulika, rugóerő) meg kell szüntetni. Védőszemüveg, "
+    "vágásbiztos kesztyű és acélbetétes cipő viselése kötelező. "
+)
+
+
+def synthetic_twi_draft(steps: int, safety_paragraphs: int | None = None) -> str:
+    """Build a realistic TWI markdown draft with ``steps`` steps.
+
+    Includes the EU AI Act label, a materials table, a long safety section
+    (scaled with ``steps`` unless given) and a per-step inspection table every
+    fifth step, mirroring what ``generate_node`` produces for large jobs.
+    """
+    if safety_paragraphs is None:
+        safety_paragraphs = max(3, steps // 5)
+
+    parts = [
+        "⚠️ AI által generált tartalom — emberi felülvizsgálat szükséges.",
+        f"## CÍM: CNC-01 gép karbantartása ({steps} lépés)",
+        "## CÉL\nA gép megfelelő működésének biztosítása a napi termelés előtt.",
+        "## SZÜKSÉGES ANYAGOK ÉS ESZKÖZÖK\n"
+        "| Eszköz | Mennyiség | Megjegyzés |\n"
+        "|---|---|---|\n"
+        "| Digitális tolómérő | 1 db | 0,01 mm felbontás |\n"
+        "| Kenőolaj (ISO VG 68) | 0,5 l | |\n"
+        "| Nyomatékkulcs | 1 db | 10–60 Nm |",
+        "## BIZTONSÁGI ELŐÍRÁSOK\n"
+        + "\n\n".join(
+            f"{i + 1}. {_SAFETY_PARAGRAPH * 2}" for i in range(safety_paragraphs)
+        ),
+        "## LÉPÉSEK",
+    ]
+    for n in range(1, steps + 1):
+        step = (
+            f"{n}. **Főlépés:** Ellenőrizd a(z) {n}. egység rögzítését\n"
+            f"   - *Kulcspontok:* A csavarokat 25 Nm nyomatékkal húzd meg, "
+            f"keresztirányú sorrendben.\n"
+            f"   - *Indoklás:* Az egyenetlen meghúzás a szán elhúzódásához vezet."
+        )
+        if n % 5 == 0:
+            step += (
+                "\n\n| Mérési pont | Névleges | Tűrés |\n"
+                "|---|---|---|\n"
+                f"| X{n} | {n * 1.5:.1f} mm | ±0,02 mm |\n"
+                f"| Y{n} | {n * 0.8:.1f} mm | ±0,02 mm |"
+            )
+        parts.append(step)
+    parts.append(
+        "## MINŐSÉGI ELLENŐRZÉS\nEllenőrizd a gép rezgésszintjét indítás után."
+    )
+    return "\n\n".join(parts)
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+async def bench_size(
+    steps: int, repeat: int = DEFAULT_REPEAT, profile: str | None = None
+) -> dict:
+    """Render one synthetic draft size ``repeat`` times and return its metrics."""
+    draft = synthetic_twi_draft(steps)
+    timings_ms: list[float] = []
+    pdf_bytes = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pdf_bytes = await generate_twi_pdf(
+            draft, _METADATA, user_id="bench-user", profile=profile
+        )
+        timings_ms.append((time.perf_counter() - started) * 1000)
+
+    html_content = render_twi_html(draft, _METADATA, user_id="bench-user")
+    pages = len(render_twi_document(html_content).pages)
+    ms_per_doc = statistics.median(timings_ms)
+
+    return {
+        "steps": steps,
+        "pages": pages,
+        "ms_per_doc": round(ms_per_doc, 1),
+        "ms_per_page": round(ms_per_doc / pages, 1) if pages else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "pdf_kb": round(len(pdf_bytes) / 1024, 1),
+    }
+
+
+async def run_benchmark(
+    steps: tuple[int, ...] = DEFAULT_STEPS,
+    repeat: int = DEFAULT_REPEAT,
+    profile: str | None = None,
+) -> list[dict]:
+    """Warm the renderer once, then benchmark each draft size smallest-first."""
+    warm_up_renderer()
+    return [await bench_size(n, repeat, profile) for n in sorted(steps)]
+
+
+def _format_table(rows: list[dict]) -> str:
+    header = f"{'steps':>6} {'pages':>6} {'ms/doc':>9} {'ms/page':>9} {'peak RSS MB':>12} {'PDF KB':>8}"
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        lines.append(
+            f"{r['steps']:>6} {r['pages']:>6} {r['ms_per_doc']:>9} "
+            f"{str(r['ms_per_page']):>9} {str(r['peak_rss_mb']):>12} {r['pdf_kb']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=list(DEFAULT_STEPS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PDF_OUTPUT_PROFILES),
+        help="PDF output profile (default: PDF_OUTPUT_PROFILE setting)",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Emit JSON instead of a table"
+    )
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(run_benchmark(tuple(args.steps), args.repeat, args.profile))
+    print(json.dumps(rows, indent=2) if args.json else _format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -264,11 +264,21 @@ if (-not $WhatIf) {
 Write-Step 6 "Populating Key Vault secrets ($keyVaultName)"
 
 if (-not $WhatIf) {
+    # Keep an existing download-link secret so links already sent stay valid
+    $downloadLinkSecret = az keyvault secret show --vault-name $keyVaultName `
+        --name download-link-secret --query value -o tsv 2>$null
+    if (-not $downloadLinkSecret) {
+        $bytes = New-Object byte[] 32
+        [System.Security.Cryptography.RandomNumberGenerator]::Create().GetBytes($bytes)
+        $downloadLinkSecret = -join ($bytes | ForEach-Object { $_.ToString('x2') })
+    }
+
     $secrets = @{
         'ai-foundry-key'    = $aiFoundryKey
         'cosmos-connection' = $cosmosConnection
         'blob-connection'   = $blobConnection
         'bot-app-password'  = $BotAppPassword
+        'download-link-secret' = $downloadLinkSecret
     }
 
     foreach ($name in $secrets.Keys) {
@@ -279,7 +289,7 @@ if (-not $WhatIf) {
         Write-Ok "Secret stored: $name"
     }
 } else {
-    Write-Warn '[WhatIf] Would store 4 secrets in Key Vault'
+    Write-Warn '[WhatIf] Would store 5 secrets in Key Vault'
 }
 
 # --- Step 7: Restart Container App -------------------------------------------
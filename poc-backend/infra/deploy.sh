@@ -210,11 +210,17 @@ fi
 step 6 "Populating Key Vault secrets ($KV_NAME)"
 
 if [[ "$WHAT_IF" != "true" ]]; then
+    # Keep an existing download-link secret so links already sent stay valid
+    DOWNLOAD_LINK_SECRET=$(az keyvault secret show --vault-name "$KV_NAME" \
+        --name download-link-secret --query value -o tsv 2>/dev/null || true)
+    DOWNLOAD_LINK_SECRET="${DOWNLOAD_LINK_SECRET:-$(openssl rand -hex 32)}"
+
     declare -A SECRETS=(
         ["ai-foundry-key"]="$AI_FOUNDRY_KEY"
         ["cosmos-connection"]="$COSMOS_CONNECTION"
         ["blob-connection"]="$BLOB_CONNECTION"
         ["bot-app-password"]="$BOT_APP_PASSWORD"
+        ["download-link-secret"]="$DOWNLOAD_LINK_SECRET"
     )
 
     for SECRET_NAME in "${!SECRETS[@]}"; do
@@ -225,7 +231,7 @@ if [[ "$WHAT_IF" != "true" ]]; then
         green "Secret stored: $SECRET_NAME"
     done
 else
-    yellow "[WhatIf] Would store 4 secrets in Key Vault"
+    yellow "[WhatIf] Would store 5 secrets in Key Vault"
 fi
 
 # ─── Step 7: Restart Container App ───────────────────────────────────────────
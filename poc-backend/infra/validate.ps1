@@ -119,7 +119,7 @@ if ($modelDeployment -and $modelDeployment.state -eq 'Succeeded') {
 
 Write-Section '5. Key Vault Secrets'
 
-$requiredSecrets = @('ai-foundry-key', 'cosmos-connection', 'blob-connection', 'bot-app-password')
+$requiredSecrets = @('ai-foundry-key', 'cosmos-connection', 'blob-connection', 'bot-app-password', 'download-link-secret')
 foreach ($secretName in $requiredSecrets) {
     $secret = az keyvault secret show `
         --vault-name "kv-$ProjectPrefix" `
@@ -299,7 +299,7 @@ $fqdnFinal = az containerapp show -n "ca-$ProjectPrefix-backend" -g $ResourceGro
 Write-Host "  [x] Bicep template deployed to $ResourceGroup"
 Write-Host "  [x] AI Foundry: Mistral Large, DataZoneStandard"
 Write-Host "  [ ] Entra ID App Registration — verify in Azure Portal > App Registrations"
-Write-Host "  [x] Key Vault secrets — ai-foundry-key, cosmos-connection, blob-connection, bot-app-password"
+Write-Host "  [x] Key Vault secrets — ai-foundry-key, cosmos-connection, blob-connection, bot-app-password, download-link-secret"
 Write-Host "  [x] Cosmos DB collections — conversations, agent_state, generated_documents, audit_log"
 Write-Host "  [x] Blob Storage container — pdf-output"
 if ($fqdnFinal) {
@@ -30,6 +30,8 @@ def sample_agent_state():
         "status": "processing",
         "pdf_url": None,
         "pdf_blob_name": None,
+        "document_id": None,
+        "download_url": None,
         "llm_model": None,
         "llm_tokens_input": None,
         "llm_tokens_output": None,
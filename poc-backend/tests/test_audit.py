@@ -35,7 +35,8 @@ class TestAuditEventType:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             await audit_node(_make_audit_state(status="completed"))
@@ -48,7 +49,8 @@ class TestAuditEventType:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             await audit_node(_make_audit_state(status="rejected"))
@@ -61,7 +63,8 @@ class TestAuditEventType:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             await audit_node(_make_audit_state(status="some_unknown"))
@@ -76,7 +79,8 @@ class TestAuditTokenSplit:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             await audit_node(
@@ -93,7 +97,8 @@ class TestAuditTokenSplit:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             await audit_node(
@@ -111,7 +116,8 @@ class TestAuditFailureSafety:
         mock_store = MagicMock()
         mock_store.log = AsyncMock(side_effect=Exception("Cosmos DB unavailable"))
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             state = _make_audit_state()
@@ -124,7 +130,8 @@ class TestAuditFailureSafety:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.audit.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.audit.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.audit import audit_node
 
             state = _make_audit_state()
@@ -141,7 +148,8 @@ class TestReviseNodeAudit:
         mock_store = MagicMock()
         mock_store.log = AsyncMock()
 
-        with patch("app.agent.nodes.revise.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.revise.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.revise import revise_node
 
             await revise_node(_make_audit_state(revision_count=1))
@@ -156,7 +164,8 @@ class TestReviseNodeAudit:
         mock_store = MagicMock()
         mock_store.log = AsyncMock(side_effect=Exception("DB down"))
 
-        with patch("app.agent.nodes.revise.AuditStore", return_value=mock_store):
+        with patch("app.agent.nodes.revise.get_services") as mock_get_services:
+            mock_get_services.return_value.audit_writer = mock_store
             from app.agent.nodes.revise import revise_node
 
             result = await revise_node(_make_audit_state(revision_count=0))
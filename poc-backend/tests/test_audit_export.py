@@ -0,0 +1,171 @@
+"""Tests for the streaming audit-log export."""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.audit_export import EXPORT_FIELDS, AuditExport
+
+_T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _entries(n: int) -> list[dict]:
+    return [
+        {
+            "_id": f"a{i:03d}",
+            "audit_id": f"a{i:03d}",
+            "tenant_id": "t1",
+            "created_at": (_T0 + timedelta(minutes=i)).replace(tzinfo=None),
+            "event_type": "twi_generated",
+            "llm_tokens_input": i,
+        }
+        for i in range(n)
+    ]
+
+
+class _FakeAuditLog:
+    """Answers keyset queries from an in-memory list, recording each page size."""
+
+    def __init__(self, entries: list[dict]) -> None:
+        self.entries = entries
+        self.queries: list[dict] = []
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        rows = self.entries
+        if "$or" in query:
+            created_at = query["$or"][0]["created_at"]["$gt"]
+            audit_id = query["$or"][1]["_id"]["$gt"]
+            rows = [
+                e for e in rows if (e["created_at"], e["_id"]) > (created_at, audit_id)
+            ]
+        cursor = MagicMock()
+        cursor.sort.return_value = cursor
+
+        def limit(n):
+            cursor.to_list = AsyncMock(return_value=rows[:n])
+            return cursor
+
+        cursor.limit.side_effect = limit
+        return cursor
+
+    async def find_one(self, query, projection):
+        for e in self.entries:
+            if e["_id"] in query["_id"]["$in"]:
+                return e
+        return None
+
+
+def _export(entries, **kwargs) -> AuditExport:
+    store = MagicMock()
+    store.collection = _FakeAuditLog(entries)
+    return AuditExport(
+        "t1", _T0, _T0 + timedelta(days=1), store=store, page_size=2, **kwargs
+    )
+
+
+async def _collect(export: AuditExport, fmt: str) -> bytes:
+    await export.prepare()
+    return b"".join([chunk async for chunk in export.stream(fmt)])
+
+
+class TestAuditExport:
+    @pytest.mark.asyncio
+    async def test_ndjson_streams_all_pages_in_order(self):
+        export = _export(_entries(5))
+
+        lines = (await _collect(export, "ndjson")).decode().splitlines()
+
+        rows = [json.loads(line) for line in lines]
+        assert [r["audit_id"] for r in rows] == ["a000", "a001", "a002", "a003", "a004"]
+        assert rows[0]["created_at"] == "2026-03-01T00:00:00+00:00"
+        # 5 entries in pages of 2: three queries, never the whole collection.
+        assert len(export.collection.queries) == 3
+        assert export.last_audit_id == "a004"
+
+    @pytest.mark.asyncio
+    async def test_csv_has_header_and_one_row_per_entry(self):
+        data = await _collect(_export(_entries(3)), "csv")
+
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        assert tuple(rows[0]) == EXPORT_FIELDS
+        assert [r["llm_tokens_input"] for r in rows] == ["0", "1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_empty_csv_still_has_header(self):
+        data = await _collect(_export([]), "csv")
+
+        assert data.decode().strip() == ",".join(EXPORT_FIELDS)
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_continuation_token(self):
+        data = await _collect(_export(_entries(5), after="a002"), "ndjson")
+
+        ids = [json.loads(line)["audit_id"] for line in data.decode().splitlines()]
+        assert ids == ["a003", "a004"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_token_is_rejected_before_streaming(self):
+        with pytest.raises(ValueError):
+            await _export(_entries(2), after="nope").prepare()
+
+    @pytest.mark.asyncio
+    async def test_parquet_row_groups(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        data = await _collect(_export(_entries(5)), "parquet")
+
+        table = pq.read_table(io.BytesIO(data))
+        assert table.num_rows == 5
+        assert table.column("audit_id").to_pylist()[-1] == "a004"
+
+
+class TestAuditExportEndpoint:
+    @pytest.mark.asyncio
+    async def test_streams_ndjson_attachment(self):
+        from app.main import app
+
+        store = MagicMock()
+        store.collection = _FakeAuditLog(_entries(3))
+        with patch("app.services.audit_export.AuditStore", return_value=store):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/audit/export",
+                    params={
+                        "from": "2026-03-01T00:00:00Z",
+                        "to": "2026-03-02T00:00:00Z",
+                    },
+                )
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        assert "attachment" in resp.headers["content-disposition"]
+        assert len(resp.text.splitlines()) == 3
+
+    @pytest.mark.asyncio
+    async def test_unknown_token_is_400(self):
+        from app.main import app
+
+        store = MagicMock()
+        store.collection = _FakeAuditLog(_entries(1))
+        with patch("app.services.audit_export.AuditStore", return_value=store):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/audit/export",
+                    params={
+                        "from": "2026-03-01T00:00:00Z",
+                        "to": "2026-03-02T00:00:00Z",
+                        "after": "missing",
+                    },
+                )
+
+        assert resp.status_code == 400
@@ -0,0 +1,220 @@
+"""Tests for the journal-first AuditWriter: batching, durability and replay."""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import BulkWriteError
+
+from app.services.audit_writer import AuditWriter
+
+
+def _store(collection: MagicMock | None = None) -> MagicMock:
+    store = MagicMock()
+    if collection is None:
+        collection = MagicMock()
+        collection.insert_many = AsyncMock()
+    store.collection = collection
+    return store
+
+
+def _journal_lines(journal_dir) -> list[dict]:
+    lines = []
+    for path in sorted(journal_dir.glob("audit-*.jsonl")):
+        lines.extend(json.loads(line) for line in path.read_text().splitlines())
+    return lines
+
+
+class TestAuditWriterLog:
+    @pytest.mark.asyncio
+    async def test_log_journals_before_any_db_write(self, tmp_path):
+        store = _store()
+        writer = AuditWriter(journal_dir=tmp_path, store=store, flush_interval=60)
+
+        await writer.log({"conversation_id": "c1", "event_type": "twi_generated"})
+
+        store.collection.insert_many.assert_not_called()
+        records = _journal_lines(tmp_path)
+        assert records[0]["op"] == "append"
+        assert records[0]["entry"]["conversation_id"] == "c1"
+        assert writer.pending == 1
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_flush_uses_insert_many_with_idempotent_ids(self, tmp_path):
+        store = _store()
+        writer = AuditWriter(journal_dir=tmp_path, store=store, flush_interval=60)
+
+        for i in range(3):
+            await writer.log({"conversation_id": f"c{i}"})
+        assert await writer.flush() == 3
+
+        store.collection.insert_many.assert_awaited_once()
+        docs = store.collection.insert_many.call_args[0][0]
+        assert [d["conversation_id"] for d in docs] == ["c0", "c1", "c2"]
+        assert all(d["_id"] == d["audit_id"] for d in docs)
+        assert all(isinstance(d["created_at"], datetime) for d in docs)
+        assert writer.pending == 0
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_flush_respects_batch_size(self, tmp_path):
+        store = _store()
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=store, batch_size=2, flush_interval=60
+        )
+
+        for i in range(5):
+            await writer.log({"conversation_id": f"c{i}"})
+        await writer.flush()
+
+        sizes = [len(c[0][0]) for c in store.collection.insert_many.call_args_list]
+        assert sum(sizes) == 5
+        assert max(sizes) <= 2
+        await writer.aclose()
+
+
+class TestAuditWriterDurability:
+    @pytest.mark.asyncio
+    async def test_db_failure_keeps_entries_for_retry(self, tmp_path):
+        collection = MagicMock()
+        collection.insert_many = AsyncMock(side_effect=Exception("Cosmos 429"))
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=_store(collection), flush_interval=60
+        )
+
+        await writer.log({"conversation_id": "c1"})
+        assert await writer.flush() == 0
+        assert writer.pending == 1
+
+        collection.insert_many.side_effect = None
+        assert await writer.flush() == 1
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_duplicate_key_errors_count_as_flushed(self, tmp_path):
+        """A replayed entry that already landed before a crash is not retried forever."""
+        collection = MagicMock()
+        collection.insert_many = AsyncMock(
+            side_effect=BulkWriteError({"writeErrors": [{"code": 11000}]})
+        )
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=_store(collection), flush_interval=60
+        )
+
+        await writer.log({"conversation_id": "c1"})
+        assert await writer.flush() == 1
+        assert writer.pending == 0
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unflushed_entries_replayed_on_next_start(self, tmp_path):
+        collection = MagicMock()
+        collection.insert_many = AsyncMock(side_effect=Exception("Cosmos down"))
+        first = AuditWriter(
+            journal_dir=tmp_path, store=_store(collection), flush_interval=60
+        )
+        await first.log({"conversation_id": "lost?"})
+        await first.log({"conversation_id": "also-lost?"})
+        await first.aclose()
+
+        store = _store()
+        second = AuditWriter(journal_dir=tmp_path, store=store, flush_interval=60)
+        assert await second.start() == 2
+        await second.flush()
+
+        docs = store.collection.insert_many.call_args[0][0]
+        assert {d["conversation_id"] for d in docs} == {"lost?", "also-lost?"}
+        await second.aclose()
+        assert list(tmp_path.glob("audit-*.jsonl")) == []
+
+    @pytest.mark.asyncio
+    async def test_acknowledged_entries_are_not_replayed(self, tmp_path):
+        first = AuditWriter(journal_dir=tmp_path, store=_store(), flush_interval=60)
+        await first.log({"conversation_id": "c1"})
+        await first.flush()
+        await first.aclose()
+
+        second = AuditWriter(journal_dir=tmp_path, store=_store(), flush_interval=60)
+        assert await second.start() == 0
+        await second.aclose()
+
+    @pytest.mark.asyncio
+    async def test_torn_last_line_is_ignored_on_replay(self, tmp_path):
+        (tmp_path / "audit-1-dead.jsonl").write_text(
+            json.dumps(
+                {
+                    "op": "append",
+                    "entry": {
+                        "audit_id": "a" * 32,
+                        "conversation_id": "c1",
+                        "created_at": "2026-03-12T10:00:00+00:00",
+                    },
+                }
+            )
+            + '\n{"op": "app'
+        )
+
+        writer = AuditWriter(journal_dir=tmp_path, store=_store(), flush_interval=60)
+        assert await writer.start() == 1
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_no_db_configured_does_not_grow_journal(self, tmp_path):
+        store = MagicMock()
+        store.collection = None
+        writer = AuditWriter(journal_dir=tmp_path, store=store, flush_interval=60)
+
+        await writer.log({"conversation_id": "c1"})
+        await writer.aclose()
+
+        assert list(tmp_path.glob("audit-*.jsonl")) == []
+
+    @pytest.mark.asyncio
+    async def test_unlockable_segment_is_never_used(self, tmp_path):
+        """A segment this process cannot lock could be adopted by another worker."""
+        writer = AuditWriter(journal_dir=tmp_path, store=_store(), flush_interval=60)
+
+        with patch("app.services.audit_writer._try_lock", return_value=False):
+            with pytest.raises(RuntimeError, match="Could not lock"):
+                await writer.log({"conversation_id": "c1"})
+
+        assert writer.pending == 0
+
+
+class TestAuditWriterShutdown:
+    @pytest.mark.asyncio
+    async def test_aclose_with_pending_wakeup_does_not_hang(self, tmp_path):
+        """Regression: cancelling wait_for() with the wakeup set hung on 3.11."""
+        store = _store()
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=store, batch_size=2, flush_interval=60
+        )
+
+        for i in range(5):
+            await writer.log({"conversation_id": f"c{i}"})
+        await asyncio.wait_for(writer.aclose(), timeout=5)
+
+        assert writer.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_logged_once_per_outage(self, tmp_path, caplog):
+        collection = MagicMock()
+        collection.insert_many = AsyncMock(side_effect=Exception("Cosmos down"))
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=_store(collection), flush_interval=60
+        )
+        await writer.log({"conversation_id": "c1"})
+
+        with caplog.at_level(logging.ERROR, logger="app.services.audit_writer"):
+            for _ in range(3):
+                await writer.flush()
+
+        failures = [r for r in caplog.records if "failing" in r.getMessage()]
+        assert len(failures) == 1
+
+        collection.insert_many.side_effect = None
+        await writer.aclose()
@@ -1,182 +1,364 @@
-"""Tests for Azure Blob Storage service — upload_pdf() and _get_client()."""
+"""Tests for Azure Blob Storage service — upload_pdf(), SAS signing and _get_client()."""
+
+import io
+from datetime import datetime, timedelta, timezone
 
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def blob_mod():
+    """The blob_storage module with its client and delegation-key cache reset."""
+    import app.services.blob_storage as mod
+
+    saved = (mod._client, mod._delegation_key, mod._delegation_key_expiry)
+    saved_credential = mod._credential
+    mod._client = None
+    mod._credential = None
+    mod._delegation_key = None
+    mod._delegation_key_expiry = None
+    mod._download_url_cache.clear()
+    try:
+        yield mod
+    finally:
+        mod._client, mod._delegation_key, mod._delegation_key_expiry = saved
+        mod._credential = saved_credential
+        mod._download_url_cache.clear()
+
+
+def _service_client(account_key: str | None = "dGVzdGtleQ==") -> MagicMock:
+    blob_client = MagicMock()
+    blob_client.upload_blob = AsyncMock()
+    blob_client.url = (
+        "https://testaccount.blob.core.windows.net/container/path/file.pdf"
+    )
+
+    service_client = MagicMock()
+    service_client.get_blob_client.return_value = blob_client
+    service_client.account_name = "testaccount"
+    if account_key is None:
+        service_client.credential = MagicMock(spec=[])
+    else:
+        service_client.credential.account_key = account_key
+    service_client.get_user_delegation_key = AsyncMock(return_value=MagicMock())
+    return service_client
 
 
 class TestGetClient:
-    """Tests for the singleton blob client factory."""
+    """Tests for the singleton async blob client factory."""
 
-    def test_client_uses_connection_string(self):
-        """_get_client creates a BlobServiceClient from settings.blob_connection."""
-        import app.services.blob_storage as mod
+    def test_client_uses_connection_string(self, blob_mod):
+        """_get_client creates an async BlobServiceClient from settings.blob_connection."""
+        with (
+            patch.object(blob_mod, "BlobServiceClient") as MockBSC,
+            patch.object(blob_mod, "settings") as mock_settings,
+        ):
+            mock_settings.blob_connection = "DefaultEndpointsProtocol=https;AccountName=test;AccountKey=key==;EndpointSuffix=core.windows.net"
+            MockBSC.from_connection_string.return_value = MagicMock()
 
-        original_client = mod._client
-        mod._client = None
+            client = blob_mod._get_client()
 
-        try:
-            with (
-                patch.object(mod, "BlobServiceClient") as MockBSC,
-                patch.object(mod, "settings") as mock_settings,
-            ):
-                mock_settings.blob_connection = "DefaultEndpointsProtocol=https;AccountName=test;AccountKey=key==;EndpointSuffix=core.windows.net"
-                MockBSC.from_connection_string.return_value = MagicMock()
+            args, kwargs = MockBSC.from_connection_string.call_args
+            assert args == (mock_settings.blob_connection,)
+            assert kwargs["max_single_put_size"] == blob_mod.MAX_SINGLE_PUT_SIZE
+            assert kwargs["max_block_size"] == blob_mod.MAX_BLOCK_SIZE
+            assert "transport" in kwargs
+            assert client is MockBSC.from_connection_string.return_value
+
+    def test_client_uses_managed_identity_without_connection_string(self, blob_mod):
+        with (
+            patch.object(blob_mod, "BlobServiceClient") as MockBSC,
+            patch.object(blob_mod, "DefaultAzureCredential") as MockCred,
+            patch.object(blob_mod, "settings") as mock_settings,
+        ):
+            mock_settings.blob_connection = ""
+            mock_settings.blob_account_url = "https://acct.blob.core.windows.net"
 
-                client = mod._get_client()
+            blob_mod._get_client()
 
-                MockBSC.from_connection_string.assert_called_once_with(
-                    mock_settings.blob_connection
-                )
-                assert client is MockBSC.from_connection_string.return_value
-        finally:
-            mod._client = original_client
+            args, kwargs = MockBSC.call_args
+            assert args == ("https://acct.blob.core.windows.net",)
+            assert kwargs["credential"] is MockCred.return_value
+            MockBSC.from_connection_string.assert_not_called()
 
-    def test_client_is_singleton(self):
+    def test_client_is_singleton(self, blob_mod):
         """Repeated calls return the same client instance."""
-        import app.services.blob_storage as mod
+        with (
+            patch.object(blob_mod, "BlobServiceClient") as MockBSC,
+            patch.object(blob_mod, "settings") as mock_settings,
+        ):
+            mock_settings.blob_connection = "fake-connection"
+            MockBSC.from_connection_string.return_value = MagicMock()
 
-        original_client = mod._client
-        mod._client = None
+            c1 = blob_mod._get_client()
+            c2 = blob_mod._get_client()
 
-        try:
-            with (
-                patch.object(mod, "BlobServiceClient") as MockBSC,
-                patch.object(mod, "settings") as mock_settings,
-            ):
-                mock_settings.blob_connection = "fake-connection"
-                MockBSC.from_connection_string.return_value = MagicMock()
+            assert c1 is c2
+            MockBSC.from_connection_string.assert_called_once()
 
-                c1 = mod._get_client()
-                c2 = mod._get_client()
+    @pytest.mark.asyncio
+    async def test_close_client_closes_and_resets(self, blob_mod):
+        client = MagicMock()
+        client.close = AsyncMock()
+        blob_mod._client = client
 
-                assert c1 is c2
-                MockBSC.from_connection_string.assert_called_once()
-        finally:
-            mod._client = original_client
+        await blob_mod.close_client()
+
+        client.close.assert_awaited_once()
+        assert blob_mod._client is None
+
+    @pytest.mark.asyncio
+    async def test_close_client_closes_managed_identity_credential(self, blob_mod):
+        with (
+            patch.object(blob_mod, "BlobServiceClient") as MockBSC,
+            patch.object(blob_mod, "DefaultAzureCredential") as MockCred,
+            patch.object(blob_mod, "settings") as mock_settings,
+        ):
+            mock_settings.blob_connection = ""
+            mock_settings.blob_account_url = "https://acct.blob.core.windows.net"
+            MockBSC.return_value.close = AsyncMock()
+            MockCred.return_value.close = AsyncMock()
+
+            blob_mod._get_client()
+            await blob_mod.close_client()
+
+        MockCred.return_value.close.assert_awaited_once()
+        assert blob_mod._credential is None
 
 
 class TestUploadPdf:
     """Tests for the upload_pdf async function."""
 
     @pytest.mark.asyncio
-    async def test_upload_success_returns_sas_url(self):
+    async def test_upload_success_returns_sas_url(self, blob_mod):
         """Successful upload returns a URL containing the blob path and a SAS token."""
-        mock_blob_client = MagicMock()
-        mock_blob_client.upload_blob = MagicMock()
-        mock_blob_client.url = (
-            "https://testaccount.blob.core.windows.net/container/path/file.pdf"
-        )
+        service_client = _service_client()
+
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=abc123"),
+        ):
+            mock_settings.blob_container = "test-container"
+            result = await blob_mod.upload_pdf(b"fake-pdf-bytes", "twi/conv-1/doc.pdf")
 
-        mock_container_client = MagicMock()
-        mock_container_client.get_blob_client.return_value = mock_blob_client
+        assert "testaccount" in result
+        assert "sig=abc123" in result
 
-        mock_service_client = MagicMock()
-        mock_service_client.get_container_client.return_value = mock_container_client
-        mock_service_client.account_name = "testaccount"
-        mock_service_client.credential.account_key = "dGVzdGtleQ=="
+    @pytest.mark.asyncio
+    async def test_upload_awaits_native_async_client(self, blob_mod):
+        """upload_pdf awaits the aio upload_blob with parallel block settings."""
+        service_client = _service_client()
+        blob_client = service_client.get_blob_client.return_value
 
         with (
-            patch(
-                "app.services.blob_storage._get_client",
-                return_value=mock_service_client,
-            ),
-            patch("app.services.blob_storage.settings") as mock_settings,
-            patch(
-                "app.services.blob_storage.generate_blob_sas", return_value="sig=abc123"
-            ),
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=x"),
         ):
-            mock_settings.blob_container = "test-container"
+            mock_settings.blob_container = "c"
+            mock_settings.blob_upload_concurrency = 6
+            await blob_mod.upload_pdf(b"bytes", "path.pdf")
 
-            from app.services.blob_storage import upload_pdf
+        blob_client.upload_blob.assert_awaited_once()
+        _, kwargs = blob_client.upload_blob.call_args
+        assert kwargs["overwrite"] is True
+        assert kwargs["max_concurrency"] == 6
+        assert kwargs["content_settings"].content_type == "application/pdf"
 
-            result = await upload_pdf(b"fake-pdf-bytes", "twi/conv-1/doc.pdf")
+    @pytest.mark.asyncio
+    async def test_upload_accepts_stream(self, blob_mod):
+        service_client = _service_client()
+        blob_client = service_client.get_blob_client.return_value
+        stream = io.BytesIO(b"%PDF-1.7 streamed")
+
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=x"),
+        ):
+            mock_settings.blob_container = "c"
+            await blob_mod.upload_pdf(stream, "path.pdf", length=17)
+
+        args, kwargs = blob_client.upload_blob.call_args
+        assert args[0] is stream
+        assert kwargs["length"] == 17
+
+    @pytest.mark.asyncio
+    async def test_upload_error_propagates(self, blob_mod):
+        """Exceptions from blob upload bubble up to the caller."""
+        service_client = _service_client()
+        service_client.get_blob_client.return_value.upload_blob = AsyncMock(
+            side_effect=Exception("Upload failed")
+        )
+
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+        ):
+            mock_settings.blob_container = "c"
+            with pytest.raises(Exception, match="Upload failed"):
+                await blob_mod.upload_pdf(b"bytes", "path.pdf")
 
-        assert "testaccount" in result
-        assert "sig=abc123" in result
+
+class TestSasSigning:
+    """Account-key vs user-delegation-key SAS signing."""
 
     @pytest.mark.asyncio
-    async def test_upload_calls_blob_client(self):
-        """upload_pdf calls upload_blob via asyncio.to_thread."""
-        mock_blob_client = MagicMock()
-        mock_blob_client.upload_blob = MagicMock()
-        mock_blob_client.url = "https://test.blob.core.windows.net/c/f.pdf"
+    async def test_account_key_signing_skips_delegation_key(self, blob_mod):
+        service_client = _service_client(account_key="a2V5")
 
-        mock_container_client = MagicMock()
-        mock_container_client.get_blob_client.return_value = mock_blob_client
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(
+                blob_mod, "generate_blob_sas", return_value="sig=k"
+            ) as mock_sas,
+        ):
+            mock_settings.blob_container = "c"
+            url = await blob_mod.generate_sas_url("path.pdf")
 
-        mock_service_client = MagicMock()
-        mock_service_client.get_container_client.return_value = mock_container_client
-        mock_service_client.account_name = "test"
-        mock_service_client.credential.account_key = "key"
+        assert url.endswith("?sig=k")
+        assert mock_sas.call_args.kwargs["account_key"] == "a2V5"
+        service_client.get_user_delegation_key.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_managed_identity_signs_with_user_delegation_key(self, blob_mod):
+        """Without an account key the SAS is signed with a user delegation key, not left unsigned."""
+        service_client = _service_client(account_key=None)
+        delegation_key = service_client.get_user_delegation_key.return_value
 
         with (
-            patch(
-                "app.services.blob_storage._get_client",
-                return_value=mock_service_client,
-            ),
-            patch("app.services.blob_storage.settings") as mock_settings,
-            patch("app.services.blob_storage.generate_blob_sas", return_value="sig=x"),
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(
+                blob_mod, "generate_blob_sas", return_value="sig=udk"
+            ) as mock_sas,
         ):
             mock_settings.blob_container = "c"
+            url = await blob_mod.upload_pdf(b"bytes", "path.pdf")
 
-            from app.services.blob_storage import upload_pdf
+        assert url.endswith("?sig=udk")
+        assert mock_sas.call_args.kwargs["user_delegation_key"] is delegation_key
 
-            await upload_pdf(b"bytes", "path.pdf")
+    @pytest.mark.asyncio
+    async def test_delegation_key_cached_across_uploads(self, blob_mod):
+        service_client = _service_client(account_key=None)
 
-        mock_blob_client.upload_blob.assert_called_once()
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=udk"),
+        ):
+            mock_settings.blob_container = "c"
+            for i in range(5):
+                await blob_mod.upload_pdf(b"bytes", f"path-{i}.pdf")
+
+        service_client.get_user_delegation_key.assert_awaited_once()
 
     @pytest.mark.asyncio
-    async def test_upload_handles_missing_account_key(self):
-        """When credential has no account_key, falls back to blob URL without SAS."""
-        mock_blob_client = MagicMock()
-        mock_blob_client.upload_blob = MagicMock()
-        mock_blob_client.url = "https://mi.blob.core.windows.net/c/f.pdf"
+    async def test_delegation_key_refreshed_before_expiry(self, blob_mod):
+        """A key that can no longer cover a full SAS lifetime is replaced."""
+        service_client = _service_client(account_key=None)
+        blob_mod._delegation_key = MagicMock()
+        blob_mod._delegation_key_expiry = datetime.now(timezone.utc) + timedelta(
+            hours=12
+        )
+
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=udk"),
+        ):
+            mock_settings.blob_container = "c"
+            await blob_mod.generate_sas_url("path.pdf")
 
-        mock_container_client = MagicMock()
-        mock_container_client.get_blob_client.return_value = mock_blob_client
+        service_client.get_user_delegation_key.assert_awaited_once()
+        assert blob_mod._delegation_key_expiry - datetime.now(timezone.utc) > timedelta(
+            days=6
+        )
 
-        mock_service_client = MagicMock()
-        mock_service_client.get_container_client.return_value = mock_container_client
-        mock_service_client.account_name = "mi"
-        mock_service_client.credential = MagicMock(spec=[])
+    @pytest.mark.asyncio
+    async def test_delegation_key_covers_requested_ttl(self, blob_mod):
+        """A key valid for 24h more is not enough for a 3-day SAS."""
+        service_client = _service_client(account_key=None)
+        blob_mod._delegation_key = MagicMock()
+        blob_mod._delegation_key_expiry = datetime.now(timezone.utc) + timedelta(days=2)
 
         with (
-            patch(
-                "app.services.blob_storage._get_client",
-                return_value=mock_service_client,
-            ),
-            patch("app.services.blob_storage.settings") as mock_settings,
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=udk"),
         ):
             mock_settings.blob_container = "c"
+            await blob_mod.generate_sas_url("path.pdf", ttl=timedelta(days=3))
+
+        service_client.get_user_delegation_key.assert_awaited_once()
 
-            from app.services.blob_storage import upload_pdf
+    @pytest.mark.asyncio
+    async def test_ttl_longer_than_delegation_key_rejected(self, blob_mod):
+        with pytest.raises(ValueError, match="exceeds"):
+            await blob_mod.generate_sas_url("path.pdf", ttl=timedelta(days=8))
 
-            result = await upload_pdf(b"bytes", "path.pdf")
 
-        assert result == mock_blob_client.url
+class TestDownloadUrl:
+    """Short-lived SAS URLs minted for the download endpoint."""
 
     @pytest.mark.asyncio
-    async def test_upload_error_propagates(self):
-        """Exceptions from blob upload bubble up to the caller."""
-        mock_blob_client = MagicMock()
-        mock_blob_client.upload_blob = MagicMock(side_effect=Exception("Upload failed"))
+    async def test_download_url_is_short_lived_and_cached(self, blob_mod):
+        service_client = _service_client()
 
-        mock_container_client = MagicMock()
-        mock_container_client.get_blob_client.return_value = mock_blob_client
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(
+                blob_mod, "generate_blob_sas", return_value="sig=d"
+            ) as mock_sas,
+        ):
+            mock_settings.blob_container = "c"
+            url1 = await blob_mod.get_download_url("path.pdf")
+            url2 = await blob_mod.get_download_url("path.pdf")
 
-        mock_service_client = MagicMock()
-        mock_service_client.get_container_client.return_value = mock_container_client
+        assert url1 == url2
+        mock_sas.assert_called_once()
+        expiry = mock_sas.call_args.kwargs["expiry"]
+        assert expiry - datetime.now(timezone.utc) <= blob_mod.DOWNLOAD_SAS_TTL
+
+    @pytest.mark.asyncio
+    async def test_download_url_reminted_near_expiry(self, blob_mod):
+        service_client = _service_client()
+        blob_mod._download_url_cache["path.pdf"] = (
+            "https://stale",
+            datetime.now(timezone.utc) + timedelta(minutes=1),
+        )
 
         with (
-            patch(
-                "app.services.blob_storage._get_client",
-                return_value=mock_service_client,
-            ),
-            patch("app.services.blob_storage.settings") as mock_settings,
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=fresh"),
         ):
             mock_settings.blob_container = "c"
+            url = await blob_mod.get_download_url("path.pdf")
 
-            from app.services.blob_storage import upload_pdf
+        assert url.endswith("?sig=fresh")
 
-            with pytest.raises(Exception, match="Upload failed"):
-                await upload_pdf(b"bytes", "path.pdf")
+    @pytest.mark.asyncio
+    async def test_download_url_cache_is_bounded(self, blob_mod):
+        service_client = _service_client()
+
+        with (
+            patch.object(blob_mod, "_get_client", return_value=service_client),
+            patch.object(blob_mod, "settings") as mock_settings,
+            patch.object(blob_mod, "generate_blob_sas", return_value="sig=d"),
+            patch.object(blob_mod, "_DOWNLOAD_URL_CACHE_SIZE", 3),
+        ):
+            mock_settings.blob_container = "c"
+            for i in range(5):
+                await blob_mod.get_download_url(f"path-{i}.pdf")
+
+        assert list(blob_mod._download_url_cache) == [
+            "path-2.pdf",
+            "path-3.pdf",
+            "path-4.pdf",
+        ]
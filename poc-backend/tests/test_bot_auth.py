@@ -0,0 +1,163 @@
+"""Tests for cached Bot Framework token validation and signing-key prefetch."""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from botbuilder.schema import Activity
+from botframework.connector.auth import ClaimsIdentity, JwtTokenExtractor
+
+from app.bot.auth import BotAuthenticator, _metadata_urls
+
+HEADER = "Bearer header.payload.signature"
+
+
+def _activity(service_url: str = "https://smba.trafficmanager.net/emea/"):
+    return Activity(type="message", channel_id="msteams", service_url=service_url)
+
+
+def _claims(exp: float | None = None, authenticated: bool = True):
+    exp = time.time() + 3600 if exp is None else exp
+    return ClaimsIdentity({"aud": "app-id", "exp": exp}, authenticated)
+
+
+@pytest.fixture
+def validate():
+    with patch(
+        "app.bot.auth.JwtTokenValidation.authenticate_request",
+        new=AsyncMock(return_value=_claims()),
+    ) as mock_validate:
+        yield mock_validate
+
+
+class TestAuthenticate:
+    @pytest.mark.asyncio
+    async def test_token_is_validated_once_until_it_expires(self, validate):
+        auth = BotAuthenticator("app-id", "secret")
+
+        first = await auth.authenticate(_activity(), HEADER)
+        second = await auth.authenticate(_activity(), HEADER)
+
+        assert first is second
+        validate.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_other_service_url_is_validated_again(self, validate):
+        auth = BotAuthenticator("app-id", "secret")
+
+        await auth.authenticate(_activity(), HEADER)
+        await auth.authenticate(_activity("https://evil.example/"), HEADER)
+
+        assert validate.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_token_is_validated_again(self, validate):
+        validate.return_value = _claims(exp=time.time() - 1)
+        auth = BotAuthenticator("app-id", "secret")
+
+        await auth.authenticate(_activity(), HEADER)
+        await auth.authenticate(_activity(), HEADER)
+
+        assert validate.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unauthenticated_claims_are_rejected_and_not_cached(self, validate):
+        validate.return_value = _claims(authenticated=False)
+        auth = BotAuthenticator("app-id", "secret")
+
+        with pytest.raises(PermissionError):
+            await auth.authenticate(_activity(), HEADER)
+        assert not auth._cache
+
+
+@pytest.fixture(autouse=True)
+def sdk_key_cache():
+    """Keep fake keys out of the SDK's process-wide metadata cache."""
+    with patch.dict(JwtTokenExtractor.metadataCache, clear=True):
+        yield
+
+
+class TestSigningKeys:
+    @pytest.mark.asyncio
+    async def test_refresh_fills_the_sdk_key_cache(self):
+        auth = BotAuthenticator("app-id", "secret")
+        keys = [{"kid": "k1", "kty": "RSA"}]
+
+        with patch("app.bot.auth._fetch_signing_keys", return_value=keys):
+            await auth.refresh_signing_keys()
+
+        for url in _metadata_urls():
+            metadata = JwtTokenExtractor.get_open_id_metadata(url)
+            assert metadata.keys == keys
+            # Fresh keys: the SDK will not refetch them on the request path.
+            assert metadata.last_updated > datetime.now() - timedelta(minutes=1)
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_previous_keys(self):
+        auth = BotAuthenticator("app-id", "secret")
+        url = _metadata_urls()[0]
+        metadata = JwtTokenExtractor.get_open_id_metadata(url)
+        metadata.keys = [{"kid": "old"}]
+
+        with patch(
+            "app.bot.auth._fetch_signing_keys", side_effect=Exception("timeout")
+        ):
+            await auth.refresh_signing_keys()
+
+        assert metadata.keys == [{"kid": "old"}]
+
+    @pytest.mark.asyncio
+    async def test_start_prefetches_and_aclose_stops_refreshing(self):
+        auth = BotAuthenticator("app-id", "secret", refresh_interval=3600)
+        auth.refresh_signing_keys = AsyncMock()
+
+        await auth.start()
+        await auth.aclose()
+
+        auth.refresh_signing_keys.assert_awaited_once()
+        assert auth._refresher is None
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_fetched_without_an_app_id(self):
+        auth = BotAuthenticator("", "")
+        auth.refresh_signing_keys = AsyncMock()
+
+        await auth.start()
+
+        auth.refresh_signing_keys.assert_not_awaited()
+
+
+class TestMessagesEndpoint:
+    @pytest.mark.asyncio
+    async def test_adapter_reuses_the_validated_identity(self, validate):
+        import httpx
+
+        from app.main import app
+
+        auth = BotAuthenticator("app-id", "secret")
+        body = {
+            "type": "message",
+            "id": "a1",
+            "channelId": "msteams",
+            "conversation": {"id": "c1"},
+            "serviceUrl": "https://smba.trafficmanager.net/emea/",
+        }
+        with (
+            patch("app.main.bot_auth", auth),
+            patch("app.main.adapter") as adapter,
+        ):
+            adapter.process_activity_with_identity = AsyncMock(return_value=None)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                for _ in range(2):
+                    resp = await client.post(
+                        "/api/messages", json=body, headers={"Authorization": HEADER}
+                    )
+                    assert resp.status_code == 200
+
+        validate.assert_awaited_once()
+        identity = adapter.process_activity_with_identity.call_args[0][1]
+        assert identity is validate.return_value
+        adapter.process_activity.assert_not_called()
@@ -4,6 +4,35 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
 
+def _services(**overrides):
+    """Fresh service container per test (in-memory stores, no shared state)."""
+    from app.services.container import ServiceContainer
+
+    return ServiceContainer.create(**overrides)
+
+
+def _graph(draft: str = "test draft"):
+    """Graph mock whose checkpoint holds ``draft`` (what card actions load)."""
+    graph = MagicMock()
+    snapshot = MagicMock()
+    snapshot.values = {"draft": draft, "draft_metadata": {"model": "gpt-4o"}}
+    snapshot.config = {
+        "configurable": {"thread_id": "conv-123", "checkpoint_id": "cp-1"}
+    }
+    graph.aget_state = AsyncMock(return_value=snapshot)
+    return graph
+
+
+def _ref(draft: str = "test draft") -> dict:
+    from app.agent.graph import draft_hash
+
+    return {
+        "conversation_id": "conv-123",
+        "checkpoint_id": "cp-1",
+        "draft_hash": draft_hash(draft),
+    }
+
+
 class TestTelegramHelpers:
     """Test Telegram-specific helper functions."""
 
@@ -93,35 +122,32 @@ class TestBotHandler:
         return mock_turn_context
 
     @pytest.mark.asyncio
-    async def test_on_message_activity_calls_get_or_create(self, mock_turn_context):
+    async def test_on_message_activity_records_activity(self, mock_turn_context):
         """Test that message activity tracks conversation in Cosmos DB."""
-        with patch("app.bot.bot_handler.ConversationStore") as MockStore:
-            mock_store = MagicMock()
-            mock_store.get_or_create = AsyncMock()
-            MockStore.return_value = mock_store
-
-            from app.bot.bot_handler import AgentizeBotHandler
+        from app.bot.bot_handler import AgentizeBotHandler
 
-            handler = AgentizeBotHandler()
+        mock_store = MagicMock()
+        mock_store.record_activity = AsyncMock()
+        handler = AgentizeBotHandler(_services(conversations=mock_store))
 
-            with patch.object(
-                handler, "_get_graph", new_callable=AsyncMock
-            ) as mock_get_graph:
-                mock_get_graph.return_value = MagicMock()
-                with patch(
-                    "app.bot.bot_handler.run_agent", new_callable=AsyncMock
-                ) as mock_run:
-                    mock_run.return_value = {"status": "clarification_needed"}
-                    await handler.on_message_activity(mock_turn_context)
+        with patch.object(
+            handler, "_get_graph", new_callable=AsyncMock
+        ) as mock_get_graph:
+            mock_get_graph.return_value = MagicMock()
+            with patch(
+                "app.bot.bot_handler.run_agent", new_callable=AsyncMock
+            ) as mock_run:
+                mock_run.return_value = {"status": "clarification_needed"}
+                await handler.on_message_activity(mock_turn_context)
 
-            mock_store.get_or_create.assert_called_once()
+        mock_store.record_activity.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_on_members_added_sends_welcome_card(self):
         """Test that bot sends welcome card when added to conversation."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
+        handler = AgentizeBotHandler(_services())
 
         members_added = [MagicMock()]
         members_added[0].id = "new-user"
@@ -143,8 +169,8 @@ class TestBotHandler:
         """Test that Telegram messages are routed to Telegram handler."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
         handler._handle_telegram_response = AsyncMock()
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
@@ -168,8 +194,8 @@ class TestBotHandler:
         """Test handling 'Igen' approval response from Telegram."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -191,15 +217,15 @@ class TestBotHandler:
 
             assert turn_context.send_activity.call_count >= 1
             _, kwargs = mock_run.call_args
-            assert kwargs["as_node"] == "approve"
+            assert kwargs["resume_from"] == "output"
 
     @pytest.mark.asyncio
     async def test_handle_telegram_text_reject(self):
         """Test handling 'Nem' rejection response from Telegram — resumes graph for audit."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -221,8 +247,8 @@ class TestBotHandler:
         """Test that unrecognized Telegram text is forwarded to LangGraph as a new request."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -250,18 +276,14 @@ class TestBotHandler:
         """Test approve_draft action handling for Telegram."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.activity.channel_id = "telegram"
         turn_context.send_activity = AsyncMock()
 
-        value = {
-            "action": "approve_draft",
-            "draft": "test draft",
-            "metadata": {"title": "Test"},
-        }
+        value = {"action": "approve_draft", **_ref()}
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = {
@@ -282,14 +304,14 @@ class TestBotHandler:
         """Test reject action handling — resumes graph for audit trail."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.activity.channel_id = "msteams"
         turn_context.send_activity = AsyncMock()
 
-        value = {"action": "reject"}
+        value = {"action": "reject", **_ref()}
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = {"status": "rejected"}
@@ -306,19 +328,83 @@ class TestBotHandler:
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
             assert kwargs["resume_from"] == "rejection"
-            assert kwargs["as_node"] == "review"
+
+
+class TestCardReferences:
+    """Card actions carry a reference; the draft is loaded from the checkpoint."""
+
+    @pytest.mark.asyncio
+    async def test_approval_card_shows_checkpointed_draft(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph("checkpointed draft"))
+        handler._send_card = AsyncMock()
+        turn_context = MagicMock()
+        turn_context.activity.channel_id = "msteams"
+        turn_context.send_activity = AsyncMock()
+
+        value = {"action": "approve_draft", **_ref("checkpointed draft")}
+        value["draft"] = "tampered draft"  # never trusted
+        await handler._handle_card_action(turn_context, value, "conv-123", "user-456")
+
+        card = handler._send_card.call_args[0][1]
+        assert "checkpointed draft" in str(card["body"])
+        assert "tampered" not in str(card)
+        assert card["actions"][0]["data"]["draft_hash"] == value["draft_hash"]
+
+    @pytest.mark.asyncio
+    async def test_stale_card_is_refused(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph("newer revision"))
+        turn_context = MagicMock()
+        turn_context.activity.channel_id = "msteams"
+        turn_context.send_activity = AsyncMock()
+
+        with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
+            await handler._handle_card_action(
+                turn_context,
+                {"action": "final_approve", **_ref("old draft")},
+                "conv-123",
+                "user-456",
+            )
+
+        mock_run.assert_not_called()
+        assert "elavult" in str(turn_context.send_activity.call_args)
+
+    @pytest.mark.asyncio
+    async def test_card_from_another_conversation_is_refused(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
+        turn_context = MagicMock()
+        turn_context.activity.channel_id = "msteams"
+        turn_context.send_activity = AsyncMock()
+
+        with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
+            await handler._handle_card_action(
+                turn_context,
+                {"action": "reject", **_ref(), "conversation_id": "other"},
+                "conv-123",
+                "user-456",
+            )
+
+        mock_run.assert_not_called()
 
 
 class TestRequestEditSource:
-    """Verify that request_edit always passes as_node='review' regardless of source."""
+    """request_edit resumes the paused step with a revision, whatever the source."""
 
     @pytest.mark.asyncio
-    async def test_request_edit_from_approval_card_passes_as_node_review(self):
-        """Back-to-editing from approval card must route via after_review."""
+    async def test_request_edit_from_approval_card_resumes_with_revision(self):
+        """Back-to-editing from the approval card is applied by the paused node."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.activity.channel_id = "msteams"
@@ -327,8 +413,7 @@ class TestRequestEditSource:
         value = {
             "action": "request_edit",
             "source": "approval",
-            "draft": "test draft",
-            "metadata": {},
+            **_ref(),
             "feedback": "fix step 3",
         }
 
@@ -344,27 +429,21 @@ class TestRequestEditSource:
 
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
-            assert kwargs["as_node"] == "review"
+            assert kwargs["resume_from"] == "revision"
+            assert kwargs["context"] == {"feedback": value["feedback"]}
 
     @pytest.mark.asyncio
-    async def test_request_edit_from_review_card_passes_as_node_review(self):
-        """Edit from the review card must also pass as_node='review' so
-        after_review evaluates directly (review_node would reset status)."""
+    async def test_request_edit_from_review_card_resumes_with_revision(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.activity.channel_id = "msteams"
         turn_context.send_activity = AsyncMock()
 
-        value = {
-            "action": "request_edit",
-            "draft": "test draft",
-            "metadata": {},
-            "feedback": "minor fix",
-        }
+        value = {"action": "request_edit", **_ref(), "feedback": "minor fix"}
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = {
@@ -378,28 +457,25 @@ class TestRequestEditSource:
 
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
-            assert kwargs["as_node"] == "review"
+            assert kwargs["resume_from"] == "revision"
+            assert kwargs["context"] == {"feedback": value["feedback"]}
 
 
-class TestFinalApproveAsNode:
-    """Verify that final_approve passes as_node='approve' to skip the second interrupt."""
+class TestFinalApprove:
+    """final_approve resumes with the approval in one invocation."""
 
     @pytest.mark.asyncio
-    async def test_final_approve_teams_passes_as_node_approve(self):
+    async def test_final_approve_teams_resumes_with_output(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.activity.channel_id = "msteams"
         turn_context.send_activity = AsyncMock()
 
-        value = {
-            "action": "final_approve",
-            "draft": "approved draft",
-            "metadata": {"model": "gpt-4o"},
-        }
+        value = {"action": "final_approve", **_ref()}
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = {
@@ -413,15 +489,15 @@ class TestFinalApproveAsNode:
 
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
-            assert kwargs["as_node"] == "approve"
             assert kwargs["resume_from"] == "output"
+            assert kwargs["context"]["timestamp"]
 
     @pytest.mark.asyncio
-    async def test_final_approve_telegram_passes_as_node_approve(self):
+    async def test_final_approve_telegram_resumes_with_output(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -438,40 +514,105 @@ class TestFinalApproveAsNode:
 
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
-            assert kwargs["as_node"] == "approve"
+            assert kwargs["resume_from"] == "output"
+
+    @pytest.mark.asyncio
+    async def test_final_approve_links_to_download_endpoint(self):
+        """The result message prefers the stable download link over the SAS URL."""
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
+
+        turn_context = MagicMock()
+        turn_context.send_activity = AsyncMock()
+
+        with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = {
+                "pdf_url": "https://blob/test.pdf?sig=x",
+                "download_url": "https://backend/documents/abc/download",
+                "title": "TWI Doc",
+                "draft_metadata": {},
+            }
+            await handler._handle_telegram_text(
+                turn_context, "igen", "conv-123", "user-456"
+            )
+
+        sent = " ".join(
+            str(c.args[0]) for c in turn_context.send_activity.call_args_list
+        )
+        assert "https://backend/documents/abc/download" in sent
+        assert "sig=x" not in sent
+
+    @pytest.mark.asyncio
+    async def test_button_can_be_pressed_again_after_a_failed_approve(self):
+        """A handled failure releases the click, so the retry is not a duplicate."""
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
+
+        def click(activity_id: str) -> MagicMock:
+            turn_context = MagicMock()
+            turn_context.activity.id = activity_id
+            turn_context.activity.channel_id = "msteams"
+            turn_context.activity.conversation.id = "conv-123"
+            turn_context.activity.from_property.id = "user-456"
+            turn_context.activity.text = ""
+            turn_context.activity.value = {"action": "final_approve", **_ref()}
+            turn_context.send_activity = AsyncMock()
+            return turn_context
+
+        with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
+            mock_run.side_effect = [
+                RuntimeError("Blob 503"),
+                {"pdf_url": "https://blob/test.pdf", "draft_metadata": {}},
+            ]
+            failed = click("a1")
+            await handler.on_message_activity(failed)
+            await handler.on_message_activity(click("a2"))
+
+        assert mock_run.await_count == 2
+        assert "Blob 503" in str(failed.send_activity.call_args_list[-1].args[0])
 
 
 class TestTelegramRevisionFeedback:
-    """Verify the Telegram revision feedback state tracking."""
+    """The pending-revision marker lives in the graph checkpoint, not in a lookup per message."""
 
     @pytest.mark.asyncio
-    async def test_modositas_sets_pending_state(self):
+    async def test_modositas_marks_checkpoint_awaiting_feedback(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
+        graph = MagicMock()
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=graph)
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
 
-        await handler._handle_telegram_text(
-            turn_context, "modositas", "conv-123", "user-456"
-        )
+        with patch(
+            "app.bot.bot_handler.await_revision_feedback", new_callable=AsyncMock
+        ) as mock_await:
+            await handler._handle_telegram_text(
+                turn_context, "modositas", "conv-123", "user-456"
+            )
 
-        is_set = await handler._pending_state.pop_flag("conv-123", "pending_revision")
-        assert is_set is True
+        mock_await.assert_awaited_once_with(graph, "conv-123")
+        turn_context.send_activity.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_next_message_after_modositas_treated_as_feedback(self):
+    async def test_next_message_goes_to_graph_as_new_turn(self):
+        """No store lookup: the graph's start node decides it is feedback."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
-        await handler._pending_state.set_flag("conv-123", "pending_revision")
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
 
         with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = {
+                "status": "review_needed",
                 "draft": "revised draft",
                 "draft_metadata": {"model": "gpt-4o", "generated_at": "now"},
             }
@@ -484,13 +625,11 @@ class TestTelegramRevisionFeedback:
 
             mock_run.assert_called_once()
             _, kwargs = mock_run.call_args
-            assert kwargs["resume_from"] == "revision"
-            assert kwargs["context"]["feedback"] == "Add temperature check to step 3"
+            assert kwargs["message"] == "Add temperature check to step 3"
+            assert "resume_from" not in kwargs
 
-        is_still_set = await handler._pending_state.pop_flag(
-            "conv-123", "pending_revision"
-        )
-        assert is_still_set is False
+        sent = [str(c.args[0]) for c in turn_context.send_activity.call_args_list]
+        assert any("revised draft" in text for text in sent)
 
 
 class TestTelegramInlineRevision:
@@ -500,8 +639,8 @@ class TestTelegramInlineRevision:
     async def test_inline_modositas_with_feedback(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -527,7 +666,7 @@ class TestTelegramInlineRevision:
     async def test_inline_modositas_empty_feedback_prompts(self):
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
+        handler = AgentizeBotHandler(_services())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -548,8 +687,8 @@ class TestBotHandlerEdgeCases:
         """Test that exceptions in run_agent are caught and handled."""
         from app.bot.bot_handler import AgentizeBotHandler
 
-        handler = AgentizeBotHandler()
-        handler._get_graph = AsyncMock(return_value=MagicMock())
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
 
         turn_context = MagicMock()
         turn_context.send_activity = AsyncMock()
@@ -563,3 +702,91 @@ class TestBotHandlerEdgeCases:
 
         call_args = [str(c) for c in turn_context.send_activity.call_args_list]
         assert any("Hiba" in str(c) for c in call_args)
+
+
+class TestProgressMessage:
+    """One progress message, edited in place as nodes finish."""
+
+    def _turn_context(self):
+        turn_context = MagicMock()
+        turn_context.send_activity = AsyncMock(return_value=MagicMock(id="act-1"))
+        turn_context.update_activity = AsyncMock()
+        return turn_context
+
+    @pytest.mark.asyncio
+    async def test_updates_single_message_per_node(self):
+        from app.bot.progress import ProgressMessage
+
+        turn_context = self._turn_context()
+        progress = ProgressMessage(turn_context, min_interval=0)
+        await progress.start("⏳")
+        for node in ("start", "classify_intent", "process_input", "generate"):
+            await progress.node_finished(node)
+
+        edits = [c.args[0] for c in turn_context.update_activity.call_args_list]
+        assert len(edits) == 3
+        assert all(edit.id == "act-1" for edit in edits)
+        sent = [c.args[0] for c in turn_context.send_activity.call_args_list]
+        assert sum(1 for a in sent if isinstance(a, str)) == 1
+        assert sum(1 for a in sent if getattr(a, "type", None) == "typing") == 4
+
+    @pytest.mark.asyncio
+    async def test_label_after_classification_follows_the_intent(self):
+        from app.bot.progress import ProgressMessage
+        from app.locale import t
+
+        turn_context = self._turn_context()
+        progress = ProgressMessage(turn_context, min_interval=0)
+        await progress.start("⏳")
+        await progress.node_finished("classify_intent", {"intent": "question"})
+        await progress.node_finished("classify_intent", {"intent": "edit_twi"})
+        await progress.node_finished("classify_intent", {"intent": "unknown"})
+
+        edits = [c.args[0].text for c in turn_context.update_activity.call_args_list]
+        assert edits == [
+            t("progress.answering"),
+            t("progress.extracting"),
+            t("progress.working"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_edits_are_rate_limited(self):
+        from app.bot.progress import ProgressMessage
+
+        turn_context = self._turn_context()
+        progress = ProgressMessage(turn_context, min_interval=60)
+        await progress.start("⏳")
+        await progress.node_finished("start")
+        await progress.node_finished("classify_intent")
+
+        turn_context.update_activity.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_channel_without_edits_falls_back_to_typing(self):
+        from app.bot.progress import ProgressMessage
+
+        turn_context = self._turn_context()
+        turn_context.update_activity.side_effect = Exception("not supported")
+        progress = ProgressMessage(turn_context, min_interval=0)
+        await progress.start("⏳")
+        await progress.node_finished("start")
+        await progress.node_finished("classify_intent")
+
+        assert turn_context.update_activity.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_text_message_streams_progress(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+
+        handler = AgentizeBotHandler(_services())
+        handler._get_graph = AsyncMock(return_value=_graph())
+        handler._send_review_card = AsyncMock()
+        turn_context = self._turn_context()
+
+        with patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = {"status": "review_needed", "draft": "d"}
+            await handler._handle_text_message(
+                turn_context, "Készíts TWI-t", "conv-123", "user-456", "msteams"
+            )
+
+        assert callable(mock_run.call_args.kwargs["on_progress"])
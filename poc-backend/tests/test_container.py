@@ -0,0 +1,244 @@
+"""Tests for the service container and its injection into graph nodes."""
+
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.container import ServiceContainer, get_services
+
+
+def _mock_audit_writer() -> MagicMock:
+    writer = MagicMock()
+    writer.log = AsyncMock()
+    writer.start = AsyncMock()
+    writer.aclose = AsyncMock()
+    return writer
+
+
+class TestServiceContainer:
+    """Construction, resolution and lifecycle of the container."""
+
+    def test_create_uses_overrides(self):
+        documents = MagicMock()
+        services = ServiceContainer.create(documents=documents)
+
+        assert services.documents is documents
+        assert services.conversations is not None
+        assert services.retriever.documents is documents
+        assert services.audit_writer is not None
+
+    def test_get_services_prefers_injected_container(self):
+        injected = ServiceContainer.create()
+        config = {"configurable": {"thread_id": "t", "services": injected}}
+
+        assert get_services(config) is injected
+
+    def test_get_services_falls_back_to_process_container(self):
+        process = ServiceContainer.create()
+        with patch("app.services.container._services", process):
+            assert get_services({"configurable": {"thread_id": "t"}}) is process
+            assert get_services() is process
+
+    @pytest.mark.asyncio
+    async def test_start_compiles_graph_once(self):
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        with (
+            patch("app.services.container.ensure_indexes", new_callable=AsyncMock),
+            patch("app.agent.tools.pdf_generator.warm_up_renderer"),
+        ):
+            await services.start()
+
+        graph = services.graph
+        assert graph is not None
+        assert await services.get_graph() is graph
+        services.audit_writer.start.assert_awaited_once()
+        assert services.ready
+        assert {"renderer", "indexes", "graph", "total"} <= set(
+            services.startup_timings
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_warm_up_step_is_recorded_and_replica_gets_ready(self):
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        with (
+            patch(
+                "app.services.container.ensure_indexes",
+                new=AsyncMock(side_effect=Exception("Cosmos 503")),
+            ),
+            patch("app.agent.tools.pdf_generator.warm_up_renderer"),
+        ):
+            await services.start(signing_keys=AsyncMock())
+
+        assert services.ready
+        assert services.startup_failures == {"indexes": "Cosmos 503"}
+        assert "signing_keys" in services.startup_timings
+
+    @pytest.mark.asyncio
+    async def test_failed_graph_step_is_retried_before_the_replica_gets_ready(self):
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        compiled = object()
+        with (
+            patch("app.services.container.ensure_indexes", new_callable=AsyncMock),
+            patch("app.agent.tools.pdf_generator.warm_up_renderer"),
+            patch("app.services.container._REQUIRED_RETRY_MIN", 0.01),
+            patch(
+                "app.agent.graph.create_agent_graph",
+                new=AsyncMock(side_effect=[Exception("Mongo 503"), compiled]),
+            ),
+        ):
+            await services.start()
+
+        assert services.ready
+        assert services.graph is compiled
+        assert services.startup_failures == {}
+
+    @pytest.mark.asyncio
+    async def test_stop_ends_the_retries_without_getting_ready(self):
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        with (
+            patch("app.services.container.ensure_indexes", new_callable=AsyncMock),
+            patch("app.agent.tools.pdf_generator.warm_up_renderer"),
+            patch(
+                "app.agent.graph.create_agent_graph",
+                new=AsyncMock(side_effect=Exception("Mongo 503")),
+            ),
+        ):
+            warm_up = asyncio.create_task(services.start())
+            await asyncio.sleep(0.01)
+            services.stop()
+            await warm_up
+
+        assert not services.ready
+        assert services.startup_failures == {"graph": "Mongo 503"}
+
+    @pytest.mark.asyncio
+    async def test_renderer_warms_up_on_the_event_loop_thread(self):
+        import threading
+
+        threads: list[int] = []
+        with patch(
+            "app.agent.tools.pdf_generator.warm_up_renderer",
+            side_effect=lambda: threads.append(threading.get_ident()),
+        ):
+            await ServiceContainer._warm_renderer()
+
+        assert threads == [threading.get_ident()]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_requests_compile_the_graph_once(self):
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        with patch(
+            "app.agent.graph.create_agent_graph",
+            new=AsyncMock(side_effect=lambda: object()),
+        ) as compile_graph:
+            first, second = await asyncio.gather(
+                services.get_graph(), services.get_graph()
+            )
+
+        assert first is second
+        compile_graph.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_aclose_drains_writers_before_closing_clients(self):
+        calls: list[str] = []
+        audit_writer = _mock_audit_writer()
+        audit_writer.aclose.side_effect = lambda: calls.append("audit")
+        conversations = MagicMock()
+        conversations.aclose = AsyncMock(side_effect=lambda: calls.append("conv"))
+        services = ServiceContainer.create(
+            audit_writer=audit_writer, conversations=conversations
+        )
+
+        with (
+            patch(
+                "app.services.blob_storage.close_client",
+                new=AsyncMock(side_effect=lambda: calls.append("blob")),
+            ),
+            patch(
+                "app.services.ai_foundry.close_client",
+                new=AsyncMock(side_effect=lambda: calls.append("llm")),
+            ),
+            patch(
+                "app.services.cosmos_db.close_client",
+                side_effect=lambda: calls.append("mongo"),
+            ),
+        ):
+            await services.aclose()
+
+        assert calls == ["audit", "conv", "blob", "llm", "mongo"]
+
+
+class TestReadiness:
+    """``/ready`` keeps a replica out of rotation until it is warm."""
+
+    @pytest.mark.asyncio
+    async def test_ready_turns_green_after_warm_up(self):
+        from app.main import app
+
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        with patch("app.services.container._services", services):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                assert (await client.get("/health")).status_code == 200
+                assert (await client.get("/ready")).status_code == 503
+
+                services.startup_timings.update(graph=12.5, total=40.0)
+                services.startup_failures["llm"] = "timeout"
+                services.ready = True
+                resp = await client.get("/ready")
+
+        assert resp.status_code == 200
+        assert resp.json()["startup_ms"]["graph"] == 12.5
+        assert resp.json()["failed_steps"] == ["llm"]
+
+    @pytest.mark.asyncio
+    async def test_failed_required_step_keeps_the_replica_unready(self):
+        from app.main import app
+
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        services.startup_failures["graph"] = "Mongo 503"
+        with patch("app.services.container._services", services):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get("/ready")
+
+        assert resp.status_code == 503
+        assert resp.json()["failed_steps"] == ["graph"]
+
+
+class TestNodeInjection:
+    """Nodes use the container passed in the LangGraph config."""
+
+    @pytest.mark.asyncio
+    async def test_run_agent_passes_services_to_nodes(self, sample_agent_state):
+        from langgraph.checkpoint.memory import MemorySaver
+        from langgraph.graph import END, StateGraph
+
+        from app.agent.graph import run_agent, start_node
+        from app.agent.nodes.audit import audit_node
+        from app.agent.state import AgentState
+
+        builder = StateGraph(AgentState)
+        builder.add_node("start", start_node)
+        builder.add_node("audit", audit_node)
+        builder.set_entry_point("start")
+        builder.add_edge("start", "audit")
+        builder.add_edge("audit", END)
+        graph = builder.compile(checkpointer=MemorySaver())
+
+        services = ServiceContainer.create(audit_writer=_mock_audit_writer())
+        await run_agent(
+            graph=graph,
+            message=sample_agent_state["message"],
+            user_id="u1",
+            conversation_id="conv-injected",
+            services=services,
+        )
+
+        services.audit_writer.log.assert_awaited_once()
+        entry = services.audit_writer.log.call_args[0][0]
+        assert entry["conversation_id"] == "conv-injected"
@@ -1,7 +1,9 @@
+from datetime import datetime
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.services.cosmos_db import DocumentStore
+from app.services.cosmos_db import DocumentStore, title_terms
 
 
 @pytest.mark.asyncio
@@ -22,3 +24,274 @@ async def test_document_store_save():
         assert saved_doc["content"] == "Content"
         assert "created_at" in saved_doc
         assert result == saved_doc
+
+
+@pytest.mark.asyncio
+async def test_document_store_get_uses_projection():
+    with patch("app.services.cosmos_db._get_db") as mock_get_db:
+        mock_collection = AsyncMock()
+        mock_collection.find_one.return_value = {"pdf_blob_name": "twi/c/x.pdf"}
+        mock_get_db.return_value = {"generated_documents": mock_collection}
+
+        store = DocumentStore()
+        result = await store.get("abc", projection={"_id": 0, "pdf_blob_name": 1})
+
+        mock_collection.find_one.assert_called_once_with(
+            {"document_id": "abc"}, {"_id": 0, "pdf_blob_name": 1}
+        )
+        assert result == {"pdf_blob_name": "twi/c/x.pdf"}
+
+
+def _search_store(docs: list[dict]):
+    """DocumentStore whose find() cursor yields ``docs``."""
+    with patch("app.services.cosmos_db._get_db") as mock_get_db:
+        mock_collection = MagicMock()
+        mock_get_db.return_value = {"generated_documents": mock_collection}
+        store = DocumentStore()
+    cursor = mock_collection.find.return_value
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(side_effect=lambda n: docs[:n])
+    return store, mock_collection
+
+
+def _doc(i: int) -> dict:
+    return {"document_id": f"{i:032x}", "created_at": datetime(2026, 3, 1, 12, i)}
+
+
+class TestDocumentSearch:
+    """Tenant-scoped keyset pagination over generated_documents."""
+
+    def test_title_terms_fold_case_and_accents(self):
+        assert title_terms("CÍM: CNC-01 gép beállítása") == [
+            "beallitasa",
+            "cim",
+            "cnc-01",
+            "gep",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_save_stores_search_keys(self):
+        with patch("app.services.cosmos_db._get_db") as mock_get_db:
+            mock_collection = AsyncMock()
+            mock_get_db.return_value = {"generated_documents": mock_collection}
+            store = DocumentStore()
+
+        await store.save(
+            {"title": "Napi beállítás", "machine_id": " CNC-01 ", "department": None}
+        )
+
+        saved = mock_collection.insert_one.call_args[0][0]
+        assert saved["machine_id"] == "cnc-01"
+        assert saved["department"] is None
+        assert saved["title_terms"] == ["beallitas", "napi"]
+
+    @pytest.mark.asyncio
+    async def test_filters_are_tenant_scoped_and_exclude_draft(self):
+        store, collection = _search_store([])
+
+        await store.search(
+            "tenant-a",
+            machine_id="CNC-01",
+            title="Beállítás",
+            created_from=datetime(2026, 1, 1),
+        )
+
+        query, projection = collection.find.call_args[0]
+        clauses = query["$and"]
+        assert clauses[0] == {"tenant_id": "tenant-a"}
+        assert {"machine_id": "cnc-01"} in clauses
+        assert {"title_terms": {"$regex": "^beallitas"}} in clauses
+        assert {"created_at": {"$gte": datetime(2026, 1, 1)}} in clauses
+        assert projection["draft_content"] == 0
+
+    @pytest.mark.asyncio
+    async def test_next_cursor_only_when_more_rows_exist(self):
+        docs = [_doc(i) for i in (5, 4, 3)]
+        store, collection = _search_store(docs)
+
+        items, next_cursor = await store.search("t", limit=2)
+        assert [d["document_id"] for d in items] == [
+            docs[0]["document_id"],
+            docs[1]["document_id"],
+        ]
+        assert next_cursor is not None
+        collection.find.return_value.limit.assert_called_with(3)
+
+        items, last = await store.search("t", limit=3)
+        assert len(items) == 3
+        assert last is None
+
+    @pytest.mark.asyncio
+    async def test_cursor_resumes_after_last_item(self):
+        docs = [_doc(i) for i in (5, 4, 3)]
+        store, collection = _search_store(docs)
+        _, next_cursor = await store.search("t", limit=2)
+
+        await store.search("t", limit=2, cursor=next_cursor)
+
+        keyset = collection.find.call_args[0][0]["$and"][-1]
+        assert keyset == {
+            "$or": [
+                {"created_at": {"$lt": docs[1]["created_at"]}},
+                {
+                    "created_at": docs[1]["created_at"],
+                    "document_id": {"$lt": docs[1]["document_id"]},
+                },
+            ]
+        }
+
+    @pytest.mark.asyncio
+    async def test_malformed_cursor_raises_value_error(self):
+        store, _ = _search_store([])
+        with pytest.raises(ValueError):
+            await store.search("t", cursor="not-a-cursor")
+
+
+# ---------------------------------------------------------------------------
+# ConversationStore
+# ---------------------------------------------------------------------------
+
+
+def _conversation_store(write_behind: bool):
+    from app.services.cosmos_db import ConversationStore
+
+    with patch("app.services.cosmos_db._get_db") as mock_get_db:
+        mock_collection = AsyncMock()
+        mock_get_db.return_value = {"conversations": mock_collection}
+        store = ConversationStore(write_behind=write_behind)
+    return store, mock_collection
+
+
+class TestConversationStore:
+    @pytest.mark.asyncio
+    async def test_get_or_create_is_single_atomic_upsert(self):
+        store, collection = _conversation_store(write_behind=False)
+        collection.find_one_and_update.return_value = {"conversation_id": "c1"}
+
+        result = await store.get_or_create("c1", "u1", "msteams", tenant_id="t1")
+
+        collection.find_one_and_update.assert_awaited_once()
+        collection.find_one.assert_not_called()
+        collection.insert_one.assert_not_called()
+        args, kwargs = collection.find_one_and_update.call_args
+        assert args[0] == {"conversation_id": "c1"}
+        update = args[1]
+        assert update["$setOnInsert"]["tenant_id"] == "t1"
+        assert update["$inc"] == {"message_count": 1}
+        assert "message_count" not in update["$setOnInsert"]
+        assert kwargs["upsert"] is True
+        assert result == {"conversation_id": "c1"}
+
+    @pytest.mark.asyncio
+    async def test_record_activity_without_write_behind_writes_through(self):
+        store, collection = _conversation_store(write_behind=False)
+
+        await store.record_activity("c1", "u1", "telegram")
+
+        collection.find_one_and_update.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_write_behind_coalesces_into_one_bulk_write(self):
+        store, collection = _conversation_store(write_behind=True)
+
+        for _ in range(3):
+            await store.record_activity("c1", "u1", "msteams")
+        await store.record_activity("c2", "u2", "telegram")
+
+        collection.find_one_and_update.assert_not_called()
+        await store.aclose()
+
+        collection.bulk_write.assert_awaited_once()
+        operations = collection.bulk_write.call_args[0][0]
+        counts = {op._filter["conversation_id"]: op._doc["$inc"] for op in operations}
+        assert counts == {"c1": {"message_count": 3}, "c2": {"message_count": 1}}
+        assert all(op._upsert for op in operations)
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_increments_for_retry(self):
+        store, collection = _conversation_store(write_behind=True)
+        collection.bulk_write.side_effect = Exception("throttled")
+
+        await store.record_activity("c1", "u1", "msteams")
+        await store.record_activity("c1", "u1", "msteams")
+        assert await store.flush() == 0
+
+        await store.record_activity("c1", "u1", "msteams")
+        collection.bulk_write.side_effect = None
+        assert await store.flush() == 1
+
+        operations = collection.bulk_write.call_args[0][0]
+        assert operations[0]._doc["$inc"] == {"message_count": 3}
+        await store.aclose()
+
+    @pytest.mark.asyncio
+    async def test_partial_bulk_write_failure_requeues_only_failed_ops(self):
+        from pymongo.errors import BulkWriteError
+
+        store, collection = _conversation_store(write_behind=True)
+        collection.bulk_write.side_effect = BulkWriteError(
+            {"writeErrors": [{"index": 1, "code": 16500}]}
+        )
+
+        await store.record_activity("c1", "u1", "msteams")
+        await store.record_activity("c2", "u2", "msteams")
+        assert await store.flush() == 1
+
+        collection.bulk_write.side_effect = None
+        assert await store.flush() == 1
+        operations = collection.bulk_write.call_args[0][0]
+        assert [op._filter["conversation_id"] for op in operations] == ["c2"]
+        await store.aclose()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_during_slow_flush_loses_nothing(self):
+        """aclose() lets an in-flight bulk_write finish instead of cancelling it."""
+        import asyncio
+
+        store, collection = _conversation_store(write_behind=True)
+        written: list[int] = []
+
+        async def slow_bulk_write(operations, ordered):
+            await asyncio.sleep(0.05)
+            written.extend(op._doc["$inc"]["message_count"] for op in operations)
+
+        collection.bulk_write.side_effect = slow_bulk_write
+        with patch("app.services.cosmos_db.settings") as mock_settings:
+            mock_settings.conversation_flush_interval_seconds = 0.01
+            await store.record_activity("c1", "u1", "msteams")
+            await asyncio.sleep(0.02)  # flusher is now inside bulk_write
+            await store.aclose()
+
+        assert written == [1]
+        assert store._pending == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_flush_requeues_batch(self):
+        import asyncio
+
+        store, collection = _conversation_store(write_behind=True)
+        collection.bulk_write.side_effect = asyncio.CancelledError()
+
+        await store.record_activity("c1", "u1", "msteams")
+        with pytest.raises(asyncio.CancelledError):
+            await store.flush()
+
+        assert store._pending["c1"].message_count == 1
+        collection.bulk_write.side_effect = None
+        await store.aclose()
+
+    @pytest.mark.asyncio
+    async def test_get_or_create_retries_after_duplicate_key(self):
+        from pymongo.errors import DuplicateKeyError
+
+        store, collection = _conversation_store(write_behind=False)
+        collection.find_one_and_update.side_effect = [
+            DuplicateKeyError("E11000"),
+            {"conversation_id": "c1", "message_count": 2},
+        ]
+
+        result = await store.get_or_create("c1", "u1", "msteams")
+
+        assert result["message_count"] == 2
+        assert collection.find_one_and_update.await_count == 2
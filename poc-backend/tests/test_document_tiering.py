@@ -0,0 +1,156 @@
+"""Tests for hot/cold tiering of generated document bodies."""
+
+import gzip
+import hashlib
+from datetime import timedelta
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.cosmos_db import DocumentStore
+from app.services.document_tiering import archive_document, tier_cold_documents
+
+DRAFT = "# CÍM: CNC-01 beállítás\n\n1. lépés — " + "x" * 2000
+
+
+def _store(collection: MagicMock) -> DocumentStore:
+    with patch("app.services.cosmos_db._get_db") as mock_get_db:
+        mock_get_db.return_value = {"generated_documents": collection}
+        return DocumentStore()
+
+
+def _pointer(draft: str = DRAFT) -> dict:
+    return {
+        "name": "drafts/t1/d1.md.gz",
+        "encoding": "gzip",
+        "sha256": hashlib.sha256(draft.encode()).hexdigest(),
+    }
+
+
+class TestArchive:
+    @pytest.mark.asyncio
+    async def test_body_moves_to_compressed_blob_with_pointer(self):
+        collection = MagicMock()
+        collection.update_one = AsyncMock()
+        documents = _store(collection)
+
+        with patch(
+            "app.services.document_tiering.blob_storage.upload_archive",
+            new_callable=AsyncMock,
+        ) as upload:
+            pointer = await archive_document(
+                documents,
+                {"document_id": "d1", "tenant_id": "t1", "draft_content": DRAFT},
+            )
+
+        name, data = upload.call_args[0]
+        assert name == "drafts/t1/d1.md.gz"
+        assert gzip.decompress(data).decode() == DRAFT
+        assert pointer["compressed_size"] < pointer["size"]
+        query, update = collection.update_one.call_args[0]
+        assert query == {"document_id": "d1", "draft_content": {"$exists": True}}
+        assert update["$unset"] == {"draft_content": ""}
+        assert update["$set"]["draft_blob"]["sha256"] == pointer["sha256"]
+
+    @pytest.mark.asyncio
+    async def test_job_pages_through_old_documents_until_none_are_left(self):
+        collection = MagicMock()
+        cursor = MagicMock()
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        batches = [
+            [
+                {"document_id": f"d{i}", "tenant_id": "t1", "draft_content": "a"}
+                for i in range(2)
+            ],
+            [{"document_id": "d2", "tenant_id": "t1", "draft_content": "b"}],
+        ]
+        cursor.to_list = AsyncMock(side_effect=batches)
+        collection.find.return_value = cursor
+        collection.update_one = AsyncMock()
+
+        with patch(
+            "app.services.document_tiering.blob_storage.upload_archive",
+            new_callable=AsyncMock,
+        ):
+            moved = await tier_cold_documents(
+                _store(collection), older_than=timedelta(days=90), batch_size=2
+            )
+
+        assert moved == 3
+        query = collection.find.call_args[0][0]
+        assert query["draft_content"] == {"$exists": True}
+        assert "$lt" in query["created_at"]
+
+
+class TestRehydration:
+    @pytest.mark.asyncio
+    async def test_cold_document_is_rehydrated_on_read(self):
+        collection = AsyncMock()
+        collection.find_one.return_value = {
+            "document_id": "d1",
+            "draft_blob": _pointer(),
+        }
+        documents = _store(collection)
+
+        with patch(
+            "app.services.cosmos_db.blob_storage.download_archive",
+            new=AsyncMock(return_value=gzip.compress(DRAFT.encode())),
+        ) as download:
+            doc = await documents.get(
+                "d1", projection={"_id": 0, "document_id": 1, "draft_content": 1}
+            )
+
+        download.assert_awaited_once_with("drafts/t1/d1.md.gz")
+        assert doc == {"document_id": "d1", "draft_content": DRAFT}
+        projection = collection.find_one.call_args[0][1]
+        assert projection["draft_blob"] == 1
+
+    @pytest.mark.asyncio
+    async def test_excluded_pointer_is_still_fetched_for_rehydration(self):
+        collection = AsyncMock()
+        collection.find_one.return_value = {
+            "document_id": "d1",
+            "draft_blob": _pointer(),
+        }
+        documents = _store(collection)
+
+        with patch(
+            "app.services.cosmos_db.blob_storage.download_archive",
+            new=AsyncMock(return_value=gzip.compress(DRAFT.encode())),
+        ):
+            doc = await documents.get("d1", projection={"_id": 0, "draft_blob": 0})
+
+        assert collection.find_one.call_args[0][1] == {"_id": 0}
+        assert doc == {"document_id": "d1", "draft_content": DRAFT}
+
+    @pytest.mark.asyncio
+    async def test_hot_document_and_metadata_reads_never_touch_blob(self):
+        collection = AsyncMock()
+        collection.find_one.return_value = {"document_id": "d1", "draft_content": "hot"}
+        documents = _store(collection)
+
+        with patch(
+            "app.services.cosmos_db.blob_storage.download_archive",
+            new_callable=AsyncMock,
+        ) as download:
+            assert (await documents.get("d1"))["draft_content"] == "hot"
+            await documents.get("d1", projection={"_id": 0, "pdf_blob_name": 1})
+
+        download.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_checksum_mismatch_is_an_error(self):
+        collection = AsyncMock()
+        collection.find_one.return_value = {
+            "document_id": "d1",
+            "draft_blob": _pointer("something else"),
+        }
+        documents = _store(collection)
+
+        with patch(
+            "app.services.cosmos_db.blob_storage.download_archive",
+            new=AsyncMock(return_value=gzip.compress(DRAFT.encode())),
+        ):
+            with pytest.raises(RuntimeError):
+                await documents.get("d1")
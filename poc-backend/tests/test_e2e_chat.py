@@ -2,15 +2,19 @@
 
 Exercises the complete path with mocked external services:
   message -> classify_intent -> process_input -> generate -> review (interrupt)
-  -> resume with approval -> approve (interrupt) -> resume -> output -> audit -> END
+  -> Command(resume=approval) -> approve -> output -> audit -> END
 
 Also tests the revision loop and rejection path.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from app.agent.graph import create_agent_graph
+from langgraph.types import Command
+
+from app.agent.graph import _build_resume_state, create_agent_graph
 from app.agent.state import AgentState
 
 
@@ -81,18 +85,28 @@ def mock_llm():
 
     with patch("app.agent.nodes.intent.call_llm", side_effect=_fake_llm):
         with patch("app.agent.nodes.generate.call_llm", side_effect=_fake_llm):
-            with patch(
-                "app.agent.nodes.process_input.call_llm", side_effect=_fake_llm
-            ):
-                with patch(
-                    "app.agent.nodes.clarify.call_llm", side_effect=_fake_llm
-                ):
+            with patch("app.agent.nodes.process_input.call_llm", side_effect=_fake_llm):
+                with patch("app.agent.nodes.clarify.call_llm", side_effect=_fake_llm):
                     yield
 
 
 @pytest.fixture
-def mock_output_services():
-    """Mock PDF generation, blob upload, and Cosmos stores."""
+def services():
+    """Process-wide service container with mocked document store and audit writer."""
+    from app.services.container import ServiceContainer
+
+    documents = MagicMock()
+    documents.save = AsyncMock(return_value={})
+    audit_writer = MagicMock()
+    audit_writer.log = AsyncMock()
+    container = ServiceContainer.create(documents=documents, audit_writer=audit_writer)
+    with patch("app.services.container._services", container):
+        yield container
+
+
+@pytest.fixture
+def mock_output_services(services):
+    """Mock PDF generation, blob upload, and the document store."""
     with patch(
         "app.agent.nodes.output.generate_twi_pdf",
         new=AsyncMock(return_value=b"%PDF-1.4 fake"),
@@ -101,21 +115,13 @@ def mock_output_services():
             "app.agent.nodes.output.upload_pdf",
             new=AsyncMock(return_value="https://blob.example.com/twi/test.pdf"),
         ) as mock_blob:
-            with patch("app.agent.nodes.output.DocumentStore") as MockDocStore:
-                mock_store_instance = MagicMock()
-                mock_store_instance.save = AsyncMock(return_value={})
-                MockDocStore.return_value = mock_store_instance
-                yield mock_pdf, mock_blob, mock_store_instance
+            yield mock_pdf, mock_blob, services.documents
 
 
 @pytest.fixture
-def mock_audit():
-    """Mock the AuditStore used by audit_node."""
-    with patch("app.agent.nodes.audit.AuditStore") as MockAudit:
-        mock_instance = MagicMock()
-        mock_instance.log = AsyncMock()
-        MockAudit.return_value = mock_instance
-        yield mock_instance
+def mock_audit(services):
+    """Mock the audit writer used by audit_node."""
+    return services.audit_writer
 
 
 @pytest.fixture
@@ -123,9 +129,8 @@ async def graph():
     """Compile a fresh graph with MemorySaver (no Cosmos dependency)."""
     import app.agent.graph as graph_mod
 
-    old_cp, old_g = graph_mod._checkpointer, graph_mod._graph
+    old_cp = graph_mod._checkpointer
     graph_mod._checkpointer = None
-    graph_mod._graph = None
     try:
         with patch("app.config.settings") as mock_settings:
             mock_settings.cosmos_connection = ""
@@ -135,7 +140,6 @@ async def graph():
             return g
     finally:
         graph_mod._checkpointer = old_cp
-        graph_mod._graph = old_g
 
 
 class TestFullGenerateApproveFlow:
@@ -161,12 +165,8 @@ class TestFullGenerateApproveFlow:
         result = _to_dict(await graph.ainvoke(_initial_state(), config))
         assert result["status"] == "review_needed"
 
-        await graph.aupdate_state(
-            config,
-            {"status": "approved", "approval_timestamp": "2026-03-13T10:00:00Z"},
-            as_node="review",
-        )
-        result = _to_dict(await graph.ainvoke(None, config))
+        approval = _build_resume_state("output", {"timestamp": "2026-03-13T10:00:00Z"})
+        result = _to_dict(await graph.ainvoke(Command(resume=approval), config))
 
         assert result["status"] == "completed"
         assert result["pdf_url"] is not None
@@ -177,6 +177,142 @@ class TestFullGenerateApproveFlow:
         mock_blob.assert_called_once()
         mock_audit.log.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_final_approval_after_revision_cap(
+        self, graph, mock_llm, mock_output_services, mock_audit
+    ):
+        """The third revision pauses at approve; one resume produces the PDF."""
+        config = {"configurable": {"thread_id": "cap-001"}}
+        await graph.ainvoke(_initial_state(), config)
+        for _ in range(3):
+            revision = _build_resume_state("revision", {"feedback": "more"})
+            await graph.ainvoke(Command(resume=revision), config)
+        assert (await graph.aget_state(config)).next == ("approve",)
+
+        approval = _build_resume_state("output", {"timestamp": "2026-03-13T10:00:00Z"})
+        result = _to_dict(await graph.ainvoke(Command(resume=approval), config))
+
+        assert result["status"] == "completed"
+        assert result["revision_count"] == 3
+
+
+class TestCheckpointDurability:
+    """What is persisted per durability mode, and what survives a crash."""
+
+    MESSAGE = "Készíts TWI utasítást a CNC-01 gép beállításáról"
+
+    def _count_puts(self, graph) -> list[int]:
+        puts = [0]
+        aput = graph.checkpointer.aput
+
+        async def counting_aput(*args, **kwargs):
+            puts[0] += 1
+            return await aput(*args, **kwargs)
+
+        graph.checkpointer.aput = counting_aput
+        return puts
+
+    async def _crash_in_generate(self, graph, conversation_id: str, durability: str):
+        """Run a new request, and return the durable state while it hangs in generate."""
+        from app.agent.graph import run_agent
+
+        reached, never = asyncio.Event(), asyncio.Event()
+
+        async def hanging_llm(*args, **kwargs):
+            reached.set()
+            await never.wait()
+
+        with patch("app.agent.nodes.generate.call_llm", side_effect=hanging_llm):
+            run = asyncio.create_task(
+                run_agent(
+                    graph,
+                    message=self.MESSAGE,
+                    user_id="user-001",
+                    conversation_id=conversation_id,
+                    durability=durability,
+                )
+            )
+            await reached.wait()
+            snapshot = await graph.aget_state(
+                {"configurable": {"thread_id": conversation_id}}
+            )
+            run.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await run
+        return snapshot
+
+    @pytest.mark.asyncio
+    async def test_exit_mode_writes_one_checkpoint_per_new_request(
+        self, graph, mock_llm
+    ):
+        from app.agent.graph import run_agent
+
+        puts = self._count_puts(graph)
+        writes: dict[str, int] = {}
+        for durability in ("exit", "sync"):
+            before = puts[0]
+            result = await run_agent(
+                graph,
+                message=self.MESSAGE,
+                user_id="user-001",
+                conversation_id=f"dur-{durability}",
+                durability=durability,
+            )
+            assert result["status"] == "review_needed"
+            writes[durability] = puts[0] - before
+
+        assert writes["exit"] == 1
+        assert writes["exit"] * 2 < writes["sync"]
+
+    @pytest.mark.asyncio
+    async def test_exit_mode_crash_keeps_the_previous_checkpoint(self, graph, mock_llm):
+        snapshot = await self._crash_in_generate(graph, "dur-003", "exit")
+
+        # Nothing of the interrupted run is durable: the request is redone.
+        assert snapshot.values == {}
+        assert snapshot.next == ()
+
+    @pytest.mark.asyncio
+    async def test_sync_mode_crash_resumes_at_the_failed_node(self, graph, mock_llm):
+        snapshot = await self._crash_in_generate(graph, "dur-004", "sync")
+
+        assert snapshot.next == ("generate",)
+        assert snapshot.values["processed_input"] is not None
+
+        with patch("app.agent.nodes.intent.call_llm") as classify:
+            result = _to_dict(
+                await graph.ainvoke(None, snapshot.config, durability="sync")
+            )
+
+        classify.assert_not_called()
+        assert result["status"] == "review_needed"
+        assert result["draft"]
+
+
+class TestStreamingProgress:
+    @pytest.mark.asyncio
+    async def test_on_progress_reports_each_node_and_returns_final_state(
+        self, graph, mock_llm
+    ):
+        from app.agent.graph import run_agent
+
+        nodes: list[str] = []
+
+        async def on_progress(node: str, update: dict | None) -> None:
+            nodes.append(node)
+
+        result = await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-01 gép beállításáról",
+            user_id="user-001",
+            conversation_id="stream-001",
+            on_progress=on_progress,
+        )
+
+        assert nodes == ["start", "classify_intent", "process_input", "generate"]
+        assert result["status"] == "review_needed"
+        assert result["draft"]
+
 
 class TestRevisionFlow:
     """User requests a revision after reviewing the draft."""
@@ -187,20 +323,115 @@ class TestRevisionFlow:
 
         await graph.ainvoke(_initial_state(), config)
 
-        await graph.aupdate_state(
-            config,
-            {
-                "status": "revision_requested",
-                "revision_feedback": "Add temperature check step",
-            },
-            as_node="review",
+        revision = _build_resume_state(
+            "revision", {"feedback": "Add temperature check step"}
         )
-        result = _to_dict(await graph.ainvoke(None, config))
+        result = _to_dict(await graph.ainvoke(Command(resume=revision), config))
 
         assert result["revision_count"] == 1
         assert result["status"] == "review_needed"
         assert result["draft"] is not None
 
+    @pytest.mark.asyncio
+    async def test_message_after_revision_request_is_feedback(self, graph, mock_llm):
+        """Telegram "módosítás" then feedback: the flag is read from the checkpoint."""
+        from app.agent.graph import await_revision_feedback, run_agent
+
+        await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-01 gép beállításáról",
+            user_id="user-001",
+            conversation_id="revision-002",
+            channel="telegram",
+        )
+        await await_revision_feedback(graph, "revision-002")
+
+        result = await run_agent(
+            graph,
+            message="Add temperature check step",
+            user_id="user-001",
+            conversation_id="revision-002",
+            channel="telegram",
+        )
+
+        assert result["revision_count"] == 1
+        assert result["revision_feedback"] == "Add temperature check step"
+        assert result["awaiting_revision_feedback"] is False
+        assert result["status"] == "review_needed"
+
+    @pytest.mark.asyncio
+    async def test_card_action_still_applies_while_awaiting_feedback(
+        self, graph, mock_llm, mock_audit
+    ):
+        from app.agent.graph import await_revision_feedback, run_agent
+
+        await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-01 gép beállításáról",
+            user_id="user-001",
+            conversation_id="revision-005",
+        )
+        await await_revision_feedback(graph, "revision-005")
+        config = {"configurable": {"thread_id": "revision-005"}}
+        assert (await graph.aget_state(config)).next == ("review",)
+
+        result = await run_agent(
+            graph,
+            message="",
+            user_id="user-001",
+            conversation_id="revision-005",
+            resume_from="rejection",
+        )
+
+        assert result["status"] == "rejected"
+        assert result["awaiting_revision_feedback"] is False
+
+    @pytest.mark.asyncio
+    async def test_new_message_without_flag_starts_new_request(self, graph, mock_llm):
+        from app.agent.graph import run_agent
+
+        await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-01 gép beállításáról",
+            user_id="user-001",
+            conversation_id="revision-003",
+        )
+        result = await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-02 gép karbantartásáról",
+            user_id="user-001",
+            conversation_id="revision-003",
+        )
+
+        assert result["revision_count"] == 0
+        assert result["revision_feedback"] is None
+        assert result["status"] == "review_needed"
+
+    @pytest.mark.asyncio
+    async def test_card_reference_loads_checkpointed_draft(self, graph, mock_llm):
+        from app.agent.graph import (
+            draft_hash,
+            draft_reference,
+            load_draft_state,
+            run_agent,
+        )
+
+        result = await run_agent(
+            graph,
+            message="Készíts TWI utasítást a CNC-01 gép beállításáról",
+            user_id="user-001",
+            conversation_id="revision-004",
+        )
+        ref = await draft_reference(graph, "revision-004")
+
+        assert ref["checkpoint_id"]
+        state = await load_draft_state(graph, "revision-004", ref)
+        assert state["draft"] == result["draft"]
+
+        # A card showing any other draft (e.g. before a revision) is stale.
+        stale = {**ref, "draft_hash": draft_hash("older draft")}
+        assert await load_draft_state(graph, "revision-004", stale) is None
+
 
 class TestRejectionFlow:
     """User rejects the draft entirely."""
@@ -211,12 +442,8 @@ class TestRejectionFlow:
 
         await graph.ainvoke(_initial_state(), config)
 
-        await graph.aupdate_state(
-            config,
-            {"status": "rejected"},
-            as_node="review",
-        )
-        result = _to_dict(await graph.ainvoke(None, config))
+        rejection = _build_resume_state("rejection", {})
+        result = _to_dict(await graph.ainvoke(Command(resume=rejection), config))
 
         assert result["status"] == "rejected"
         mock_audit.log.assert_called_once()
@@ -1,7 +1,7 @@
 """Tests for TWI generation node: EU AI Act label, revision context, and output structure."""
 
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 _LLM_RESPONSE = (
     "## CÍM: CNC-01 gép beállítása\n\n"
@@ -101,6 +101,70 @@ class TestGenerateNode:
         assert "old draft content" in prompt_text
         assert "Add temperature check" in prompt_text
 
+    @pytest.mark.asyncio
+    async def test_reference_document_seeds_first_generation(self, base_state):
+        """A retrieved approved TWI is passed to the LLM as the base to revise."""
+        captured: list[str] = []
+
+        async def mock_llm(
+            prompt, system_prompt=None, temperature=None, max_tokens=None
+        ):
+            captured.append(prompt)
+            return _LLM_RESPONSE, 30, 20
+
+        state = {
+            **base_state,
+            "processed_input": {
+                "reference_document": {
+                    "document_id": "doc-1",
+                    "title": "CNC-01 beállítás",
+                    "content": "⚠️ AI által generált tartalom — emberi felülvizsgálat "
+                    "szükséges.\n\nRégi lépések",
+                }
+            },
+        }
+
+        with patch("app.agent.nodes.generate.call_llm", new=mock_llm):
+            from app.agent.nodes.generate import generate_node
+
+            result = await generate_node(state)
+
+        assert "Régi lépések" in captured[0]
+        assert "AI által generált" not in captured[0]
+        assert result["draft_metadata"]["based_on_document_id"] == "doc-1"
+
+    @pytest.mark.asyncio
+    async def test_other_process_reference_is_only_a_style_example(self, base_state):
+        """A new instruction is not written as a revision of another process's."""
+        captured: list[str] = []
+
+        async def mock_llm(
+            prompt, system_prompt=None, temperature=None, max_tokens=None
+        ):
+            captured.append(prompt)
+            return _LLM_RESPONSE, 30, 20
+
+        state = {
+            **base_state,
+            "intent": "generate_twi",
+            "processed_input": {
+                "reference_document": {
+                    "document_id": "doc-1",
+                    "title": "CNC-01 szerszámcsere",
+                    "content": "Szerszámcsere lépései",
+                    "same_process": False,
+                }
+            },
+        }
+
+        with patch("app.agent.nodes.generate.call_llm", new=mock_llm):
+            from app.agent.nodes.generate import generate_node
+
+            await generate_node(state)
+
+        assert "MINTA, EGY MÁSIK FOLYAMAT" in captured[0]
+        assert "ugyanerre a gépre" not in captured[0]
+
     @pytest.mark.asyncio
     async def test_revision_count_preserved_in_metadata(self, base_state):
         state = {**base_state, "revision_count": 2}
@@ -223,6 +287,37 @@ class TestProcessInputNode:
         result = await process_input_node({**base_state})
         assert result["processed_input"]["channel"] == "msteams"
 
+    @pytest.mark.asyncio
+    async def test_reference_document_attached_from_retriever(self, base_state):
+        from app.agent.nodes.process_input import process_input_node
+        from app.services.twi_retrieval import ReferenceTwi
+
+        services = MagicMock()
+        services.retriever.find_reference = AsyncMock(
+            return_value=ReferenceTwi("doc-1", "CNC-01", "Régi lépések", 2.5)
+        )
+        config = {"configurable": {"services": services}}
+
+        with patch(
+            "app.agent.nodes.process_input.call_llm",
+            new=AsyncMock(side_effect=Exception("llm down")),
+        ):
+            result = await process_input_node(
+                {**base_state, "message": "Frissítsd a CNC-01 utasítást"}, config
+            )
+
+        assert result["processed_input"]["reference_document"] == {
+            "document_id": "doc-1",
+            "title": "CNC-01",
+            "content": "Régi lépések",
+            "same_process": True,
+        }
+        kwargs = services.retriever.find_reference.call_args.kwargs
+        assert kwargs["message"] == "Frissítsd a CNC-01 utasítást"
+
+
+_REF = {"conversation_id": "conv-1", "checkpoint_id": "cp-1", "draft_hash": "abc123"}
+
 
 class TestAdaptiveCards:
     def test_review_card_contains_eu_ai_act_label(self):
@@ -231,20 +326,21 @@ class TestAdaptiveCards:
         card = create_review_card(
             draft="⚠️ AI által generált tartalom — emberi felülvizsgálat szükséges.",
             metadata={"model": "gpt-4o", "generated_at": "2026-02-26"},
+            ref=_REF,
         )
         assert "AI által generált tartalom" in str(card)
 
     def test_review_card_has_three_actions(self):
         from app.bot.adaptive_cards import create_review_card
 
-        card = create_review_card(draft="test", metadata={})
+        card = create_review_card(draft="test", metadata={}, ref=_REF)
         assert len(card["actions"]) == 3
 
     def test_review_card_draft_truncated_to_2000(self):
         from app.bot.adaptive_cards import create_review_card
 
         long_draft = "x" * 5000
-        card = create_review_card(draft=long_draft, metadata={})
+        card = create_review_card(draft=long_draft, metadata={}, ref=_REF)
         draft_block = next(
             b
             for b in card["body"]
@@ -255,9 +351,25 @@ class TestAdaptiveCards:
     def test_approval_card_has_two_actions(self):
         from app.bot.adaptive_cards import create_approval_card
 
-        card = create_approval_card(draft="test", metadata={})
+        card = create_approval_card(draft="test", ref=_REF)
         assert len(card["actions"]) == 2
 
+    def test_card_actions_carry_a_reference_not_the_draft(self):
+        import json
+
+        from app.bot.adaptive_cards import create_approval_card, create_review_card
+
+        long_draft = "lépés " * 3000
+        for card in (
+            create_review_card(draft=long_draft, metadata={"model": "m"}, ref=_REF),
+            create_approval_card(draft=long_draft, ref=_REF),
+        ):
+            for action in card["actions"]:
+                data = action["data"]
+                assert "draft" not in data and "metadata" not in data
+                assert {k: data[k] for k in _REF} == _REF
+                assert len(json.dumps(data)) < 200
+
     def test_result_card_has_download_action(self):
         from app.bot.adaptive_cards import create_result_card
 
@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.agent.graph import (
     should_generate,
+    after_approve,
     after_review,
     after_revision,
     reject_node,
@@ -85,6 +86,20 @@ class TestAfterReview:
         assert after_review({"status": "rejected"}) == "reject"
         assert after_review({"status": ""}) == "reject"
 
+    def test_awaiting_feedback_pauses_at_review_again(self):
+        assert after_review({"status": "review_needed"}) == "wait"
+
+
+class TestAfterApprove:
+    def test_approved_routes_to_output(self):
+        assert after_approve({"status": "approved"}) == "output"
+
+    def test_revision_from_approval_card_routes_to_revise(self):
+        assert after_approve({"status": "revision_requested"}) == "revise"
+
+    def test_rejected_routes_to_reject(self):
+        assert after_approve({"status": "rejected"}) == "reject"
+
 
 class TestAfterRevision:
     def test_below_max_routes_to_regenerate(self):
@@ -146,6 +161,33 @@ class TestRejectNode:
 # ---------------------------------------------------------------------------
 
 
+class TestStartNode:
+    @pytest.mark.asyncio
+    async def test_new_message_resets_previous_request(self):
+        from app.agent.graph import after_start, start_node
+
+        state = _make_state(draft="old", revision_count=2, status="completed")
+        result = await start_node(state)
+
+        assert result["draft"] is None
+        assert result["revision_count"] == 0
+        assert after_start(result) == "classify_intent"
+
+    @pytest.mark.asyncio
+    async def test_pending_revision_takes_message_as_feedback(self):
+        from app.agent.graph import after_start, start_node
+
+        state = _make_state(
+            draft="old", message="add step 4", awaiting_revision_feedback=True
+        )
+        result = await start_node(state)
+
+        assert result["draft"] == "old"
+        assert result["revision_feedback"] == "add step 4"
+        assert result["awaiting_revision_feedback"] is False
+        assert after_start(result) == "revise"
+
+
 class TestBuildResumeState:
     def test_revision_resume(self):
         result = _build_resume_state("revision", {"feedback": "Add temperature check"})
@@ -169,6 +211,10 @@ class TestBuildResumeState:
         result = _build_resume_state("rejection", {})
         assert result["status"] == "rejected"
 
+    def test_feedback_resume_keeps_status(self):
+        result = _build_resume_state("feedback", {})
+        assert result == {"awaiting_revision_feedback": True}
+
 
 # ---------------------------------------------------------------------------
 # Graph compilation
@@ -264,7 +310,8 @@ class TestIntentNode:
     )
     async def test_all_valid_intents_pass_through(self, intent):
         with patch(
-            "app.agent.nodes.intent.call_llm", new=AsyncMock(return_value=(intent, 5, 5))
+            "app.agent.nodes.intent.call_llm",
+            new=AsyncMock(return_value=(intent, 5, 5)),
         ):
             from app.agent.nodes.intent import intent_node
 
@@ -295,12 +342,12 @@ class TestReviseNode:
 
 
 # ---------------------------------------------------------------------------
-# run_agent — as_node passthrough
+# run_agent — single-call resume
 # ---------------------------------------------------------------------------
 
 
-class TestRunAgentAsNode:
-    """Verify that run_agent forwards the as_node parameter to aupdate_state."""
+class TestRunAgentResume:
+    """A human-in-the-loop decision resumes the graph with one Command."""
 
     def _mock_graph(self, return_state: dict | None = None):
         graph = MagicMock()
@@ -309,24 +356,9 @@ class TestRunAgentAsNode:
         return graph
 
     @pytest.mark.asyncio
-    async def test_as_node_forwarded_to_aupdate_state(self):
-        graph = self._mock_graph()
-        await run_agent(
-            graph,
-            message="",
-            user_id="u1",
-            conversation_id="c1",
-            resume_from="revision",
-            context={"feedback": "fix step 3"},
-            as_node="review",
-        )
-
-        graph.aupdate_state.assert_called_once()
-        _, kwargs = graph.aupdate_state.call_args
-        assert kwargs["as_node"] == "review"
+    async def test_resume_sends_decision_in_one_invocation(self):
+        from langgraph.types import Command
 
-    @pytest.mark.asyncio
-    async def test_as_node_defaults_to_none(self):
         graph = self._mock_graph()
         await run_agent(
             graph,
@@ -334,23 +366,28 @@ class TestRunAgentAsNode:
             user_id="u1",
             conversation_id="c1",
             resume_from="revision",
-            context={"feedback": "minor tweak"},
+            context={"feedback": "fix step 3"},
         )
 
-        graph.aupdate_state.assert_called_once()
-        _, kwargs = graph.aupdate_state.call_args
-        assert kwargs["as_node"] is None
+        graph.aupdate_state.assert_not_called()
+        graph.ainvoke.assert_awaited_once()
+        command = graph.ainvoke.call_args[0][0]
+        assert isinstance(command, Command)
+        assert command.resume == {
+            "status": "revision_requested",
+            "revision_feedback": "fix step 3",
+            "awaiting_revision_feedback": False,
+        }
 
     @pytest.mark.asyncio
-    async def test_as_node_ignored_for_new_conversation(self):
+    async def test_new_message_is_plain_input(self):
         graph = self._mock_graph()
         await run_agent(
             graph,
             message="Készíts TWI utasítást",
             user_id="u1",
             conversation_id="c1",
-            as_node="review",
         )
 
-        graph.aupdate_state.assert_not_called()
         graph.ainvoke.assert_called_once()
+        assert graph.ainvoke.call_args[0][0]["message"] == "Készíts TWI utasítást"
@@ -0,0 +1,127 @@
+"""Index-usage checks: ``explain()`` every store query against a real MongoDB.
+
+Each query shape issued by the stores in ``app/services/cosmos_db.py`` must be
+answered by an index from ``INDEX_REGISTRY``, never a collection scan.  Runs
+against a disposable database and is skipped unless ``COSMOS_CONNECTION`` is
+set (use a local ``mongod`` — Cosmos DB RU does not return query plans)::
+
+    COSMOS_CONNECTION="mongodb://localhost:27017/" pytest tests/test_index_usage.py -v
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("COSMOS_CONNECTION"),
+    reason="COSMOS_CONNECTION not set — skipping index usage tests",
+)
+
+_SINCE = datetime.now(timezone.utc) - timedelta(days=7)
+
+# (collection, filter, sort) for every query the stores issue
+STORE_QUERIES = [
+    # ConversationStore.get_or_create / flush upserts
+    ("conversations", {"conversation_id": "c1"}, None),
+    # DocumentStore.get (download endpoint)
+    ("generated_documents", {"document_id": "d1"}, None),
+    ("generated_documents", {"conversation_id": "c1"}, None),
+    # DocumentStore.search (keyset pages, optional filter / title terms)
+    (
+        "generated_documents",
+        {"tenant_id": "t1"},
+        [("created_at", -1), ("document_id", -1)],
+    ),
+    (
+        "generated_documents",
+        {"tenant_id": "t1", "machine_id": "cnc-01"},
+        [("created_at", -1), ("document_id", -1)],
+    ),
+    (
+        "generated_documents",
+        {"tenant_id": "t1", "title_terms": {"$regex": "^beall"}},
+        None,
+    ),
+    # document_tiering: oldest documents that still carry draft_content
+    (
+        "generated_documents",
+        {"created_at": {"$lt": _SINCE}, "draft_content": {"$exists": True}},
+        [("created_at", 1)],
+    ),
+    # audit_log reads (per conversation, per tenant over time)
+    ("audit_log", {"conversation_id": "c1"}, [("created_at", 1)]),
+    ("audit_log", {"tenant_id": "t1", "created_at": {"$gte": _SINCE}}, None),
+    ("audit_log", {"event_type": "twi_generated"}, None),
+    # latency_percentiles (/api/latency)
+    (
+        "audit_log",
+        {
+            "tenant_id": "t1",
+            "created_at": {"$gte": _SINCE},
+            "timings": {"$type": "object"},
+            "event_type": "twi_approved",
+        },
+        [("created_at", -1)],
+    ),
+    # AuditExport keyset pages
+    (
+        "audit_log",
+        {"tenant_id": "t1", "created_at": {"$gte": _SINCE}},
+        [("created_at", 1), ("_id", 1)],
+    ),
+    # ConversationLeases: take over an expired lease or renew our own
+    (
+        "conversation_leases",
+        {
+            "_id": "c1",
+            "$or": [{"expires_at": {"$lt": _SINCE}}, {"owner": "token"}],
+        },
+        None,
+    ),
+    # UsageRollupStore.query
+    (
+        "usage_rollups",
+        {"tenant_id": "t1", "day": {"$gte": "2026-03-01", "$lte": "2026-03-31"}},
+        [("day", 1), ("model", 1), ("event_type", 1)],
+    ),
+]
+
+
+def _stages(plan: dict) -> set[str]:
+    stages = {plan.get("stage", "")}
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages |= _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages |= _stages(child)
+    return stages
+
+
+@pytest_asyncio.fixture
+async def db():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.services.indexes import apply_indexes
+
+    client = AsyncIOMotorClient(os.environ["COSMOS_CONNECTION"])
+    database = client[f"test_indexes_{uuid.uuid4().hex[:8]}"]
+    await apply_indexes(database, system_ttl=False)
+    yield database
+    await client.drop_database(database.name)
+    client.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("collection,query,sort", STORE_QUERIES)
+async def test_store_query_uses_index(db, collection, query, sort):
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    explain = await db.command("explain", command, verbosity="queryPlanner")
+
+    stages = _stages(explain["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages, f"{collection} {query} scans the collection"
+    assert stages & {"IXSCAN", "EXPRESS_IXSCAN", "IDHACK"}
@@ -0,0 +1,107 @@
+"""Tests for the declarative index / TTL registry applied at startup."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import OperationFailure
+
+from app.services.indexes import (
+    CONVERSATION_TTL_SECONDS,
+    INDEX_REGISTRY,
+    IndexSpec,
+    apply_indexes,
+)
+
+
+def _db() -> MagicMock:
+    collections: dict[str, MagicMock] = {}
+
+    def _collection(name):
+        if name not in collections:
+            col = MagicMock()
+            col.create_index = AsyncMock(return_value=f"{name}_idx")
+            collections[name] = col
+        return collections[name]
+
+    db = MagicMock()
+    db.__getitem__.side_effect = _collection
+    db.command = AsyncMock()
+    db.collections = collections
+    return db
+
+
+class TestRegistry:
+    def test_every_store_collection_is_registered(self):
+        assert set(INDEX_REGISTRY) == {
+            "conversations",
+            "audit_log",
+            "generated_documents",
+            "usage_rollups",
+            "processed_activities",
+            "conversation_leases",
+        }
+
+    def test_lookup_keys_are_unique(self):
+        unique = {
+            name: [spec.keys[0][0] for spec in specs if spec.unique]
+            for name, specs in INDEX_REGISTRY.items()
+        }
+        assert unique["conversations"] == ["conversation_id"]
+        assert unique["generated_documents"] == ["document_id"]
+
+    def test_conversations_expire_after_90_days_of_inactivity(self):
+        ttl = [s for s in INDEX_REGISTRY["conversations"] if s.ttl_seconds]
+        assert ttl[0].keys == (("last_activity", 1),)
+        assert ttl[0].ttl_seconds == CONVERSATION_TTL_SECONDS == 90 * 24 * 3600
+
+
+class TestApplyIndexes:
+    @pytest.mark.asyncio
+    async def test_creates_every_registered_index(self):
+        db = _db()
+
+        created = await apply_indexes(db, system_ttl=False)
+
+        assert len(created) == sum(len(s) for s in INDEX_REGISTRY.values())
+        conv = db.collections["conversations"].create_index
+        conv.assert_any_await([("conversation_id", 1)], unique=True)
+        conv.assert_any_await(
+            [("last_activity", 1)], expireAfterSeconds=CONVERSATION_TTL_SECONDS
+        )
+
+    @pytest.mark.asyncio
+    async def test_cosmos_ru_ttl_moves_to_system_timestamp(self):
+        db = _db()
+
+        await apply_indexes(db, system_ttl=True)
+
+        db.collections["conversations"].create_index.assert_any_await(
+            [("_ts", 1)], expireAfterSeconds=CONVERSATION_TTL_SECONDS
+        )
+
+    @pytest.mark.asyncio
+    async def test_changed_ttl_updated_with_collmod(self):
+        db = _db()
+        registry = {"pending_state": (IndexSpec((("updated_at", 1),), ttl_seconds=60),)}
+        db["pending_state"].create_index.side_effect = OperationFailure(
+            "IndexOptionsConflict", code=85
+        )
+
+        await apply_indexes(db, registry=registry, system_ttl=False)
+
+        db.command.assert_awaited_once()
+        _, kwargs = db.command.call_args
+        assert kwargs["index"] == {
+            "keyPattern": {"updated_at": 1},
+            "expireAfterSeconds": 60,
+        }
+
+    @pytest.mark.asyncio
+    async def test_conflicting_index_does_not_abort_startup(self):
+        db = _db()
+        db["conversations"].create_index.side_effect = OperationFailure(
+            "duplicate key", code=11000
+        )
+
+        created = await apply_indexes(db, system_ttl=False)
+
+        assert "audit_log_idx" in created
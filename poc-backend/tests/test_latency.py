@@ -0,0 +1,217 @@
+"""Tests for the per-turn latency ledger and its percentile aggregation."""
+
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import latency
+
+
+def _llm_client() -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "draft"
+    response.usage.prompt_tokens = 10
+    response.usage.completion_tokens = 5
+    client = MagicMock()
+    client.complete = AsyncMock(return_value=response)
+    return client
+
+
+class TestTurnLedger:
+    def test_keys_accumulate_in_milliseconds(self):
+        ledger = latency.TurnLedger()
+        ledger.add("store", 0.010)
+        ledger.add("store", 0.0025)
+
+        timings = ledger.snapshot()
+
+        assert timings["store"] == 12.5
+        assert timings["total"] >= 0
+
+    def test_nested_turn_joins_the_open_ledger(self):
+        with latency.turn() as outer, latency.turn() as inner:
+            latency.record("queue_wait", 0.001)
+
+        assert inner is outer
+        assert latency.current_ledger.get() is None
+
+    def test_nothing_is_recorded_outside_a_turn(self):
+        latency.record("llm", 1.0)
+
+        assert latency.current_ledger.get() is None
+
+    @pytest.mark.asyncio
+    async def test_nested_store_operations_are_counted_once(self):
+        from app.services.tracing import store_operation
+
+        @store_operation("documents")
+        async def inner():
+            await asyncio.sleep(0.02)
+
+        @store_operation("documents")
+        async def outer():
+            await inner()
+            await inner()
+
+        with latency.turn() as ledger:
+            await outer()
+            await inner()
+
+        # 60 ms of store time; counting the nested calls again would give 100.
+        assert 60 <= ledger.snapshot()["store"] < 90
+
+    @pytest.mark.asyncio
+    async def test_node_copies_the_ledger_into_state(self):
+        from app.agent.graph import _instrumented
+        from app.services.ai_foundry import call_llm
+
+        async def node(state):
+            await call_llm("prompt")
+            return {**state, "status": "review_needed"}
+
+        with (
+            patch("app.services.ai_foundry._get_client", return_value=_llm_client()),
+            latency.turn(),
+        ):
+            result = await _instrumented("generate", node)({}, {})
+
+        timings = result["timings"]
+        assert {"llm", "node.generate", "total"} <= set(timings)
+        assert timings["node.generate"] >= timings["llm"]
+
+    @pytest.mark.asyncio
+    async def test_audit_entry_carries_the_timings(self, sample_agent_state):
+        from app.agent.nodes.audit import audit_node
+        from app.services.container import ServiceContainer
+
+        writer = MagicMock()
+        writer.log = AsyncMock()
+        services = ServiceContainer.create(audit_writer=writer)
+        state = {
+            **sample_agent_state,
+            "status": "completed",
+            "timings": {"node.output": 812.4, "render": 640.0, "total": 1502.3},
+        }
+
+        await audit_node(state, {"configurable": {"services": services}})
+
+        assert writer.log.call_args[0][0]["timings"] == state["timings"]
+
+
+class TestPercentiles:
+    def test_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+
+        assert latency.percentile(values, 50) == 50.0
+        assert latency.percentile(values, 95) == 95.0
+        assert latency.percentile(values, 99) == 99.0
+        assert latency.percentile([7.0], 99) == 7.0
+
+    @pytest.mark.asyncio
+    async def test_aggregates_ledger_keys_of_a_tenant(self):
+        entries = [
+            {"timings": {"total": float(ms), "llm": ms / 2}} for ms in range(1, 21)
+        ]
+
+        async def find(query, projection, **options):
+            for entry in entries:
+                yield entry
+
+        store = MagicMock()
+        store.collection.find = MagicMock(side_effect=find)
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 10, 8, tzinfo=timezone.utc)
+
+        items = await latency.latency_percentiles(
+            "t1", start, end, event_type="twi_approved", store=store
+        )
+
+        query = store.collection.find.call_args[0][0]
+        options = store.collection.find.call_args.kwargs
+        assert options["limit"] == latency.MAX_SAMPLES
+        assert options["max_time_ms"] > 0
+        assert query["tenant_id"] == "t1"
+        assert query["event_type"] == "twi_approved"
+        assert [item["key"] for item in items] == ["llm", "total"]
+        total = items[1]
+        assert (total["count"], total["p50"], total["p95"], total["p99"]) == (
+            20,
+            10.0,
+            19.0,
+            20.0,
+        )
+
+
+class TestLatencyEndpoint:
+    @pytest.mark.asyncio
+    async def test_returns_percentiles_for_the_callers_tenant(self):
+        from app.main import app
+
+        items = [{"key": "total", "count": 3, "p50": 1.0, "p95": 2.0, "p99": 2.0}]
+        with patch(
+            "app.main.latency_percentiles", new=AsyncMock(return_value=items)
+        ) as aggregate:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/latency", params={"event_type": "twi_approved"}
+                )
+
+        assert resp.status_code == 200
+        assert resp.json()["items"] == items
+        tenant_id, start, end, event_type = aggregate.call_args[0]
+        assert (end - start).days == 7
+        assert event_type == "twi_approved"
+        assert aggregate.call_args.kwargs["limit"] == latency.MAX_SAMPLES
+
+    @pytest.mark.asyncio
+    async def test_range_longer_than_a_month_is_rejected(self):
+        from app.main import app
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.get(
+                "/api/latency",
+                params={"from": "2026-01-01T00:00:00Z", "to": "2026-03-01T00:00:00Z"},
+            )
+
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_slow_query_is_a_gateway_timeout(self):
+        from pymongo.errors import ExecutionTimeout
+
+        from app.main import app
+
+        with patch(
+            "app.main.latency_percentiles",
+            new=AsyncMock(
+                side_effect=ExecutionTimeout("operation exceeded time limit")
+            ),
+        ):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get("/api/latency")
+
+        assert resp.status_code == 504
+
+    @pytest.mark.asyncio
+    async def test_descending_range_is_rejected(self):
+        from app.main import app
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.get(
+                "/api/latency",
+                params={"from": "2026-10-08T00:00:00Z", "to": "2026-10-01T00:00:00Z"},
+            )
+
+        assert resp.status_code == 400
@@ -4,6 +4,8 @@ Uses httpx.AsyncClient against the real FastAPI app with auth and
 external services mocked out, verifying the HTTP layer works end-to-end.
 """
 
+from contextlib import contextmanager
+
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
@@ -50,9 +52,9 @@ def skip_auth():
 
 @pytest.fixture
 def mock_adapter_process():
-    """Mock the adapter.process_activity to avoid real Bot Framework calls."""
+    """Mock the adapter's turn processing to avoid real Bot Framework calls."""
     with patch("app.main.adapter") as mock_adapter:
-        mock_adapter.process_activity = AsyncMock(return_value=None)
+        mock_adapter.process_activity_with_identity = AsyncMock(return_value=None)
         mock_adapter.on_turn_error = None
         yield mock_adapter
 
@@ -68,7 +70,7 @@ def auth_pass():
         mock_settings.log_level = "INFO"
         mock_settings.applicationinsights_connection_string = ""
         with patch(
-            "app.main.JwtTokenValidation.authenticate_request",
+            "app.bot.auth.JwtTokenValidation.authenticate_request",
             new=AsyncMock(return_value=_make_mock_claims(True)),
         ):
             yield
@@ -112,7 +114,7 @@ class TestMessagesEndpoint:
             ms.log_level = "INFO"
             ms.applicationinsights_connection_string = ""
             with patch(
-                "app.main.JwtTokenValidation.authenticate_request",
+                "app.bot.auth.JwtTokenValidation.authenticate_request",
                 new=AsyncMock(return_value=_make_mock_claims(False)),
             ):
                 async with httpx.AsyncClient(
@@ -131,7 +133,7 @@ class TestMessagesEndpoint:
         ) as client:
             resp = await client.post("/api/messages", json=BOT_ACTIVITY_MESSAGE)
         assert resp.status_code == 200
-        mock_adapter_process.process_activity.assert_called_once()
+        mock_adapter_process.process_activity_with_identity.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_auth_pass_with_valid_token(self, auth_pass, mock_adapter_process):
@@ -143,7 +145,7 @@ class TestMessagesEndpoint:
         ) as client:
             resp = await client.post("/api/messages", json=BOT_ACTIVITY_TWI)
         assert resp.status_code == 200
-        mock_adapter_process.process_activity.assert_called_once()
+        mock_adapter_process.process_activity_with_identity.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_invalid_activity_processed_without_crash(
@@ -161,3 +163,193 @@ class TestMessagesEndpoint:
                 json={"type": "event", "name": "test"},
             )
         assert resp.status_code == 200
+
+
+@pytest.fixture
+def link_secret():
+    """Configure download-link signing for the duration of a test."""
+    with patch("app.services.download_links.settings") as mock_settings:
+        mock_settings.public_base_url = "https://backend.example"
+        mock_settings.download_link_secret = "test-secret"
+        mock_settings.download_link_ttl_days = 30
+        yield mock_settings
+
+
+@contextmanager
+def _document_store():
+    """Swap the service container's DocumentStore for a mock."""
+    mock_store = MagicMock()
+    with patch("app.main.get_services") as mock_get_services:
+        mock_get_services.return_value.documents = mock_store
+        yield mock_store
+
+
+def _signed_path(document_id: str) -> str:
+    from app.services.download_links import build_download_url
+
+    return build_download_url(document_id).removeprefix("https://backend.example")
+
+
+class TestDownloadEndpoint:
+    @pytest.mark.asyncio
+    async def test_redirects_to_short_lived_sas(self, link_secret):
+        from app.main import app
+
+        doc_id = "a" * 32
+        with (
+            _document_store() as mock_store,
+            patch(
+                "app.main.get_download_url",
+                new_callable=AsyncMock,
+                return_value="https://blob/twi/c/x.pdf?sig=1",
+            ) as mock_url,
+        ):
+            mock_store.get = AsyncMock(return_value={"pdf_blob_name": "twi/c/x.pdf"})
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(_signed_path(doc_id))
+
+        assert resp.status_code == 307
+        assert resp.headers["location"] == "https://blob/twi/c/x.pdf?sig=1"
+        mock_url.assert_awaited_once_with("twi/c/x.pdf")
+
+    @pytest.mark.asyncio
+    async def test_unknown_document_returns_404(self, link_secret):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.get = AsyncMock(return_value=None)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(_signed_path("b" * 32))
+
+        assert resp.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_malformed_id_is_rejected_without_lookup(self, link_secret):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.get = AsyncMock()
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get("/documents/not-an-id/download?exp=1&sig=x")
+
+        assert resp.status_code == 404
+        mock_store.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_link_for_another_document_is_forbidden(self, link_secret):
+        """A signature cannot be reused for a different document_id."""
+        from app.main import app
+
+        query = _signed_path("a" * 32).split("?", 1)[1]
+        with _document_store() as mock_store:
+            mock_store.get = AsyncMock()
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(f"/documents/{'c' * 32}/download?{query}")
+
+        assert resp.status_code == 403
+        mock_store.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expired_link_is_forbidden(self, link_secret):
+        from app.main import app
+        from app.services.download_links import _signature
+
+        doc_id = "a" * 32
+        with _document_store() as mock_store:
+            mock_store.get = AsyncMock()
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    f"/documents/{doc_id}/download?exp=1&sig={_signature(doc_id, 1)}"
+                )
+
+        assert resp.status_code == 403
+
+
+class TestDocumentSearchEndpoint:
+    """GET /api/documents resolves the tenant from the API key."""
+
+    @pytest.fixture
+    def api_keys(self):
+        with patch("app.main.settings") as mock_settings:
+            mock_settings.document_api_keys = "tenant-a:key-a, tenant-b:key-b"
+            yield mock_settings
+
+    @pytest.mark.asyncio
+    async def test_search_scoped_to_key_tenant(self, api_keys):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.search = AsyncMock(return_value=([{"title": "x"}], "next"))
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/documents?machine_id=CNC-01&limit=5",
+                    headers={"Authorization": "Bearer key-b"},
+                )
+
+        assert resp.status_code == 200
+        assert resp.json() == {"items": [{"title": "x"}], "next_cursor": "next"}
+        args, kwargs = mock_store.search.call_args
+        assert args == ("tenant-b",)
+        assert kwargs["machine_id"] == "CNC-01"
+        assert kwargs["limit"] == 5
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_is_unauthorized(self, api_keys):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.search = AsyncMock()
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/documents", headers={"Authorization": "Bearer nope"}
+                )
+
+        assert resp.status_code == 401
+        mock_store.search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_bad_cursor_is_bad_request(self, api_keys):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.search = AsyncMock(side_effect=ValueError("Invalid cursor"))
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/documents?cursor=zzz",
+                    headers={"Authorization": "Bearer key-a"},
+                )
+
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_get_document_only_matches_own_tenant(self, api_keys):
+        from app.main import app
+
+        with _document_store() as mock_store:
+            mock_store.get = AsyncMock(return_value=None)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    f"/api/documents/{'a' * 32}",
+                    headers={"Authorization": "Bearer key-a"},
+                )
+
+        assert resp.status_code == 404
+        assert mock_store.get.call_args.kwargs["tenant_id"] == "tenant-a"
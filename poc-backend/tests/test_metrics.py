@@ -0,0 +1,213 @@
+"""Tests for the Prometheus instrumentation and the /metrics endpoint."""
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langgraph.errors import GraphInterrupt
+from prometheus_client import REGISTRY
+
+from app.services import metrics
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestNodeInstrumentation:
+    @pytest.mark.asyncio
+    async def test_llm_call_is_attributed_to_its_node(self):
+        from app.agent.graph import _instrumented
+        from app.services.ai_foundry import call_llm
+
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "ok"
+        response.usage.prompt_tokens = 120
+        response.usage.completion_tokens = 30
+        client = MagicMock()
+        client.complete = AsyncMock(return_value=response)
+
+        async def node(state):
+            await call_llm("prompt")
+            return {**state, "status": "processing"}
+
+        with (
+            patch("app.services.ai_foundry._get_client", return_value=client),
+            patch("app.services.ai_foundry.settings.ai_model", "model-x"),
+        ):
+            before = _sample(
+                "agentize_llm_call_duration_seconds_count",
+                node="metrics_test",
+                model="model-x",
+            )
+            await _instrumented("metrics_test", node)({}, {})
+
+        assert (
+            _sample(
+                "agentize_llm_call_duration_seconds_count",
+                node="metrics_test",
+                model="model-x",
+            )
+            == before + 1
+        )
+        assert (
+            _sample(
+                "agentize_llm_tokens_sum",
+                node="metrics_test",
+                model="model-x",
+                direction="output",
+            )
+            >= 30
+        )
+        assert _sample("agentize_node_duration_seconds_count", node="metrics_test") >= 1
+        assert metrics.current_node.get() == "-"
+
+    @pytest.mark.asyncio
+    async def test_interrupt_is_not_an_error(self):
+        from app.agent.graph import _instrumented
+
+        async def node(state):
+            raise GraphInterrupt()
+
+        before = _sample(
+            "agentize_errors_total", component="graph", status="GraphInterrupt"
+        )
+        with pytest.raises(GraphInterrupt):
+            await _instrumented("metrics_pause", node)({}, {})
+
+        assert (
+            _sample("agentize_errors_total", component="graph", status="GraphInterrupt")
+            == before
+        )
+        assert (
+            _sample("agentize_node_duration_seconds_count", node="metrics_pause") == 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_node_reporting_error_status_is_counted(self):
+        from app.agent.graph import _instrumented
+
+        async def node(state, config):
+            return {**state, "status": "error"}
+
+        before = _sample(
+            "agentize_errors_total", component="graph", status="fail_failed"
+        )
+        await _instrumented("fail", node)({}, {})
+
+        assert (
+            _sample("agentize_errors_total", component="graph", status="fail_failed")
+            == before + 1
+        )
+
+
+class TestMongoCommandMetrics:
+    def test_command_is_timed_by_collection(self):
+        listener = metrics.MongoCommandMetrics()
+        listener.started(
+            SimpleNamespace(
+                request_id=7, command_name="find", command={"find": "metrics_docs"}
+            )
+        )
+        listener.succeeded(SimpleNamespace(request_id=7, duration_micros=2500))
+
+        assert _sample(
+            "agentize_mongo_command_duration_seconds_sum",
+            collection="metrics_docs",
+            command="find",
+        ) == pytest.approx(0.0025)
+        assert not listener._started
+
+    def test_failed_command_counts_an_error_by_code(self):
+        listener = metrics.MongoCommandMetrics()
+        before = _sample("agentize_errors_total", component="mongo", status="16500")
+        listener.started(
+            SimpleNamespace(
+                request_id=8, command_name="insert", command={"insert": "audit_log"}
+            )
+        )
+        listener.failed(
+            SimpleNamespace(request_id=8, duration_micros=100, failure={"code": 16500})
+        )
+
+        assert (
+            _sample("agentize_errors_total", component="mongo", status="16500")
+            == before + 1
+        )
+
+
+class TestCheckpointBytes:
+    @pytest.mark.asyncio
+    async def test_written_checkpoint_size_is_observed(self):
+        from tests.test_mongodb_checkpointer import _config, _make_saver
+
+        saver = _make_saver()
+        saver.checkpoints.update_one = AsyncMock()
+        before = _sample("agentize_checkpoint_bytes_count")
+
+        await saver.aput(
+            _config(),
+            {"id": "cp-1", "channel_values": {"draft": "x" * 5000}, "v": 1},
+            {"step": 1},
+            {},
+        )
+
+        assert _sample("agentize_checkpoint_bytes_count") == before + 1
+
+
+class TestQueueDepth:
+    @pytest.mark.asyncio
+    async def test_waiting_turns_gauge_returns_to_zero(self):
+        from app.services.turn_guard import ConversationLeases
+
+        leases = ConversationLeases(lease_seconds=60, wait_seconds=1)
+        async with leases.hold("conv-metrics"):
+            pass
+
+        assert _sample("agentize_queue_depth", queue="conversation_turns") == 0
+
+
+class TestMetricsEndpoint:
+    async def _get(self, headers: dict | None = None) -> httpx.Response:
+        from app.main import app
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            return await client.get("/metrics", headers=headers or {})
+
+    @pytest.mark.asyncio
+    async def test_exposes_the_hot_path_histograms(self):
+        resp = await self._get()
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        for name in (
+            "agentize_node_duration_seconds",
+            "agentize_llm_call_duration_seconds",
+            "agentize_pdf_render_duration_seconds",
+            "agentize_mongo_command_duration_seconds",
+            "agentize_checkpoint_bytes",
+        ):
+            assert name in resp.text
+
+    @pytest.mark.asyncio
+    async def test_token_is_required_when_configured(self):
+        with patch("app.main.settings.metrics_token", "s3cret"):
+            assert (await self._get()).status_code == 401
+            resp = await self._get({"Authorization": "Bearer s3cret"})
+
+        assert resp.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_http_errors_are_counted_by_status(self):
+        before = _sample("agentize_errors_total", component="http", status="401")
+        with patch("app.main.settings.metrics_token", "s3cret"):
+            await self._get()
+
+        assert (
+            _sample("agentize_errors_total", component="http", status="401")
+            == before + 1
+        )
@@ -1,9 +1,16 @@
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.agent.nodes.output import output_node
 
 
+def _config(documents) -> dict:
+    """LangGraph config injecting a service container with the given DocumentStore."""
+    services = MagicMock()
+    services.documents = documents
+    return {"configurable": {"services": services}}
+
+
 @pytest.fixture
 def output_state(sample_agent_state, sample_draft):
     """State for output node tests - uses shared fixtures."""
@@ -25,19 +32,17 @@ async def test_output_node_saves_to_document_store(output_state):
         patch(
             "app.agent.nodes.output.upload_pdf", new_callable=AsyncMock
         ) as mock_upload_pdf,
-        patch("app.agent.nodes.output.DocumentStore") as mock_document_store_class,
     ):
         mock_generate_pdf.return_value = b"fake-pdf-bytes"
         mock_upload_pdf.return_value = "https://fake.url/blob.pdf"
 
-        mock_store_instance = mock_document_store_class.return_value
+        mock_store_instance = MagicMock()
         mock_store_instance.save = AsyncMock()
 
-        result = await output_node(output_state)
+        result = await output_node(output_state, _config(mock_store_instance))
 
         mock_generate_pdf.assert_called_once()
         mock_upload_pdf.assert_called_once()
-        mock_document_store_class.assert_called_once()
         mock_store_instance.save.assert_called_once()
 
         saved_doc = mock_store_instance.save.call_args[0][0]
@@ -55,3 +60,55 @@ async def test_output_node_saves_to_document_store(output_state):
         assert result["status"] == "completed"
         assert result["pdf_url"] == "https://fake.url/blob.pdf"
         assert result["title"] == "CÍM: CNC-01 gép napi beállítása"
+
+
+@pytest.mark.asyncio
+async def test_output_node_returns_download_link_when_public_url_set(output_state):
+    with (
+        patch("app.agent.nodes.output.generate_twi_pdf", new_callable=AsyncMock),
+        patch(
+            "app.agent.nodes.output.upload_pdf",
+            new_callable=AsyncMock,
+            return_value="https://fake.url/blob.pdf",
+        ),
+        patch("app.services.download_links.settings") as mock_settings,
+    ):
+        mock_settings.public_base_url = "https://backend.example/"
+        mock_settings.download_link_secret = "s3cret"
+        mock_settings.download_link_ttl_days = 30
+        mock_store = MagicMock()
+        mock_store.save = AsyncMock()
+
+        result = await output_node(output_state, _config(mock_store))
+
+        saved_doc = mock_store.save.call_args[0][0]
+        assert result["document_id"] == saved_doc["document_id"]
+        assert result["download_url"].startswith(
+            f"https://backend.example/documents/{saved_doc['document_id']}/download?exp="
+        )
+        assert "&sig=" in result["download_url"]
+
+
+@pytest.mark.asyncio
+async def test_output_node_no_download_link_when_save_fails(output_state):
+    """The download endpoint needs the metadata row — fall back to the SAS URL."""
+    with (
+        patch("app.agent.nodes.output.generate_twi_pdf", new_callable=AsyncMock),
+        patch(
+            "app.agent.nodes.output.upload_pdf",
+            new_callable=AsyncMock,
+            return_value="https://fake.url/blob.pdf",
+        ),
+        patch("app.services.download_links.settings") as mock_settings,
+    ):
+        mock_settings.public_base_url = "https://backend.example"
+        mock_settings.download_link_secret = "s3cret"
+        mock_settings.download_link_ttl_days = 30
+        mock_store = MagicMock()
+        mock_store.save = AsyncMock(side_effect=Exception("db down"))
+
+        result = await output_node(output_state, _config(mock_store))
+
+        assert result["status"] == "completed"
+        assert result["download_url"] is None
+        assert result["pdf_url"] == "https://fake.url/blob.pdf"
@@ -157,18 +157,192 @@ class TestGenerateTwiPdf:
 
     @pytest.mark.asyncio
     async def test_eu_ai_act_footer_present_in_template(self):
-        captured: list[str] = []
+        """The page footer label lives in the stylesheet's @bottom-center margin box."""
+        import re
 
-        with patch(
-            "app.agent.tools.pdf_generator.HTML",
-            side_effect=lambda string: _mock_html(string, captured),
-        ):
+        from app.agent.tools import pdf_generator as mod
+
+        css = (mod._TEMPLATES_DIR / mod._STYLESHEET_NAME).read_text(encoding="utf-8")
+        footer = re.search(r"@bottom-center\s*\{[^}]*content:\s*([^;]+);", css)
+
+        assert footer is not None
+        assert "agentize.eu" in footer.group(1)
+        assert "AI által generált tartalom" in footer.group(1)
+        assert "counter(page)" in footer.group(1)
+
+        html_mock = _mock_html("")
+        with patch("app.agent.tools.pdf_generator.HTML", return_value=html_mock):
             await generate_twi_pdf(
                 content=_SAMPLE_CONTENT,
                 metadata=_METADATA,
                 user_id="user-1",
             )
 
-        rendered = captured[0]
-        assert "agentize.eu" in rendered
-        assert "AI által generált tartalom" in rendered
+        _, kwargs = html_mock.write_pdf.call_args
+        assert kwargs["stylesheets"] == [mod._get_stylesheet()]
+
+
+# ---------------------------------------------------------------------------
+# Shared render resources (template, stylesheet, fonts, Markdown converter)
+# ---------------------------------------------------------------------------
+
+
+class TestRenderResources:
+    def test_template_compiled_once(self):
+        from app.agent.tools import pdf_generator as mod
+
+        assert mod._get_template() is mod._get_template()
+
+    def test_markdown_converter_reused_and_reset(self):
+        from app.agent.tools import pdf_generator as mod
+
+        first = mod._render_markdown("| a | b |\n|---|---|\n| 1 | 2 |\n")
+        second = mod._render_markdown("plain paragraph")
+
+        assert "<table>" in first
+        assert "<table>" not in second
+        assert mod._get_markdown() is mod._get_markdown()
+
+    def test_templates_dir_independent_of_cwd(self, tmp_path, monkeypatch):
+        from app.agent.tools import pdf_generator as mod
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(mod, "_template", None)
+
+        assert (mod._TEMPLATES_DIR / mod._TEMPLATE_NAME).is_file()
+        assert (mod._TEMPLATES_DIR / mod._STYLESHEET_NAME).is_file()
+        assert mod._get_template() is not None
+
+    @pytest.mark.asyncio
+    async def test_shared_stylesheet_and_font_config_passed_to_writer(self):
+        from app.agent.tools import pdf_generator as mod
+
+        html_mocks: list[MagicMock] = []
+
+        def _factory(string):
+            mock = _mock_html(string)
+            html_mocks.append(mock)
+            return mock
+
+        with patch("app.agent.tools.pdf_generator.HTML", side_effect=_factory):
+            await generate_twi_pdf(content=_SAMPLE_CONTENT, metadata=_METADATA, user_id="u")
+            await generate_twi_pdf(content=_SAMPLE_CONTENT, metadata=_METADATA, user_id="u")
+
+        first_kwargs = html_mocks[0].write_pdf.call_args.kwargs
+        second_kwargs = html_mocks[1].write_pdf.call_args.kwargs
+        assert first_kwargs["stylesheets"] == [mod._get_stylesheet()]
+        assert first_kwargs["stylesheets"][0] is second_kwargs["stylesheets"][0]
+        assert first_kwargs["font_config"] is second_kwargs["font_config"]
+
+    def test_warm_up_renderer_primes_resources(self, monkeypatch):
+        from app.agent.tools import pdf_generator as mod
+
+        monkeypatch.setattr(mod, "_template", None)
+        monkeypatch.setattr(mod, "_markdown", None)
+
+        mod.warm_up_renderer()
+
+        assert mod._template is not None
+        assert mod._stylesheet is not None
+        assert mod._markdown is not None
+
+
+# ---------------------------------------------------------------------------
+# Output profiles (write_pdf options)
+# ---------------------------------------------------------------------------
+
+
+class TestOutputProfiles:
+    def test_default_profile_comes_from_settings(self):
+        from app.agent.tools import pdf_generator as mod
+
+        with patch.object(mod.settings, "pdf_output_profile", "standard"):
+            assert mod.resolve_output_profile() is mod.PDF_OUTPUT_PROFILES["standard"]
+
+    def test_unknown_profile_raises_value_error(self):
+        from app.agent.tools.pdf_generator import resolve_output_profile
+
+        with pytest.raises(ValueError, match="Unknown PDF output profile"):
+            resolve_output_profile("tiny")
+
+    def test_archival_profile_targets_pdf_a(self):
+        from app.agent.tools.pdf_generator import PDF_OUTPUT_PROFILES
+
+        assert PDF_OUTPUT_PROFILES["archival"]["pdf_variant"].startswith("pdf/a-")
+
+    @pytest.mark.asyncio
+    async def test_profile_options_passed_to_write_pdf(self):
+        from app.agent.tools.pdf_generator import PDF_OUTPUT_PROFILES
+
+        html_mocks: list[MagicMock] = []
+
+        def _factory(string):
+            mock = _mock_html(string)
+            html_mocks.append(mock)
+            return mock
+
+        with patch("app.agent.tools.pdf_generator.HTML", side_effect=_factory):
+            await generate_twi_pdf(
+                content=_SAMPLE_CONTENT,
+                metadata=_METADATA,
+                user_id="u",
+                profile="archival",
+            )
+
+        kwargs = html_mocks[0].write_pdf.call_args.kwargs
+        for key, value in PDF_OUTPUT_PROFILES["archival"].items():
+            assert kwargs[key] == value
+
+
+# ---------------------------------------------------------------------------
+# Size budgets (real WeasyPrint render)
+# ---------------------------------------------------------------------------
+
+
+class TestPdfSizeBudgets:
+    """Guard against regressions that bloat PDFs downloaded on phones."""
+
+    @pytest.mark.asyncio
+    async def test_short_draft_compact_within_budget(self, sample_draft):
+        pdf = await generate_twi_pdf(
+            content=sample_draft, metadata=_METADATA, user_id="u", profile="compact"
+        )
+        assert pdf.startswith(b"%PDF")
+        assert len(pdf) <= 200 * 1024
+
+    @pytest.mark.asyncio
+    async def test_long_draft_compact_within_budget(self):
+        from benchmarks.pdf_render import synthetic_twi_draft
+
+        pdf = await generate_twi_pdf(
+            content=synthetic_twi_draft(50),
+            metadata=_METADATA,
+            user_id="u",
+            profile="compact",
+        )
+        assert len(pdf) <= 500 * 1024
+
+    @pytest.mark.asyncio
+    async def test_compact_is_much_smaller_than_unoptimised_output(self, sample_draft):
+        from app.agent.tools import pdf_generator as mod
+
+        compact = await generate_twi_pdf(
+            content=sample_draft, metadata=_METADATA, user_id="u", profile="compact"
+        )
+        unoptimised = mod.HTML(
+            string=mod.render_twi_html(sample_draft, _METADATA, "u")
+        ).write_pdf(
+            stylesheets=[mod._get_stylesheet()],
+            font_config=mod._get_font_config(),
+            full_fonts=True,
+            uncompressed_pdf=True,
+        )
+        assert len(compact) * 2 <= len(unoptimised)
+
+    @pytest.mark.asyncio
+    async def test_archival_profile_renders_within_budget(self, sample_draft):
+        pdf = await generate_twi_pdf(
+            content=sample_draft, metadata=_METADATA, user_id="u", profile="archival"
+        )
+        assert pdf.startswith(b"%PDF")
+        assert len(pdf) <= 250 * 1024
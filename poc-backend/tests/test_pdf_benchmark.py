@@ -0,0 +1,56 @@
+"""Tests for the PDF rendering benchmark harness (WeasyPrint mocked)."""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from benchmarks.pdf_render import bench_size, run_benchmark, synthetic_twi_draft
+
+
+def _mock_html(string: str, pages: int = 3):
+    mock = MagicMock()
+    mock.write_pdf.return_value = b"%PDF-1.7 " + b"x" * 2048
+    mock.render.return_value.pages = [object()] * pages
+    return mock
+
+
+class TestSyntheticDraft:
+    def test_contains_requested_number_of_steps(self):
+        draft = synthetic_twi_draft(25)
+        assert "25. **Főlépés:**" in draft
+        assert "26. **Főlépés:**" not in draft
+
+    def test_contains_tables_and_long_safety_section(self):
+        draft = synthetic_twi_draft(10)
+        assert draft.count("|---|---|---|") >= 3
+        safety = draft.split("## BIZTONSÁGI ELŐÍRÁSOK")[1].split("## LÉPÉSEK")[0]
+        assert len(safety) > 1000
+
+    def test_starts_with_eu_ai_act_label(self):
+        assert synthetic_twi_draft(5).startswith("⚠️ AI által generált tartalom")
+
+
+class TestBenchmark:
+    @pytest.mark.asyncio
+    async def test_bench_size_reports_all_metrics(self):
+        with patch(
+            "app.agent.tools.pdf_generator.HTML",
+            side_effect=lambda string: _mock_html(string, pages=4),
+        ):
+            row = await bench_size(5, repeat=2)
+
+        assert row["steps"] == 5
+        assert row["pages"] == 4
+        assert row["ms_per_doc"] >= 0
+        assert row["ms_per_page"] == pytest.approx(row["ms_per_doc"] / 4, abs=0.1)
+        assert row["pdf_kb"] == pytest.approx(2.0, abs=0.1)
+        assert "peak_rss_mb" in row
+
+    @pytest.mark.asyncio
+    async def test_run_benchmark_orders_sizes_smallest_first(self):
+        with patch(
+            "app.agent.tools.pdf_generator.HTML",
+            side_effect=lambda string: _mock_html(string),
+        ):
+            rows = await run_benchmark(steps=(50, 5, 10), repeat=1)
+
+        assert [r["steps"] for r in rows] == [5, 10, 50]
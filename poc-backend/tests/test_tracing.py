@@ -0,0 +1,192 @@
+"""Tests for the OpenTelemetry spans around nodes, LLM calls and store operations."""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langgraph.errors import GraphInterrupt
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from app.services import tracing
+
+
+@pytest.fixture
+def spans():
+    """Route the app's spans to an in-memory exporter."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(tracing.ConversationSpanProcessor())
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with patch.object(tracing, "tracer", provider.get_tracer("test")):
+        yield exporter
+    provider.shutdown()
+
+
+def _by_name(exporter: InMemorySpanExporter) -> dict:
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def _llm_client() -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "draft"
+    response.usage.prompt_tokens = 200
+    response.usage.completion_tokens = 50
+    client = MagicMock()
+    client.complete = AsyncMock(return_value=response)
+    return client
+
+
+class TestNodeSpans:
+    @pytest.mark.asyncio
+    async def test_llm_span_is_a_child_of_its_node_span(self, spans):
+        from app.agent.graph import _instrumented
+        from app.services.ai_foundry import call_llm
+
+        async def node(state):
+            await call_llm("prompt", temperature=0.2)
+            return {**state, "status": "review_needed"}
+
+        with (
+            patch("app.services.ai_foundry._get_client", return_value=_llm_client()),
+            patch("app.services.ai_foundry.settings.ai_model", "model-x"),
+        ):
+            await _instrumented("generate", node)({"conversation_id": "conv-7"}, {})
+
+        by_name = _by_name(spans)
+        node_span, llm_span = by_name["node generate"], by_name["chat model-x"]
+        assert llm_span.parent.span_id == node_span.context.span_id
+        assert llm_span.attributes["gen_ai.request.temperature"] == 0.2
+        assert llm_span.attributes["gen_ai.usage.input_tokens"] == 200
+        assert llm_span.attributes["gen_ai.usage.output_tokens"] == 50
+        assert llm_span.attributes[tracing.CONVERSATION_ID] == "conv-7"
+        assert node_span.attributes["agentize.status"] == "review_needed"
+
+    @pytest.mark.asyncio
+    async def test_interrupt_does_not_mark_the_span_failed(self, spans):
+        from app.agent.graph import _instrumented
+
+        async def node(state):
+            raise GraphInterrupt()
+
+        with pytest.raises(GraphInterrupt):
+            await _instrumented("review", node)({}, {})
+
+        assert _by_name(spans)["node review"].status.status_code == StatusCode.UNSET
+
+    @pytest.mark.asyncio
+    async def test_node_exception_marks_the_span_failed(self, spans):
+        from app.agent.graph import _instrumented
+
+        async def node(state):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await _instrumented("output", node)({}, {})
+
+        span = _by_name(spans)["node output"]
+        assert span.status.status_code == StatusCode.ERROR
+        assert span.events[0].name == "exception"
+
+
+class TestStoreSpans:
+    @pytest.mark.asyncio
+    async def test_store_operation_is_traced_with_its_conversation(self, spans):
+        from app.services.cosmos_db import DocumentStore
+
+        store = DocumentStore()
+        store.collection = MagicMock()
+        store.collection.find_one = AsyncMock(return_value=None)
+
+        with tracing.conversation("conv-9"):
+            await store.get("doc-1")
+
+        span = _by_name(spans)["documents.get"]
+        assert span.attributes["db.collection.name"] == "documents"
+        assert span.attributes[tracing.CONVERSATION_ID] == "conv-9"
+
+    @pytest.mark.asyncio
+    async def test_write_behind_flush_is_not_part_of_the_first_turn(self, spans):
+        from app.services import latency
+        from tests.test_cosmos_db import _conversation_store
+
+        store, _ = _conversation_store(write_behind=True)
+        with patch(
+            "app.services.cosmos_db.settings.conversation_flush_interval_seconds",
+            0.01,
+        ):
+            with (
+                latency.turn() as ledger,
+                tracing.conversation("conv-first"),
+                tracing.tracer.start_as_current_span("bot turn"),
+            ):
+                await store.record_activity("conv-first", "u1", "msteams")
+                stored = ledger.snapshot()["store"]
+            await asyncio.sleep(0.03)  # the flusher writes in the background
+            await store.aclose()
+
+        flushes = [
+            s for s in spans.get_finished_spans() if s.name == "conversations.flush"
+        ]
+        flush_loop = flushes[0]
+        assert flush_loop.parent is None
+        assert tracing.CONVERSATION_ID not in flush_loop.attributes
+        assert ledger.snapshot()["store"] == stored
+
+
+class TestTurnSpan:
+    @pytest.mark.asyncio
+    async def test_bot_turn_is_the_parent_of_its_store_spans(self, spans):
+        from app.bot.bot_handler import AgentizeBotHandler
+        from app.services.container import ServiceContainer
+
+        activity = MagicMock()
+        activity.id = "a1"
+        activity.channel_id = "msteams"
+        activity.conversation.id = "conv-turn"
+        activity.from_property.id = "user-1"
+        activity.text = "Hello"
+        activity.value = None
+        context = MagicMock()
+        context.activity = activity
+        context.send_activity = AsyncMock()
+
+        handler = AgentizeBotHandler(ServiceContainer.create())
+        with (
+            patch.object(handler, "_get_graph", new_callable=AsyncMock),
+            patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as run,
+        ):
+            run.return_value = {"status": "clarification_needed"}
+            await handler.on_message_activity(context)
+
+        by_name = _by_name(spans)
+        turn = by_name["bot turn"]
+        assert turn.attributes[tracing.CONVERSATION_ID] == "conv-turn"
+        claim = by_name["processed_activities.claim"]
+        assert claim.parent.span_id == turn.context.span_id
+
+
+class TestConfigureTracing:
+    def test_otlp_exporter_is_added_to_the_existing_provider(self):
+        provider = TracerProvider()
+        with (
+            patch(
+                "app.services.tracing.trace.get_tracer_provider", return_value=provider
+            ),
+            patch(
+                "app.services.tracing.settings.otel_exporter_otlp_endpoint",
+                "http://localhost:4318/",
+            ),
+        ):
+            tracing.configure_tracing()
+
+        processors = provider._active_span_processor._span_processors
+        exporter = processors[0].span_exporter
+        assert exporter._endpoint == "http://localhost:4318/v1/traces"
+        assert isinstance(processors[1], tracing.ConversationSpanProcessor)
+        provider.shutdown()
@@ -0,0 +1,210 @@
+"""Tests for activity de-duplication and per-conversation turn serialisation."""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import DuplicateKeyError
+
+from app.services.turn_guard import (
+    ActivityDeduper,
+    ConversationBusyError,
+    ConversationLeases,
+    activity_keys,
+)
+
+
+def _activity(activity_id: str = "a1", value=None) -> MagicMock:
+    activity = MagicMock()
+    activity.id = activity_id
+    activity.channel_id = "msteams"
+    activity.conversation.id = "conv-1"
+    activity.from_property.id = "user-1"
+    activity.text = "Hello"
+    activity.value = value
+    return activity
+
+
+def _deduper(collection=None) -> ActivityDeduper:
+    deduper = ActivityDeduper(ttl_seconds=60)
+    deduper.collection = collection
+    return deduper
+
+
+class TestActivityKeys:
+    def test_message_is_keyed_by_activity_id(self):
+        assert activity_keys(_activity()) == ["activity:msteams:conv-1:a1"]
+
+    def test_card_action_is_also_keyed_by_draft(self):
+        keys = activity_keys(
+            _activity(value={"action": "approve_draft", "draft_hash": "abc"})
+        )
+
+        assert keys[1] == "card:conv-1:approve_draft:abc"
+
+    def test_edit_with_feedback_is_keyed_by_activity_only(self):
+        keys = activity_keys(
+            _activity(
+                value={"action": "request_edit", "draft_hash": "abc", "feedback": "x"}
+            )
+        )
+
+        assert keys == ["activity:msteams:conv-1:a1"]
+
+
+class TestActivityDeduper:
+    @pytest.mark.asyncio
+    async def test_second_delivery_is_rejected(self):
+        deduper = _deduper()
+
+        assert await deduper.claim(["k1"]) is True
+        assert await deduper.claim(["k1"]) is False
+
+    @pytest.mark.asyncio
+    async def test_released_keys_can_be_claimed_again(self):
+        deduper = _deduper()
+        await deduper.claim(["k1"])
+
+        await deduper.release(["k1"])
+
+        assert await deduper.claim(["k1"]) is True
+
+    @pytest.mark.asyncio
+    async def test_key_claimed_by_another_replica_is_rejected(self):
+        collection = MagicMock()
+        collection.insert_one = AsyncMock(side_effect=[None, DuplicateKeyError("x")])
+        collection.delete_many = AsyncMock()
+        deduper = _deduper(collection)
+
+        assert await deduper.claim(["activity", "card"]) is False
+        collection.delete_many.assert_awaited_once_with({"_id": {"$in": ["activity"]}})
+
+    @pytest.mark.asyncio
+    async def test_store_outage_does_not_drop_messages(self):
+        collection = MagicMock()
+        collection.insert_one = AsyncMock(side_effect=Exception("Cosmos 503"))
+        deduper = _deduper(collection)
+
+        assert await deduper.claim(["k1"]) is True
+
+
+class TestConversationLeases:
+    @pytest.mark.asyncio
+    async def test_turns_of_one_conversation_do_not_overlap(self):
+        leases = ConversationLeases(lease_seconds=60, wait_seconds=5)
+        events: list[str] = []
+
+        async def turn(name: str) -> None:
+            async with leases.hold("conv-1"):
+                events.append(f"{name}-start")
+                await asyncio.sleep(0.01)
+                events.append(f"{name}-end")
+
+        await asyncio.gather(turn("a"), turn("b"))
+
+        assert events == ["a-start", "a-end", "b-start", "b-end"]
+        assert leases._locks == {}
+
+    @pytest.mark.asyncio
+    async def test_waiting_turn_gives_up_after_wait_limit(self):
+        leases = ConversationLeases(lease_seconds=60, wait_seconds=0.05)
+        release = asyncio.Event()
+
+        async def long_turn() -> None:
+            async with leases.hold("conv-1"):
+                await release.wait()
+
+        running = asyncio.create_task(long_turn())
+        await asyncio.sleep(0)
+        with pytest.raises(ConversationBusyError):
+            async with leases.hold("conv-1"):
+                pass
+        release.set()
+        await running
+
+    @pytest.mark.asyncio
+    async def test_live_lease_of_another_replica_blocks_the_turn(self):
+        leases = ConversationLeases(lease_seconds=60, wait_seconds=0.2)
+        leases.collection = MagicMock()
+        leases.collection.update_one = AsyncMock(side_effect=DuplicateKeyError("x"))
+
+        with pytest.raises(ConversationBusyError):
+            async with leases.hold("conv-1"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_lease_is_released_by_owner_after_turn(self):
+        leases = ConversationLeases(lease_seconds=60, wait_seconds=1)
+        leases.collection = MagicMock()
+        leases.collection.update_one = AsyncMock()
+        leases.collection.delete_one = AsyncMock()
+
+        async with leases.hold("conv-1"):
+            pass
+
+        owner = leases.collection.update_one.call_args[0][1]["$set"]["owner"]
+        leases.collection.delete_one.assert_awaited_once_with(
+            {"_id": "conv-1", "owner": owner}
+        )
+
+
+class TestHandlerGuard:
+    def _context(self, activity) -> MagicMock:
+        context = MagicMock()
+        context.activity = activity
+        context.send_activity = AsyncMock()
+        return context
+
+    @pytest.mark.asyncio
+    async def test_redelivered_activity_runs_the_graph_once(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+        from app.services.container import ServiceContainer
+
+        handler = AgentizeBotHandler(ServiceContainer.create())
+        with (
+            patch.object(handler, "_get_graph", new_callable=AsyncMock),
+            patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as run,
+        ):
+            run.return_value = {"status": "clarification_needed"}
+            await handler.on_message_activity(self._context(_activity()))
+            await handler.on_message_activity(self._context(_activity()))
+
+        run.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_turn_can_be_redelivered(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+        from app.services.container import ServiceContainer
+
+        services = ServiceContainer.create()
+        services.conversations.record_activity = AsyncMock(
+            side_effect=[Exception("boom"), None]
+        )
+        handler = AgentizeBotHandler(services)
+        with (
+            patch.object(handler, "_get_graph", new_callable=AsyncMock),
+            patch("app.bot.bot_handler.run_agent", new_callable=AsyncMock) as run,
+        ):
+            run.return_value = {"status": "clarification_needed"}
+            with pytest.raises(Exception, match="boom"):
+                await handler.on_message_activity(self._context(_activity()))
+            await handler.on_message_activity(self._context(_activity()))
+
+        run.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_busy_conversation_gets_a_reply(self):
+        from app.bot.bot_handler import AgentizeBotHandler
+        from app.locale import t
+        from app.services.container import ServiceContainer
+
+        services = ServiceContainer.create(
+            leases=ConversationLeases(lease_seconds=60, wait_seconds=0.05)
+        )
+        handler = AgentizeBotHandler(services)
+        context = self._context(_activity())
+
+        async with services.leases.hold("conv-1"):
+            await handler.on_message_activity(context)
+
+        context.send_activity.assert_awaited_once_with(t("bot.busy"))
@@ -0,0 +1,161 @@
+"""Tests for reference-TWI retrieval (candidate selection, BM25 ranking, caching)."""
+
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.twi_retrieval import TwiRetriever, bm25_scores, tokenize
+
+_DOCS = {
+    "d-new": {
+        "title": "CÍM: CNC-01 napi karbantartás",
+        "draft_content": "Kenés, szűrőcsere, hűtőfolyadék ellenőrzése.",
+    },
+    "d-old": {
+        "title": "CÍM: CNC-01 szerszámcsere",
+        "draft_content": "Szerszám kiszerelése, új szerszám bemérése.",
+    },
+}
+
+
+def _retriever(candidate_ids: list[str]) -> TwiRetriever:
+    documents = MagicMock()
+    documents.collection = object()
+    documents.search = AsyncMock(
+        return_value=(
+            [
+                {
+                    "document_id": i,
+                    "title": _DOCS[i]["title"],
+                    "created_at": datetime(2026, 3, 1),
+                }
+                for i in candidate_ids
+            ],
+            None,
+        )
+    )
+    documents.get_many = AsyncMock(
+        side_effect=lambda ids, projection=None: [
+            {"document_id": i, **_DOCS[i]} for i in ids
+        ]
+    )
+    return TwiRetriever(documents)
+
+
+class TestBm25:
+    def test_tokenize_folds_accents_and_drops_single_chars(self):
+        assert tokenize("Szűrő-csere a CNC-01 gépen") == [
+            "szuro-csere",
+            "cnc-01",
+            "gepen",
+        ]
+
+    def test_matching_document_scores_higher(self):
+        docs = [Counter(["kenes", "szuro"]), Counter(["szerszam", "csere"])]
+        scores = bm25_scores(["szerszam"], docs)
+        assert scores[1] > scores[0] == 0
+
+
+class TestTwiRetriever:
+    @pytest.mark.asyncio
+    async def test_ranks_candidates_for_same_machine(self):
+        retriever = _retriever(["d-new", "d-old"])
+
+        ref = await retriever.find_reference(
+            "t1", "Frissítsd a CNC-01 szerszámcsere utasítást", machine_id="CNC-01"
+        )
+
+        assert ref.document_id == "d-old"
+        assert "bemérése" in ref.content
+        assert retriever.documents.search.call_args.kwargs["machine_id"] == "CNC-01"
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_machine_only_when_process_type_has_no_match(self):
+        retriever = _retriever(["d-new"])
+        retriever.documents.search.side_effect = [
+            ([], None),
+            retriever.documents.search.return_value,
+        ]
+
+        ref = await retriever.find_reference(
+            "t1", "CNC-01 beállítás", machine_id="CNC-01", process_type="setup"
+        )
+
+        assert ref.document_id == "d-new"
+        assert "process_type" not in retriever.documents.search.call_args.kwargs
+        assert ref.same_process is False
+
+    @pytest.mark.asyncio
+    async def test_other_process_without_overlap_is_no_base_for_a_new_twi(self):
+        retriever = _retriever(["d-old"])
+        fallback = retriever.documents.search.return_value
+        retriever.documents.search.side_effect = [([], None), fallback]
+
+        ref = await retriever.find_reference(
+            "t1", "kenési terv", machine_id="CNC-01", process_type="lubrication"
+        )
+
+        assert ref is None
+
+    @pytest.mark.asyncio
+    async def test_edit_keeps_the_machine_only_fallback(self):
+        retriever = _retriever(["d-old"])
+        fallback = retriever.documents.search.return_value
+        retriever.documents.search.side_effect = [([], None), fallback]
+
+        ref = await retriever.find_reference(
+            "t1",
+            "kenési terv",
+            machine_id="CNC-01",
+            process_type="lubrication",
+            edit_requested=True,
+        )
+
+        assert ref.document_id == "d-old"
+        assert ref.score == 0
+
+    @pytest.mark.asyncio
+    async def test_no_lookup_without_machine_or_edit_intent(self):
+        retriever = _retriever(["d-new"])
+
+        assert await retriever.find_reference("t1", "Új utasítás kell") is None
+        retriever.documents.search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_edit_without_machine_requires_text_overlap(self):
+        retriever = _retriever(["d-new", "d-old"])
+
+        assert (
+            await retriever.find_reference(
+                "t1", "valami egészen más", edit_requested=True
+            )
+            is None
+        )
+        ref = await retriever.find_reference(
+            "t1", "módosítsd a karbantartás utasítást", edit_requested=True
+        )
+        assert ref.document_id == "d-new"
+
+    @pytest.mark.asyncio
+    async def test_content_is_cached_between_lookups(self):
+        retriever = _retriever(["d-new", "d-old"])
+
+        await retriever.find_reference("t1", "CNC-01", machine_id="CNC-01")
+        await retriever.find_reference("t1", "CNC-01", machine_id="CNC-01")
+
+        assert retriever.documents.get_many.call_args_list[0].args[0] == [
+            "d-new",
+            "d-old",
+        ]
+        assert retriever.documents.get_many.call_args_list[1].args[0] == []
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_setting(self):
+        retriever = _retriever(["d-new"])
+        with patch("app.services.twi_retrieval.settings") as mock_settings:
+            mock_settings.twi_retrieval_enabled = False
+            assert (
+                await retriever.find_reference("t1", "x", machine_id="CNC-01") is None
+            )
@@ -0,0 +1,216 @@
+"""Tests for the per-tenant usage rollups and their read endpoint."""
+
+from datetime import date, datetime, timezone
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import BulkWriteError
+
+from app.services.audit_writer import AuditWriter
+from app.services.usage_rollups import UsageRollupStore, accumulate
+
+
+def _entry(**overrides) -> dict:
+    base = {
+        "tenant_id": "t1",
+        "llm_model": "gpt-4o",
+        "event_type": "twi_generated",
+        "llm_tokens_input": 100,
+        "llm_tokens_output": 40,
+        "created_at": "2026-03-14T10:00:00+00:00",
+    }
+    return {**base, **overrides}
+
+
+def _rollups() -> UsageRollupStore:
+    rollups = UsageRollupStore.__new__(UsageRollupStore)
+    rollups.collection = MagicMock()
+    rollups.collection.bulk_write = AsyncMock()
+    rollups.collection.delete_many = AsyncMock()
+    rollups.jobs = MagicMock()
+    rollups.jobs.find_one = AsyncMock(return_value=None)
+    rollups.jobs.update_one = AsyncMock()
+    return rollups
+
+
+def _audit_store() -> MagicMock:
+    store = MagicMock()
+    store.collection = MagicMock()
+    store.collection.insert_many = AsyncMock()
+    return store
+
+
+class TestAccumulate:
+    def test_groups_by_tenant_model_day_and_event(self):
+        totals = accumulate(
+            [
+                _entry(),
+                _entry(llm_tokens_input=50, llm_tokens_output=10),
+                _entry(
+                    event_type="twi_approved", llm_model=None, llm_tokens_input=None
+                ),
+                _entry(created_at=datetime(2026, 3, 15, 1, tzinfo=timezone.utc)),
+            ]
+        )
+
+        assert totals[("t1", "gpt-4o", "2026-03-14", "twi_generated")] == {
+            "events": 2,
+            "tokens_input": 150,
+            "tokens_output": 50,
+        }
+        assert totals[("t1", "none", "2026-03-14", "twi_approved")]["events"] == 1
+        assert ("t1", "gpt-4o", "2026-03-15", "twi_generated") in totals
+
+
+class TestUsageRollupStore:
+    @pytest.mark.asyncio
+    async def test_add_upserts_one_counter_per_key(self):
+        rollups = _rollups()
+
+        await rollups.add([_entry(), _entry(), _entry(tenant_id="t2")])
+
+        ops = rollups.collection.bulk_write.call_args[0][0]
+        assert len(ops) == 2
+        update = ops[0]._doc
+        assert ops[0]._filter == {"_id": "t1|gpt-4o|2026-03-14|twi_generated"}
+        assert update["$inc"] == {"events": 2, "tokens_input": 200, "tokens_output": 80}
+        assert update["$setOnInsert"]["tenant_id"] == "t1"
+        assert ops[0]._upsert is True
+
+    @pytest.mark.asyncio
+    async def test_rebuild_resumes_from_saved_progress(self):
+        rollups = _rollups()
+        rollups.jobs.find_one.return_value = {
+            "day_from": "2026-03-01",
+            "day_to": "2026-03-03",
+            "next_day": "2026-03-03",
+        }
+        rollups._rebuild_day = AsyncMock(return_value=1)
+
+        with patch("app.services.usage_rollups.AuditStore") as audit_store:
+            audit_store.return_value.collection = MagicMock()
+            done = await rollups.rebuild(date(2026, 3, 1), date(2026, 3, 3))
+
+        assert done == 1
+        assert rollups._rebuild_day.call_args[0][1] == date(2026, 3, 3)
+        progress = rollups.jobs.update_one.call_args[0][1]["$set"]
+        assert progress["next_day"] == "2026-03-04"
+
+    @pytest.mark.asyncio
+    async def test_rebuild_day_overwrites_counts_and_drops_stale_keys(self):
+        rollups = _rollups()
+
+        async def groups():
+            yield {
+                "_id": {"tenant_id": "t1", "llm_model": None, "event_type": "x"},
+                "events": 3,
+                "tokens_input": 0,
+                "tokens_output": 0,
+            }
+
+        audit_log = MagicMock()
+        audit_log.aggregate = MagicMock(return_value=groups())
+
+        await rollups._rebuild_day(audit_log, date(2026, 3, 1))
+
+        op = rollups.collection.bulk_write.call_args[0][0][0]
+        assert op._filter == {"_id": "t1|none|2026-03-01|x"}
+        assert op._doc["$set"]["events"] == 3
+        rollups.collection.delete_many.assert_awaited_once_with(
+            {"day": "2026-03-01", "_id": {"$nin": ["t1|none|2026-03-01|x"]}}
+        )
+
+
+class TestAuditWriterFeedsRollups:
+    @pytest.mark.asyncio
+    async def test_flushed_entries_are_added_to_rollups(self, tmp_path):
+        rollups = _rollups()
+        writer = AuditWriter(
+            journal_dir=tmp_path,
+            store=_audit_store(),
+            rollups=rollups,
+            flush_interval=60,
+        )
+
+        await writer.log(_entry())
+        await writer.flush()
+
+        rollups.collection.bulk_write.assert_awaited_once()
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_replayed_duplicates_are_not_counted_twice(self, tmp_path):
+        store = _audit_store()
+        store.collection.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"index": 0, "code": 11000}]}
+        )
+        rollups = _rollups()
+        rollups.add = AsyncMock()
+        writer = AuditWriter(
+            journal_dir=tmp_path, store=store, rollups=rollups, flush_interval=60
+        )
+
+        await writer.log(_entry(conversation_id="already-landed"))
+        await writer.log(_entry(conversation_id="new"))
+        assert await writer.flush() == 2
+
+        added = rollups.add.call_args[0][0]
+        assert [e["conversation_id"] for e in added] == ["new"]
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_rollup_failure_does_not_block_audit_flush(self, tmp_path):
+        rollups = _rollups()
+        rollups.collection.bulk_write.side_effect = Exception("Cosmos 429")
+        writer = AuditWriter(
+            journal_dir=tmp_path,
+            store=_audit_store(),
+            rollups=rollups,
+            flush_interval=60,
+        )
+
+        await writer.log(_entry())
+        assert await writer.flush() == 1
+        assert writer.pending == 0
+        await writer.aclose()
+
+
+class TestUsageEndpoint:
+    @pytest.mark.asyncio
+    async def test_returns_tenant_rollups_with_totals(self):
+        from app.main import app
+
+        services = MagicMock()
+        services.usage.query = AsyncMock(
+            return_value=[
+                {"day": "2026-03-14", "events": 2, "tokens_input": 10},
+                {"day": "2026-03-15", "events": 1, "tokens_output": 5},
+            ]
+        )
+        with patch("app.main.get_services", return_value=services):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/usage", params={"from": "2026-03-01", "to": "2026-03-31"}
+                )
+
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["totals"] == {"events": 3, "tokens_input": 10, "tokens_output": 5}
+        args = services.usage.query.call_args[0]
+        assert args[1:] == (date(2026, 3, 1), date(2026, 3, 31))
+
+    @pytest.mark.asyncio
+    async def test_rejects_reversed_range(self):
+        from app.main import app
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.get(
+                "/api/usage", params={"from": "2026-03-31", "to": "2026-03-01"}
+            )
+
+        assert resp.status_code == 400